@@ -18,6 +18,12 @@ inventory_collection = database.get_collection("inventory")
 orders_collection = database.get_collection("orders")
 shipments_collection = database.get_collection("shipments")
 decision_context_collection = database.get_collection("decision_context")
+daily_rollup_collection = database.get_collection("daily_rollup")
+sop_jobs_collection = database.get_collection("sop_jobs")
+sop_shard_cache_collection = database.get_collection("sop_shard_cache")
+llm_cache_collection = database.get_collection("llm_cache")
+decision_memory_collection = database.get_collection("decision_memory")
+change_feed_state_collection = database.get_collection("change_feed_state")
 
 
 
@@ -0,0 +1,142 @@
+"""
+Dependencies Module
+
+FastAPI dependencies shared by the routers, starting with authentication.
+
+`get_current_user` authenticates a request from its `Authorization: Bearer <token>` header
+and returns the user's document (without the password hash). To keep that free in the
+steady state, it relies on two caches:
+    - Verified tokens: an LRU of tokens whose signature was already checked, each kept only
+      until its own `exp`, so a cached token never outlives its validity
+    - Users: documents from `users_collection` by email for AUTH_USER_CACHE_TTL seconds;
+      `invalidate_user` drops an entry when the user changes
+
+A repeated request with the same token therefore costs neither a signature check nor a
+database read. Each worker has its own caches, so a change made through another worker is
+seen after at most AUTH_USER_CACHE_TTL seconds.
+
+Environment Variables:
+    - AUTH_TOKEN_CACHE_SIZE: Verified tokens kept (default: 10000)
+    - AUTH_USER_CACHE_SIZE: User documents kept (default: 10000)
+    - AUTH_USER_CACHE_TTL: Seconds a user document is reused (default: 60)
+"""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import jwt
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from app.database import users_collection
+from app.services.auth_service import decode_access_token
+
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+# token -> (email, exp as a Unix timestamp)
+_verified_tokens: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+# email -> (user document, expiry on the monotonic clock)
+_users: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+_stats = {"token_hits": 0, "token_misses": 0, "user_hits": 0, "user_misses": 0, "rejected": 0}
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    _stats["rejected"] += 1
+    return HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+
+def verify_token(token: str) -> str:
+    """
+    Return the email a token was issued for, checking its signature only on first sight.
+
+    Raises:
+        HTTPException: 401 if the token is invalid or expired
+    """
+    cached = _verified_tokens.get(token)
+    if cached is not None:
+        email, expires = cached
+        if expires > time.time():
+            _verified_tokens.move_to_end(token)
+            _stats["token_hits"] += 1
+            return email
+        del _verified_tokens[token]
+
+    _stats["token_misses"] += 1
+    try:
+        claims = decode_access_token(token)
+    except jwt.ExpiredSignatureError:
+        raise _unauthorized("Token expired")
+    except jwt.InvalidTokenError:
+        raise _unauthorized("Invalid token")
+
+    _verified_tokens[token] = (claims["sub"], float(claims["exp"]))
+    if len(_verified_tokens) > AUTH_TOKEN_CACHE_SIZE:
+        _verified_tokens.popitem(last=False)
+    return claims["sub"]
+
+
+async def load_user(email: str) -> Optional[dict]:
+    """Return the user document for `email`, from the cache while it is fresh."""
+    cached = _users.get(email)
+    if cached is not None and cached[1] > time.monotonic():
+        _users.move_to_end(email)
+        _stats["user_hits"] += 1
+        return cached[0]
+
+    _stats["user_misses"] += 1
+    user = await users_collection.find_one({"email": email}, {"password": 0})
+    if user is None:
+        _users.pop(email, None)
+        return None
+    user["_id"] = str(user["_id"])
+    _users[email] = (user, time.monotonic() + AUTH_USER_CACHE_TTL)
+    _users.move_to_end(email)
+    if len(_users) > AUTH_USER_CACHE_SIZE:
+        _users.popitem(last=False)
+    return user
+
+
+def invalidate_user(email: str):
+    """Forget the cached document of a user that was created, changed or deleted."""
+    _users.pop(email, None)
+
+
+async def authenticate_token(token: Optional[str]) -> dict:
+    """
+    Authenticate a raw bearer token, e.g. one passed to a WebSocket as a query parameter.
+
+    Returns:
+        dict: The user document, without the password hash
+
+    Raises:
+        HTTPException: 401 if the token is missing, invalid or expired, or the user no longer exists
+    """
+    if not token:
+        raise _unauthorized("Not authenticated")
+    user = await load_user(verify_token(token))
+    if user is None:
+        raise _unauthorized("User not found")
+    return user
+
+
+async def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)) -> dict:
+    """
+    FastAPI dependency returning the authenticated user.
+
+    Example:
+        >>> @router.get("/me")
+        ... async def me(user: dict = Depends(get_current_user)):
+        ...     return {"email": user["email"]}
+    """
+    return await authenticate_token(credentials.credentials if credentials else None)
+
+
+def auth_cache_stats() -> Dict[str, object]:
+    """Return the size and hit/miss counters of the token and user caches."""
+    return {"tokens": len(_verified_tokens), "users": len(_users), **_stats}
@@ -0,0 +1,219 @@
+"""
+Index Registry Module
+
+This module declares every index the application's queries rely on, in one place, and
+creates them on startup. `create_indexes` is idempotent, so this is cheap once the indexes
+exist. Without these indexes every login (`users` by email), every decision history lookup
+(`decision_context` by user_id) and every product/date filter is a full collection scan.
+
+Index names are left to MongoDB's defaults (e.g. `email_1`), so an index created earlier by
+hand or by a previous version is recognized instead of conflicting.
+
+It also has a diagnostic mode that runs `explain()` on the application's known queries and
+flags the ones whose winning plan is a COLLSCAN.
+
+Usage:
+    Create the indexes (also done at app startup):
+        python -m app.indexes ensure
+    Explain the known queries; exits with status 1 if any of them scans a collection:
+        python -m app.indexes explain
+
+Environment Variables:
+    - INDEX_DIAGNOSTICS: "1" to also explain the known queries at startup and log COLLSCANs (default: "0")
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import PyMongoError
+
+from app.database import database
+from app.services.rollup_service import ROLLUP_KEY
+
+INDEX_DIAGNOSTICS = os.getenv("INDEX_DIAGNOSTICS", "0") == "1"
+
+# collection name -> indexes
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+    ],
+    "decision_context": [
+        IndexModel([("user_id", ASCENDING), ("date", DESCENDING)]),
+    ],
+    "sales": [
+        IndexModel([("product_id", ASCENDING), ("sale_date", ASCENDING)]),
+    ],
+    "production": [
+        IndexModel([("product_id", ASCENDING), ("production_date", ASCENDING)]),
+    ],
+    "inventory": [
+        # Only records at or below their reorder point, kept small by the partial filter
+        IndexModel(
+            [("warehouse_id", ASCENDING), ("product_id", ASCENDING)],
+            partialFilterExpression={"below_reorder_point": True},
+        ),
+        # Change feed polling fallback (see app.services.change_feed)
+        IndexModel([("updated_at", ASCENDING)]),
+    ],
+    "orders": [
+        IndexModel([("order_id", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING)]),
+        IndexModel([("updated_at", ASCENDING)]),
+    ],
+    "shipments": [
+        IndexModel([("tracking_number", ASCENDING)]),
+        IndexModel([("order_id", ASCENDING)]),
+        IndexModel([("updated_at", ASCENDING)]),
+    ],
+    "sop": [
+        IndexModel([("product_id", ASCENDING), ("revision_number", DESCENDING)]),
+        IndexModel([("job_id", ASCENDING), ("_id", ASCENDING)]),
+    ],
+    "daily_rollup": [
+        IndexModel([(field, ASCENDING) for field in ROLLUP_KEY], unique=True),
+    ],
+    "llm_cache": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+}
+
+_SAMPLE_DATE = datetime(2025, 1, 1, tzinfo=timezone.utc)
+_SAMPLE_ID = ObjectId.from_datetime(_SAMPLE_DATE)
+# Run every CHANGE_FEED_POLL_INTERVAL on each fed collection when change streams are unavailable
+_CHANGE_FEED_POLL = {"$or": [{"_id": {"$gt": _SAMPLE_ID}}, {"updated_at": {"$gt": _SAMPLE_DATE}}]}
+
+# (description, collection name, filter, sort) of the queries the app runs, with sample values
+KNOWN_QUERIES: List[Tuple[str, str, dict, Optional[List[Tuple[str, int]]]]] = [
+    ("login / authentication by email", "users", {"email": "diagnostics@example.com"}, None),
+    ("decision history of a user", "decision_context", {"user_id": "diagnostics"}, [("_id", ASCENDING)]),
+    ("latest decision contexts of a user", "decision_context", {"user_id": "diagnostics"}, [("date", DESCENDING)]),
+    (
+        "sales of a product in a date range", "sales",
+        {"product_id": "diagnostics", "sale_date": {"$gte": _SAMPLE_DATE, "$lt": _SAMPLE_DATE + timedelta(days=30)}}, None,
+    ),
+    (
+        "production of a product in a date range", "production",
+        {"product_id": "diagnostics", "production_date": {"$gte": _SAMPLE_DATE, "$lt": _SAMPLE_DATE + timedelta(days=30)}}, None,
+    ),
+    ("items to reorder", "inventory", {"below_reorder_point": True}, [("warehouse_id", ASCENDING), ("product_id", ASCENDING)]),
+    ("order by order_id", "orders", {"order_id": "diagnostics"}, None),
+    ("orders of a user", "orders", {"user_id": "diagnostics"}, None),
+    ("shipment by tracking number", "shipments", {"tracking_number": "diagnostics"}, None),
+    ("shipments of an order", "shipments", {"order_id": "diagnostics"}, None),
+    ("latest S&OP revisions", "sop", {"product_id": {"$in": ["diagnostics"]}}, None),
+    ("S&OP plans of a job", "sop", {"job_id": "diagnostics"}, [("_id", ASCENDING)]),
+    ("daily rollup upsert", "daily_rollup", {"product_id": "diagnostics", "day": _SAMPLE_DATE}, None),
+    *(
+        (f"change feed poll of {name}", name, _CHANGE_FEED_POLL, [("_id", ASCENDING)])
+        for name in ("inventory", "orders", "shipments")
+    ),
+]
+
+
+async def ensure_indexes(db=database) -> Dict[str, List[str]]:
+    """
+    Create every index of INDEXES that does not exist yet.
+
+    A collection whose indexes cannot be built (e.g. duplicate emails blocking the unique
+    index) is reported and skipped, so the app still starts.
+
+    Args:
+        db: Database to create the indexes in
+
+    Returns:
+        Dict[str, List[str]]: Index names per collection, for the collections that succeeded
+
+    Example:
+        >>> await ensure_indexes()
+        {'users': ['email_1'], 'decision_context': ['user_id_1_date_-1'], ...}
+    """
+    created = {}
+    for name, indexes in INDEXES.items():
+        try:
+            created[name] = await db.get_collection(name).create_indexes(indexes)
+        except PyMongoError as e:
+            print(f"❌ Could not create the indexes of '{name}': {e}")
+    print(f"✅ Indexes ensured on {len(created)}/{len(INDEXES)} collections")
+    return created
+
+
+def _plan_stages(plan: object) -> Iterator[Tuple[str, Optional[str]]]:
+    # Walks classic (inputStage/inputStages) and slot-based (queryPlan) plan trees alike
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"], plan.get("indexName")
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+
+async def explain_queries(db=database) -> List[dict]:
+    """
+    Run `explain()` on each of KNOWN_QUERIES and report the winning plan.
+
+    Args:
+        db: Database to explain the queries against
+
+    Returns:
+        List[dict]: One {"query", "collection", "stages", "indexes", "collscan"} per query,
+            or {"query", "collection", "error"} if the explain failed
+    """
+    reports = []
+    for description, name, query, sort in KNOWN_QUERIES:
+        cursor = db.get_collection(name).find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        try:
+            explained = await cursor.explain()
+        except PyMongoError as e:
+            reports.append({"query": description, "collection": name, "error": str(e)})
+            continue
+        stages = list(_plan_stages(explained.get("queryPlanner", {}).get("winningPlan", {})))
+        reports.append({
+            "query": description,
+            "collection": name,
+            "stages": [stage for stage, _ in stages],
+            "indexes": sorted({index for _, index in stages if index}),
+            "collscan": any(stage == "COLLSCAN" for stage, _ in stages),
+        })
+    return reports
+
+
+async def log_query_plans(db=database) -> int:
+    """
+    Explain the known queries and print one line per query, flagging COLLSCANs.
+
+    Returns:
+        int: Number of queries that scan a whole collection
+    """
+    collscans = 0
+    for report in await explain_queries(db):
+        if "error" in report:
+            print(f"❌ {report['query']} ({report['collection']}): explain failed: {report['error']}")
+        elif report["collscan"]:
+            collscans += 1
+            print(f"⚠️ COLLSCAN {report['query']} ({report['collection']}): {' <- '.join(report['stages'])}")
+        else:
+            print(f"✅ {report['query']} ({report['collection']}): {', '.join(report['indexes'])}")
+    return collscans
+
+
+async def _main(command: str):
+    if command == "ensure":
+        await ensure_indexes()
+    elif command == "explain":
+        if await log_query_plans():
+            raise SystemExit(1)
+    else:
+        raise SystemExit(f"Unknown command '{command}', expected 'ensure' or 'explain'")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "explain"))
@@ -1,5 +1,5 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from app.routes.auth import auth_router
 from app.routes.users import users_router
 from app.routes.sales import sales_router
@@ -9,8 +9,15 @@ from app.routes.inventory import inventory_router
 from app.routes.orders import orders_router
 from app.routes.shipments import shipments_router
 from app.database import connect_to_db, close_db_connection
+from app.indexes import INDEX_DIAGNOSTICS, ensure_indexes, log_query_plans
+from app.services.sop_jobs import fail_stale_sop_jobs, shutdown_sop_jobs
+from app.services.llm_service import start_http_client, close_http_client
 from app.routes.websockets import websocket_router
+from app.services.websocket_manager import manager as websocket_manager, start_backplane, stop_backplane
 from app.routes.decisioncontext import decision_context_router
+from app.services.change_feed import start_change_feed, stop_change_feed
+from app.services.auth_service import shutdown_password_hasher
+from app.dependencies import get_current_user
 import os
 
 
@@ -18,22 +25,39 @@ import os
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await connect_to_db()
+    await ensure_indexes()
+    if INDEX_DIAGNOSTICS:
+        await log_query_plans()
+    await fail_stale_sop_jobs()
+    await start_http_client()
+    await start_backplane()
+    await start_change_feed()
     yield
+    await stop_change_feed()
+    await stop_backplane()
+    await websocket_manager.close_all()
+    await close_http_client()
+    shutdown_sop_jobs()
+    shutdown_password_hasher()
     await close_db_connection()
 
 app = FastAPI(title="Logistics API", lifespan=lifespan)
 
 # Routes
+# The WebSocket authenticates with a token query parameter, see app.routes.websockets
 app.include_router(websocket_router, prefix="/ws", tags=["Websockets"])
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
-app.include_router(users_router, prefix="/users", tags=["Users"])
-app.include_router(sales_router, prefix="/sales", tags=["Sales"])
-app.include_router(production_router, prefix="/production", tags=["Production"])
-app.include_router(sop_router, prefix="/sop", tags=["S&OP"])
-app.include_router(inventory_router, prefix="/inventory", tags=["Inventory"])
-app.include_router(orders_router, prefix="/orders", tags=["Orders"])
-app.include_router(shipments_router, prefix="/shipments", tags=["Shipments"])
-app.include_router(decision_context_router,prefix="/api")
+
+# Every other route requires a bearer token
+protected = [Depends(get_current_user)]
+app.include_router(users_router, prefix="/users", tags=["Users"], dependencies=protected)
+app.include_router(sales_router, prefix="/sales", tags=["Sales"], dependencies=protected)
+app.include_router(production_router, prefix="/production", tags=["Production"], dependencies=protected)
+app.include_router(sop_router, prefix="/sop", tags=["S&OP"], dependencies=protected)
+app.include_router(inventory_router, prefix="/inventory", tags=["Inventory"], dependencies=protected)
+app.include_router(orders_router, prefix="/orders", tags=["Orders"], dependencies=protected)
+app.include_router(shipments_router, prefix="/shipments", tags=["Shipments"], dependencies=protected)
+app.include_router(decision_context_router,prefix="/api", dependencies=protected)
 
     
 
@@ -52,3 +52,9 @@ class DecisionContext(BaseModel):
                 ]
             }
         }
+
+
+class BatchContextRequest(BaseModel):
+    contexts: List[Context] = Field(..., min_length=1, max_length=1000, title="Contexts", description="Contexts to analyze")
+    persist: bool = Field(False, title="Persist", description="Save successful analyses as decision contexts with one insert_many")
+    concurrency: Optional[int] = Field(None, ge=1, le=64, title="Concurrency", description="Contexts analyzed at the same time (default: DECISION_BATCH_CONCURRENCY)")
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 
 class Inventory(BaseModel):
@@ -12,4 +12,64 @@ class Inventory(BaseModel):
     min_stock_level: int = Field(..., title="Minimum Stock Level", description="Minimum stock level")
     max_stock_level: int = Field(..., title="Maximum Stock Level", description="Maximum stock level")
     reorder_point: int = Field(..., title="Reorder Point", description="Reorder point")
-    batch_number: Optional[str] = Field(None, title="Batch Number", description="Batch number")
\ No newline at end of file
+    batch_number: Optional[str] = Field(None, title="Batch Number", description="Batch number")
+    below_reorder_point: Optional[bool] = Field(None, title="Below Reorder Point", description="Stock level is at or below the reorder point; maintained by the API")
+
+class StockMovement(BaseModel):
+    delta: int = Field(..., title="Delta", description="Units added (positive, e.g. a receipt) or removed (negative, e.g. a pick)")
+    reason: Optional[str] = Field(None, title="Reason", description="Why the stock moved, e.g. pick, receipt, adjustment; recorded in the record's movement_log")
+    movement_id: Optional[str] = Field(None, max_length=64, title="Movement ID", description="Client-generated ID; a retried movement with the same ID is applied once")
+
+
+class StockLevel(BaseModel):
+    id: str = Field(..., title="Inventory ID", description="Unique identifier for the inventory")
+    product_id: str = Field(..., title="Product ID", description="Foreign key from Products collection")
+    warehouse_id: Optional[str] = Field(None, title="Warehouse ID", description="Reference to Warehouses collection")
+    stock_level: int = Field(..., title="Stock Level", description="Stock quantity after the movement")
+    max_stock_level: int = Field(..., title="Maximum Stock Level", description="Maximum stock level")
+    below_reorder_point: Optional[bool] = Field(None, title="Below Reorder Point", description="Stock level is at or below the reorder point")
+
+
+class BulkStockMovementItem(StockMovement):
+    inventory_id: str = Field(..., title="Inventory ID", description="Inventory record the movement applies to")
+
+
+class BulkStockMovementRequest(BaseModel):
+    movements: List[BulkStockMovementItem] = Field(..., min_length=1, max_length=10000, title="Movements", description="Movements to apply; several for the same record are netted")
+    batch_id: Optional[str] = Field(None, max_length=64, title="Batch ID", description="Client-generated ID; retrying the same batch does not apply it twice")
+
+
+class RejectedStockMovement(BaseModel):
+    inventory_id: str = Field(..., title="Inventory ID", description="Inventory record whose movements were not applied")
+    delta: int = Field(..., title="Delta", description="Net delta that was rejected")
+    reason: str = Field(..., title="Reason", description="invalid_id, not_found or out_of_range")
+
+
+class BulkStockMovementResult(BaseModel):
+    batch_id: str = Field(..., title="Batch ID", description="ID recorded on every updated record")
+    movements: int = Field(..., title="Movements", description="Movements received")
+    items: int = Field(..., title="Items", description="Distinct inventory records targeted")
+    applied: int = Field(..., title="Applied", description="Records updated")
+    rejected: List[RejectedStockMovement] = Field(default_factory=list, title="Rejected", description="Records left unchanged and why")
+
+
+class ReorderItem(BaseModel):
+    inventory_id: str = Field(..., title="Inventory ID", description="Inventory record to replenish")
+    product_id: str = Field(..., title="Product ID", description="Foreign key from Products collection")
+    stock_level: int = Field(..., title="Stock Level", description="Current stock quantity")
+    reorder_point: int = Field(..., title="Reorder Point", description="Reorder point")
+    min_stock_level: int = Field(..., title="Minimum Stock Level", description="Minimum stock level")
+    max_stock_level: int = Field(..., title="Maximum Stock Level", description="Maximum stock level")
+    below_min_stock: bool = Field(..., title="Below Minimum Stock", description="Stock level is under the minimum stock level")
+    reorder_quantity: int = Field(..., title="Reorder Quantity", description="Units that bring the stock back to the maximum stock level")
+
+
+class WarehouseReorderList(BaseModel):
+    warehouse_id: Optional[str] = Field(None, title="Warehouse ID", description="Reference to Warehouses collection")
+    count: int = Field(..., title="Count", description="Records to reorder in this warehouse")
+    items: List[ReorderItem] = Field(..., title="Items", description="Records to reorder, by product")
+
+
+class ReorderList(BaseModel):
+    items: int = Field(..., title="Items", description="Records to reorder in total")
+    warehouses: List[WarehouseReorderList] = Field(..., title="Warehouses", description="Records to reorder per warehouse")
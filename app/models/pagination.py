@@ -0,0 +1,9 @@
+from pydantic import BaseModel, Field
+from typing import Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T] = Field(..., title="Items", description="Documents in this page")
+    next_cursor: Optional[str] = Field(None, title="Next Cursor", description="Cursor to pass as `after` for the next page, null on the last page")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime, UTC
 
 #sop plan Model 
@@ -11,9 +11,28 @@ class SOP(BaseModel):
     planned_production: int = Field(..., title="Planned Production", description="Planned production for the product")
     planned_inventory: int = Field(..., title="Planned Inventory", description="Planned inventory for the product")
     period: datetime = Field(..., title="Period", description="Period of the SOP")
+    period_unit: Optional[Literal["day", "week", "month"]] = Field(None, title="Period Unit", description="Size of the forecast periods")
     confidence_level: float = Field(..., title="Confidence Level", description="Confidence level of the SOP")
-    actual_demand: int = Field(..., title="Actual Demand", description="Actual demand for the product")
+    actual_demand: Optional[int] = Field(None, title="Actual Demand", description="Realized demand for the plan's forecast periods; unknown when the plan is made")
     revision_number: int = Field(..., title="Revision Number", description="Revision number of the SOP")
     notes: Optional[str] = Field(None, title="Notes", description="Notes for the SOP")
     production_capacity: List[dict] = Field(..., description="The production capacity for the product")
-    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC), title="Created At", description="Creation timestamp")
\ No newline at end of file
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC), title="Created At", description="Creation timestamp")
+    job_id: Optional[str] = Field(None, title="Job ID", description="S&OP job that generated the plan, if any")
+
+
+class SOPRequest(BaseModel):
+    product_ids: Optional[List[str]] = Field(None, title="Product IDs", description="Products to plan, all products when omitted")
+    start_date: Optional[datetime] = Field(None, title="Start Date", description="Only use history from this date (inclusive)")
+    end_date: Optional[datetime] = Field(None, title="End Date", description="Only use history up to this date (inclusive, whole day)")
+    period: Literal["day", "week", "month"] = Field("month", title="Period", description="Granularity of the demand and capacity buckets")
+    horizon: int = Field(3, ge=1, le=36, title="Horizon", description="Number of future periods to forecast")
+    model: Literal["auto", "moving_average", "ses", "holt", "holt_winters"] = Field("auto", title="Model", description="Forecasting model, auto picks the most accurate one per product")
+
+
+class BacktestRequest(SOPRequest):
+    models: List[Literal["moving_average", "ses", "holt", "holt_winters"]] = Field(
+        ["moving_average", "ses", "holt", "holt_winters"], min_length=1, title="Models", description="Forecasting models to compare"
+    )
+    min_train_periods: int = Field(12, ge=3, title="Minimum Training Periods", description="Periods of history before the first evaluation origin")
+    step: int = Field(1, ge=1, title="Step", description="Periods between consecutive evaluation origins")
@@ -1,12 +1,25 @@
 from fastapi import APIRouter, HTTPException, Depends
 from app.database import users_collection
 from app.models.users import UserCreate,UserBase,  TokenResponse,UserResponse,UserLogin
-from app.services.auth_service import hash_password, verify_password, create_access_token
+from app.services.auth_service import (
+    PasswordHasherBusy,
+    create_access_token,
+    hash_password_async,
+    needs_rehash,
+    password_hasher,
+    verify_password_async,
+)
+from app.dependencies import auth_cache_stats, get_current_user, invalidate_user
 from bson import ObjectId
 
 
 auth_router = APIRouter()
 
+
+def _busy(e: PasswordHasherBusy) -> HTTPException:
+    return HTTPException(status_code=503, detail=f"Authentication is busy, retry shortly: {e}", headers={"Retry-After": "1"})
+
+
 @auth_router.post("/register", response_model=TokenResponse)
 async def register_user(user: UserCreate):
     existing_user = await users_collection.find_one({"email": user.email})
@@ -15,11 +28,15 @@ async def register_user(user: UserCreate):
 
     
     user_data = user.model_dump()
-    user_data["password"] = hash_password(user.password)
+    try:
+        user_data["password"] = await hash_password_async(user.password)
+    except PasswordHasherBusy as e:
+        raise _busy(e)
     user_data["company_name"] = user.company_name
     user_data["_id"] = str(ObjectId())
 
     await users_collection.insert_one(user_data)
+    invalidate_user(user.email)
 
     token = create_access_token(user.email)
     return {"access_token": token, "token_type": "bearer"}
@@ -27,9 +44,24 @@ async def register_user(user: UserCreate):
 @auth_router.post("/login", response_model=TokenResponse)
 async def login_user(user: UserLogin):
     db_user = await users_collection.find_one({"email": user.email})
-    if not db_user or not verify_password(user.password, db_user["password"]):
-        raise HTTPException(status_code=401, detail="Invalid credentials")
-
+    try:
+        if not db_user or not await verify_password_async(user.password, db_user["password"]):
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        if needs_rehash(db_user["password"]):
+            # Move the stored hash to the current BCRYPT_ROUNDS while the password is at hand
+            await users_collection.update_one(
+                {"_id": db_user["_id"]}, {"$set": {"password": await hash_password_async(user.password)}}
+            )
+            invalidate_user(user.email)
+    except PasswordHasherBusy as e:
+        raise _busy(e)
 
     token = create_access_token(user.email)
     return {"access_token": token, "token_type": "bearer"}
+
+
+# The router stays open for register/login; the stats are not public
+@auth_router.get("/stats", dependencies=[Depends(get_current_user)])
+async def get_auth_stats():
+    """Queue depth, rejections and timings of the bcrypt thread pool, and token/user cache counters (requires a token)."""
+    return {**password_hasher.stats(), "cache": auth_cache_stats()}
@@ -1,9 +1,17 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
-from app.models.decisioncontext import DecisionContext, Context
-from app.services.llm_service import get_risks_and_decisions, get_best_decision
+from fastapi.responses import StreamingResponse
+from app.models.decisioncontext import DecisionContext, Context, BatchContextRequest
+from app.services.llm_service import get_risks_and_decisions, get_best_decision, in_flight_stats, scheduler_stats, stream_risks_and_decisions
+from app.services.llm_cache import response_cache
+from app.services.decision_index import decision_index
+from app.services.decision_batch import analyze_batch
+from app.services.decision_memory import get_decision_memory, memory_prompt_summary, record_decision_context, record_approval_change
 from app.routes.websockets import send_decision_update
 from app.database import database, decision_context_collection
+from app.dependencies import get_current_user
 import json
+import asyncio
+from typing import Optional
 from fastapi import Query
 from bson import ObjectId
 from fastapi import Body
@@ -12,15 +20,55 @@ from app.models.decisioncontext import ProblemRequest
 
 decision_context_router = APIRouter()
 
+BEST_DECISION_TOP_K = 8
+
+USER_ID_QUERY = Query(None, description="User ID; defaults to the authenticated user, whose ID or email it must be")
+
+
+def _own_user_id(user: dict, user_id: Optional[str] = None) -> str:
+    """
+    Resolve the user a decision-context request acts for: the authenticated caller.
+
+    Decision contexts are keyed by the user ID the client sends, which may be the caller's
+    ID or email (like the `user:<id>` WebSocket topics); anything else is another user's.
+
+    Raises:
+        HTTPException: 403 if `user_id` is not the caller's
+    """
+    if user_id is None:
+        return user["_id"]
+    user_id = user_id.strip("'").strip('"')
+    if user_id not in (user["_id"], user["email"]):
+        raise HTTPException(status_code=403, detail="Not allowed to act for another user")
+    return user_id
+
+
 @decision_context_router.post("/decision-context/submit/")
-async def submit_decision_context(context: Context, user_id: str = Query(..., description="User ID")):
+async def submit_decision_context(
+    context: Context,
+    user_id: Optional[str] = USER_ID_QUERY,
+    no_cache: bool = Query(False, description="Skip the response cache and always call the LLM"),
+    stream: bool = Query(False, description="Stream each risk/decision as a server-sent event as soon as it is parsed"),
+    user: dict = Depends(get_current_user),
+):
 
     """
     Send context to LLM and retrieve risks/decisions.
+    Identical contexts are answered from the response cache unless `no_cache` is set.
+    With `stream`, the response is `text/event-stream`: one `risk_decision` event per item,
+    then `done` (or `error`).
     This does NOT save data to the database yet.
     """
+    user_id = _own_user_id(user, user_id)
     print(context.model_dump())
-    llm_response = await get_risks_and_decisions(context.model_dump())
+    if stream:
+        return StreamingResponse(
+            _stream_decision_events(context, user_id, use_cache=not no_cache),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    llm_response = await get_risks_and_decisions(context.model_dump(), use_cache=not no_cache)
     risks_decisions = llm_response
     
     if "error" in llm_response:
@@ -34,35 +82,89 @@ async def submit_decision_context(context: Context, user_id: str = Query(..., de
 
     return response_data
 
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _stream_decision_events(context: Context, user_id: str, use_cache: bool):
+    count = 0
+    async for item in stream_risks_and_decisions(context.model_dump(), use_cache=use_cache):
+        if "error" in item:
+            yield _sse("error", {"detail": item["error"]})
+            return
+        yield _sse("risk_decision", {"index": count, **item})
+        await send_decision_update({"user_id": user_id, "index": count, "risk_decision": item})
+        count += 1
+    yield _sse("done", {"count": count})
+
+
+@decision_context_router.post("/decision-context/batch/")
+async def submit_decision_context_batch(
+    batch: BatchContextRequest,
+    user_id: Optional[str] = USER_ID_QUERY,
+    no_cache: bool = Query(False, description="Skip the response cache and always call the LLM"),
+    user: dict = Depends(get_current_user),
+):
+    """
+    Analyze many contexts at once with bounded concurrency.
+    The response is NDJSON: one line per context as soon as it finishes ({"index", "risks_decisions"}
+    or {"index", "error"}), then a {"summary"} line. With `persist`, successful analyses are saved
+    as decision contexts with a single insert_many.
+    """
+    user_id = _own_user_id(user, user_id)
+    results = analyze_batch(
+        batch.contexts, user_id, concurrency=batch.concurrency, persist=batch.persist, use_cache=not no_cache
+    )
+    return StreamingResponse(
+        (json.dumps(result, default=str) + "\n" async for result in results),
+        media_type="application/x-ndjson",
+    )
+
+
 @decision_context_router.post("/decision-context/best-decision/")
 async def get_best_decision_endpoint(
     problem_request: ProblemRequest = Body(..., description="The problem description in the request body"),
-    user_id: str = Query(..., description="User ID")
+    user_id: Optional[str] = USER_ID_QUERY,
+    top_k: int = Query(BEST_DECISION_TOP_K, ge=1, le=50, description="Number of relevant past contexts sent to the LLM"),
+    user: dict = Depends(get_current_user),
 ):
     # Extract the problem from the request body
-    problem = problem_request
+    problem = problem_request.problem
+
+    user_id = _own_user_id(user, user_id)
 
-    # Clean up the user_id (remove accidental quotes)
-    if isinstance(user_id, str):
-        user_id = user_id.strip("'")
-    
     print(f"🔍 Searching for user_id: '{user_id}'")  # Debugging print
 
-    # Fetch all decision contexts for the user
-    decision_contexts = await database.decision_context_collection.find({"user_id": user_id}).to_list(None)
-    if not decision_contexts:
+    # A fixed-size summary of the whole history plus only the most relevant past contexts go into the prompt
+    matches, memory = await asyncio.gather(decision_index.search(user_id, problem, top_k), get_decision_memory(user_id))
+    if not matches:
         raise HTTPException(status_code=404, detail="No decision contexts found for this user")
 
+    ranked_ids = [doc_id for doc_id, _ in matches]
+    documents = await decision_context_collection.find(
+        {"_id": {"$in": ranked_ids}}, {"date": 1, "context": 1, "risks_decisions": 1}
+    ).to_list(len(ranked_ids))
+    by_id = {document["_id"]: document for document in documents}
+    decision_contexts = [by_id[doc_id] for doc_id in ranked_ids if doc_id in by_id]
+
     # Get the best decision
-    best_decision = await get_best_decision(problem, decision_contexts)
+    best_decision = await get_best_decision(
+        problem, decision_contexts, memory_prompt_summary(memory) if memory else None
+    )
     return best_decision
     
 
 
 
+@decision_context_router.get("/decision-context/cache-stats")
+async def get_decision_context_cache_stats():
+    """Hit/miss counters of the LLM response cache, coalescing of in-flight calls and scheduler metrics."""
+    return {**response_cache.stats(), "single_flight": in_flight_stats(), "scheduler": scheduler_stats()}
+
+
 @decision_context_router.get("/decision-contexts/user")
-async def get_all_decision_contexts_for_user(user_id: str = Query(..., description="User ID")):
-    user_id = user_id.strip("'").strip('"')  
+async def get_all_decision_contexts_for_user(user_id: Optional[str] = USER_ID_QUERY, user: dict = Depends(get_current_user)):
+    user_id = _own_user_id(user, user_id)
 
     print(f"🔍 Searching for user_id: '{user_id}'")  # Debugging print
 
@@ -80,9 +182,45 @@ async def get_all_decision_contexts_for_user(user_id: str = Query(..., descripti
 
 #create a new decision context
 @decision_context_router.post("/decision-context/create/")
-async def create_decision_context(decision_context: DecisionContext):
-    await database.decision_context_collection.insert_one(decision_context.model_dump())
-    return decision_context
+async def create_decision_context(decision_context: DecisionContext, user: dict = Depends(get_current_user)):
+    _own_user_id(user, decision_context.user_id)
+    # MongoDB assigns the `_id`; it is the context_id used by the approval endpoint
+    document = decision_context.model_dump(exclude={"id"})
+    result = await database.decision_context_collection.insert_one(document)
+    await decision_index.add(decision_context.user_id, result.inserted_id, document)
+    await record_decision_context(document, result.inserted_id)
+    return decision_context.model_copy(update={"id": str(result.inserted_id)})
+
+
+@decision_context_router.patch("/decision-context/{context_id}/risks-decisions/{index}/approval")
+async def set_decision_approval(
+    context_id: str,
+    index: int,
+    approved: bool = Query(..., description="New approval state of the risk/decision"),
+    user: dict = Depends(get_current_user),
+):
+    """Approve or unapprove one risk/decision of one of the caller's decision contexts and update their decision memory."""
+    if not ObjectId.is_valid(context_id) or index < 0:
+        raise HTTPException(status_code=400, detail="Invalid decision context id or index")
+
+    field = f"risks_decisions.{index}"
+    owner = {"user_id": {"$in": [user["_id"], user["email"]]}}
+    # Only matches when the value flips, so a repeated call cannot count an approval twice
+    before = await decision_context_collection.find_one_and_update(
+        {"_id": ObjectId(context_id), **owner, field: {"$exists": True}, f"{field}.approved": {"$ne": approved}},
+        {"$set": {f"{field}.approved": approved}},
+        projection={"user_id": 1, "date": 1, "risks_decisions": 1},
+    )
+    if before is None:
+        # Another user's context is reported as missing
+        exists = await decision_context_collection.count_documents({"_id": ObjectId(context_id), **owner, field: {"$exists": True}}, limit=1)
+        if not exists:
+            raise HTTPException(status_code=404, detail="Decision context or risk/decision not found")
+        return {"context_id": context_id, "index": index, "approved": approved, "changed": False}
+
+    item = before["risks_decisions"][index]
+    await record_approval_change(before["user_id"], context_id, index, item, approved, before.get("date"))
+    return {"context_id": context_id, "index": index, "approved": approved, "changed": True}
 
 
 
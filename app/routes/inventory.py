@@ -9,15 +9,24 @@ Endpoints:
     - GET /inventory/{inventory_id}: Retrieve specific inventory
     - PUT /inventory/{inventory_id}: Update inventory record
     - DELETE /inventory/{inventory_id}: Remove inventory record
-    - GET /inventory: List all inventory records
+    - GET /inventory: List inventory records (cursor paginated, optional NDJSON stream)
+    - GET /inventory/reorder: Records at or below their reorder point, per warehouse
+    - POST /inventory/{inventory_id}/movements: Atomically add or remove stock
+    - POST /inventory/movements/bulk: Apply many stock movements with one bulk write
 """
 
 #crud for inventory
-from fastapi import APIRouter, HTTPException
-from app.models.inventory import Inventory
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from app.models.inventory import Inventory, StockMovement, StockLevel, BulkStockMovementRequest, BulkStockMovementResult, ReorderList
+from app.models.pagination import Page
 from app.database import inventory_collection
+from app.services.pagination import paginate, stream_ndjson, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.services.stock_service import apply_stock_movement, apply_stock_movements
+from app.services.low_stock import get_reorder_list, is_below_reorder_point, publish_crossings
 from bson import ObjectId
-from datetime import datetime
+from pymongo import ReturnDocument
+from datetime import datetime, UTC
 
 
 inventory_router = APIRouter()
@@ -37,12 +46,30 @@ async def create_inventory(inventory: Inventory):
         HTTPException: If creation fails
     """
     inventory_dict = inventory.model_dump()
-    inventory_dict["created_at"] = datetime.now(datetime.UTC)
+    inventory_dict["created_at"] = datetime.now(UTC)
+    inventory_dict["below_reorder_point"] = is_below_reorder_point(inventory_dict)
 
     new_inventory = await inventory_collection.insert_one(inventory_dict)
+    if inventory_dict["below_reorder_point"]:
+        # A record created at or below its reorder point needs reordering right away
+        publish_crossings([inventory_dict])
     return Inventory(**inventory_dict, id=str(new_inventory.inserted_id))
 
 
+@inventory_router.get("/inventory/reorder", response_model=ReorderList)
+async def get_reorder_items(
+    warehouse_id: Optional[str] = Query(None, description="Only this warehouse"),
+):
+    """
+    List the records at or below their reorder point, grouped per warehouse, with the
+    quantity that brings each back to its maximum stock level.
+
+    Returns:
+        ReorderList: Records to reorder per warehouse
+    """
+    return await get_reorder_list(warehouse_id)
+
+
 @inventory_router.get("/inventory/{inventory_id}", response_model=Inventory)
 async def get_inventory(inventory_id: str):
     inventory = await inventory_collection.find_one({"_id": ObjectId(inventory_id)})
@@ -56,8 +83,16 @@ async def get_inventory(inventory_id: str):
 async def update_inventory(inventory_id: str, inventory: Inventory):
     inventory_dict = inventory.model_dump()
 
-    inventory_dict["updated_at"] = datetime.now(datetime.UTC)
-    await inventory_collection.update_one({"_id": ObjectId(inventory_id)}, {"$set": inventory_dict})
+    inventory_dict["updated_at"] = datetime.now(UTC)
+    inventory_dict["below_reorder_point"] = is_below_reorder_point(inventory_dict)
+    before = await inventory_collection.find_one_and_update(
+        {"_id": ObjectId(inventory_id)},
+        {"$set": inventory_dict},
+        projection={"below_reorder_point": 1},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if before is not None and bool(before.get("below_reorder_point")) != inventory_dict["below_reorder_point"]:
+        publish_crossings([{**inventory_dict, "_id": before["_id"]}])
     return Inventory(**inventory_dict, id=str(inventory_id))
 
 
@@ -71,14 +106,64 @@ async def delete_inventory(inventory_id: str):
     return Inventory(**inventory)
 
 
-@inventory_router.get("/inventory", response_model=list[Inventory])
-async def get_inventory_list():
-    inventory = await inventory_collection.find().to_list(100)
+@inventory_router.get("/inventory", response_model=Page[Inventory])
+async def get_inventory_list(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of records in the page"),
+    after: Optional[str] = Query(None, description="Cursor returned as `next_cursor` by the previous page"),
+    stream: bool = Query(False, description="Stream every record as NDJSON instead of returning a page"),
+):
+    """
+    List inventory records with keyset pagination, or stream all of them as NDJSON.
+
+    Returns:
+        Page[Inventory]: Records in this page and the cursor of the next one
+    """
+    if stream:
+        return stream_ndjson(inventory_collection, lambda inventory: Inventory(**inventory), after=after)
+    return await paginate(inventory_collection, lambda inventory: Inventory(**inventory), limit=limit, after=after)
+
+
+@inventory_router.post("/inventory/movements/bulk", response_model=BulkStockMovementResult)
+async def move_stock_bulk(request: BulkStockMovementRequest):
+    """
+    Apply many stock movements with one unordered bulk write.
 
-    return [Inventory(**inventory) for inventory in inventory]
+    Movements for the same record are netted; each record is either fully updated or listed
+    in `rejected`. Retrying with the same `batch_id` does not apply a movement twice.
 
+    Returns:
+        BulkStockMovementResult: Counts and the records left unchanged
+    """
+    return await apply_stock_movements(
+        [movement.model_dump() for movement in request.movements], batch_id=request.batch_id
+    )
 
 
+@inventory_router.post("/inventory/{inventory_id}/movements", response_model=StockLevel)
+async def move_stock(inventory_id: str, movement: StockMovement):
+    """
+    Atomically add (positive `delta`) or remove (negative `delta`) stock.
 
+    Unlike PUT, concurrent movements never overwrite each other. Stock cannot go below zero
+    or above `max_stock_level`.
 
+    Returns:
+        StockLevel: The stock level after the movement
 
+    Raises:
+        HTTPException: 400 for an invalid ID, 404 if the record does not exist, 409 if the
+            movement would leave the allowed range
+    """
+    result = await apply_stock_movement(inventory_id, movement.delta, movement.movement_id, reason=movement.reason)
+    error = result.get("error")
+    if error == "invalid_id":
+        raise HTTPException(status_code=400, detail="Invalid inventory ID")
+    if error == "not_found":
+        raise HTTPException(status_code=404, detail="Inventory not found")
+    if error == "out_of_range":
+        current = result["current"]
+        raise HTTPException(
+            status_code=409,
+            detail=f"Stock would leave 0..{current['max_stock_level']}: level {current['stock_level']}, delta {movement.delta}",
+        )
+    return result
@@ -9,16 +9,19 @@ Endpoints:
     - GET /orders/{order_id}: Retrieve specific order
     - PUT /orders/{order_id}: Update order
     - DELETE /orders/{order_id}: Remove order
-    - GET /orders: List all orders
+    - GET /orders: List orders (cursor paginated, optional NDJSON stream)
 """
 
 # crud for orders
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
 from app.models.orders import Order
+from app.models.pagination import Page
 from app.database import orders_collection
+from app.services.pagination import paginate, stream_ndjson, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, UTC
 
 orders_router = APIRouter()
 
@@ -37,7 +40,7 @@ async def create_order(order: Order):
         HTTPException: If creation fails
     """
     order_dict = order.model_dump()
-    order_dict["created_at"] = datetime.now(datetime.UTC)
+    order_dict["created_at"] = datetime.now(UTC)
 
     new_order = await orders_collection.insert_one(order_dict)
     return Order(**order_dict, id=str(new_order.inserted_id))
@@ -56,7 +59,7 @@ async def get_order(order_id: str):
 async def update_order(order_id: str, order: Order):
     order_dict = order.model_dump()
 
-    order_dict["updated_at"] = datetime.now(datetime.UTC)
+    order_dict["updated_at"] = datetime.now(UTC)
     await orders_collection.update_one({"_id": ObjectId(order_id)}, {"$set": order_dict})
     return Order(**order_dict, id=str(order_id))
 
@@ -70,10 +73,21 @@ async def delete_order(order_id: str):
     return Order(**order)
 
 
-@orders_router.get("/orders", response_model=list[Order])
-async def get_orders():
-    orders = await orders_collection.find().to_list(100)
-    return [Order(**order) for order in orders]
+@orders_router.get("/orders", response_model=Page[Order])
+async def get_orders(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of orders in the page"),
+    after: Optional[str] = Query(None, description="Cursor returned as `next_cursor` by the previous page"),
+    stream: bool = Query(False, description="Stream every order as NDJSON instead of returning a page"),
+):
+    """
+    List orders with keyset pagination, or stream all of them as NDJSON.
+
+    Returns:
+        Page[Order]: Orders in this page and the cursor of the next one
+    """
+    if stream:
+        return stream_ndjson(orders_collection, lambda order: Order(**order), after=after)
+    return await paginate(orders_collection, lambda order: Order(**order), limit=limit, after=after)
 
 
 
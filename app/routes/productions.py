@@ -1,5 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
+from typing import Optional
 from app.database import production_collection
+from app.services.rollup_service import record_production
+from app.services.pagination import paginate, stream_ndjson, stringify_id, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from app.models.productions import Production
 import datetime
 from datetime import UTC
@@ -14,12 +17,18 @@ async def add_production(production: Production):
     production_dict = production.model_dump()
     production_dict["date"] = datetime.datetime.now(UTC)
     new_production = await production_collection.insert_one(production_dict)
+    await record_production(production_dict)
     return {"message": "Production recorded", "production_id": str(new_production.inserted_id)}
 
 
 @production_router.get("/production")
-async def get_production():
-    production = await production_collection.find().to_list(100)
-    return production
+async def get_production(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of records in the page"),
+    after: Optional[str] = Query(None, description="Cursor returned as `next_cursor` by the previous page"),
+    stream: bool = Query(False, description="Stream every record as NDJSON instead of returning a page"),
+):
+    if stream:
+        return stream_ndjson(production_collection, stringify_id, after=after)
+    return await paginate(production_collection, stringify_id, limit=limit, after=after)
 
 
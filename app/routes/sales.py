@@ -1,6 +1,9 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from typing import Optional
 from app.database import sales_collection
 from app.models.sales import Sale
+from app.services.rollup_service import record_sale
+from app.services.pagination import paginate, stream_ndjson, stringify_id, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from bson import ObjectId
 import datetime
 
@@ -13,10 +16,15 @@ async def add_sale(sale: Sale):
     sale_dict = sale.model_dump()
     sale_dict["date"] = datetime.datetime.now(datetime.UTC)
     new_sale = await sales_collection.insert_one(sale_dict)
+    await record_sale(sale_dict)
     return {"message": "Sale recorded", "sale_id": str(new_sale.inserted_id)}
 
 @sales_router.get("/sales")
-async def get_sales():
-    sales = await sales_collection.find().to_list(100)
-
-    return sales
+async def get_sales(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of sales in the page"),
+    after: Optional[str] = Query(None, description="Cursor returned as `next_cursor` by the previous page"),
+    stream: bool = Query(False, description="Stream every sale as NDJSON instead of returning a page"),
+):
+    if stream:
+        return stream_ndjson(sales_collection, stringify_id, after=after)
+    return await paginate(sales_collection, stringify_id, limit=limit, after=after)
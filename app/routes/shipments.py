@@ -1,10 +1,13 @@
 #crud for shipments
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
 from app.models.shipments import Shipment
+from app.models.pagination import Page
 from app.database import shipments_collection
+from app.services.pagination import paginate, stream_ndjson, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, UTC
 
 
 shipments_router = APIRouter()
@@ -12,7 +15,7 @@ shipments_router = APIRouter()
 @shipments_router.post("/shipments", response_model=Shipment)
 async def create_shipment(shipment: Shipment):
     shipment_dict = shipment.model_dump()
-    shipment_dict["created_at"] = datetime.now(datetime.UTC)
+    shipment_dict["created_at"] = datetime.now(UTC)
 
     new_shipment = await shipments_collection.insert_one(shipment_dict)
     return Shipment(**shipment_dict, id=str(new_shipment.inserted_id))
@@ -30,7 +33,7 @@ async def get_shipment(shipment_id: str):
 @shipments_router.put("/shipments/{shipment_id}", response_model=Shipment)
 async def update_shipment(shipment_id: str, shipment: Shipment):
     shipment_dict = shipment.model_dump()
-    shipment_dict["updated_at"] = datetime.now(datetime.UTC)
+    shipment_dict["updated_at"] = datetime.now(UTC)
 
     await shipments_collection.update_one({"_id": ObjectId(shipment_id)}, {"$set": shipment_dict})
     return Shipment(**shipment_dict, id=str(shipment_id))
@@ -46,11 +49,15 @@ async def delete_shipment(shipment_id: str):
     return Shipment(**shipment)
 
 
-@shipments_router.get("/shipments", response_model=list[Shipment])
-async def get_shipments():
-    shipments = await shipments_collection.find().to_list(100)
-
-    return [Shipment(**shipment) for shipment in shipments]
+@shipments_router.get("/shipments", response_model=Page[Shipment])
+async def get_shipments(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of shipments in the page"),
+    after: Optional[str] = Query(None, description="Cursor returned as `next_cursor` by the previous page"),
+    stream: bool = Query(False, description="Stream every shipment as NDJSON instead of returning a page"),
+):
+    if stream:
+        return stream_ndjson(shipments_collection, lambda shipment: Shipment(**shipment), after=after)
+    return await paginate(shipments_collection, lambda shipment: Shipment(**shipment), limit=limit, after=after)
 
 
 
@@ -1,38 +1,69 @@
-from fastapi import APIRouter
-from app.database import sales_collection, production_collection, sop_collection
-from app.models.sop import SOP
-import datetime
-from datetime import UTC
+from fastapi import APIRouter, Body, HTTPException, Query
+from typing import Literal, Optional
+from app.database import sop_collection, sop_jobs_collection
+from app.models.sop import SOPRequest, BacktestRequest
+from app.services.sop_service import generate_sop_plans
+from app.services.sop_jobs import start_sop_job
+from app.services.backtesting import run_backtest
+from app.services.pagination import paginate, stringify_id, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 sop_router = APIRouter()
 
 
 @sop_router.post("/sop")
-async def generate_sop_plan():
+async def generate_sop_plan(
+    request: SOPRequest = Body(default_factory=SOPRequest),
+    mode: Literal["sync", "job"] = Query("sync", description="`job` returns a job ID right away and plans in the background"),
+):
+    """
+    Generate S&OP plans from sales and production history.
 
-    # Récupération des ventes et productions
-    sales = await sales_collection.find().to_list(100)
-    production = await production_collection.find().to_list(100)
+    Demand and capacity are aggregated per product and per period on the MongoDB server
+    over the full history, optionally restricted to some products and a date range.
+    Large catalogs should use `mode=job`, which shards the work by product_id across a
+    process pool.
+    """
+    if mode == "job":
+        job_id = await start_sop_job(request)
+        return {"message": "S&OP job queued", "job_id": job_id, "status_url": f"/sop/sop/jobs/{job_id}"}
 
-    forecasted_demand = {}
-    production_capacity = {}
+    sop_plans = await generate_sop_plans(request)
+    if not sop_plans:
+        raise HTTPException(status_code=404, detail="No sales or production data for the requested filters")
 
-    # Agrégation des données
-    for sale in sales:
-        product = sale["product_id"]
-        forecasted_demand[product] = forecasted_demand.get(product, 0) + sale["quantity"]
+    return {"message": "S&OP Plan created", "sop_plans": sop_plans}
 
-    for prod in production:
-        product = prod["product_id"]
-        production_capacity[product] = production_capacity.get(product, 0) + prod["quantity_produced"]
 
-    # Création du plan
-    sop_plan = SOP(
-        forecasted_demand=forecasted_demand,
-        production_capacity=production_capacity
-    )
+@sop_router.get("/sop/jobs/{job_id}")
+async def get_sop_job(job_id: str):
+    job = await sop_jobs_collection.find_one({"_id": job_id})
+    if not job:
+        raise HTTPException(status_code=404, detail="S&OP job not found")
+    return job
 
 
-    await sop_collection.insert_one(sop_plan.model_dump())
+@sop_router.get("/sop/jobs/{job_id}/result")
+async def get_sop_job_result(
+    job_id: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of plans in the page"),
+    after: Optional[str] = Query(None, description="Cursor returned as `next_cursor` by the previous page"),
+):
+    job = await sop_jobs_collection.find_one({"_id": job_id}, {"status": 1})
+    if not job:
+        raise HTTPException(status_code=404, detail="S&OP job not found")
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"S&OP job is {job['status']}")
 
-    return {"message": "S&OP Plan created", "sop_plan": sop_plan.model_dump()}
+    return await paginate(sop_collection, stringify_id, limit=limit, after=after, query={"job_id": job_id})
+
+
+@sop_router.post("/sop/backtest")
+async def backtest_sop(request: BacktestRequest = Body(default_factory=BacktestRequest)):
+    """
+    Measure forecast accuracy (MAPE, bias, WAPE).
+
+    Each elapsed forecast period of the stored plans is scored against the demand realized in
+    that period, per product and per revision, and the requested models are compared with a
+    rolling-origin backtest over the demand history.
+    """
+    return await run_backtest(request)
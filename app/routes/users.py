@@ -1,16 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
 from app.database import users_collection
 from app.models.users import UserResponse
+from app.models.pagination import Page
+from app.services.pagination import paginate, stream_ndjson, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from bson import ObjectId
 
 users_router = APIRouter()
 
-@users_router.get("/users", response_model=list[UserResponse])
-async def get_users():
+def _user_response(user: dict) -> dict:
+    return {"id": str(user["_id"]), "email": user["email"], "company_name": user["company_name"]}
 
-
-    users = await users_collection.find().to_list(100)
-    return [{"id": str(user["_id"]), "email": user["email"], "company_name": user["company_name"]} for user in users]
+@users_router.get("/users", response_model=Page[UserResponse])
+async def get_users(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of users in the page"),
+    after: Optional[str] = Query(None, description="Cursor returned as `next_cursor` by the previous page"),
+    stream: bool = Query(False, description="Stream every user as NDJSON instead of returning a page"),
+):
+    # Only the public fields are read, password hashes never leave the database
+    projection = {"email": 1, "company_name": 1}
+    if stream:
+        return stream_ndjson(users_collection, _user_response, after=after, projection=projection)
+    return await paginate(users_collection, _user_response, limit=limit, after=after, projection=projection)
 
 @users_router.get("/users/{user_id}", response_model=UserResponse)
 async def get_user(user_id: str):
@@ -1,35 +1,109 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import List
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Query
+from typing import Optional, Union
+import json
+from app.dependencies import authenticate_token
+from app.services.websocket_manager import manager
+from app.services.change_feed import change_feed
 
 websocket_router = APIRouter()
 
-class WebSocketManager:
-    def __init__(self):
 
-        self.active_connections: List[WebSocket] = []
+CLOSE_POLICY_VIOLATION = 1008
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
+try:
+    import msgpack
+except ImportError:  # only needed by clients that negotiated the msgpack protocol
+    msgpack = None
 
-    async def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
 
-    async def send_message(self, message: dict):
-        for connection in self.active_connections:
-            await connection.send_json(message)
+def _forbidden_topics(user: dict, topics: list) -> list:
+    # user:<id> topics carry one user's decisions: only that user, by id or email, may subscribe
+    own = {f"user:{user['_id']}", f"user:{user['email']}"}
+    return [topic for topic in topics if isinstance(topic, str) and topic.startswith("user:") and topic not in own]
+
+
+def _decode_client_message(websocket: WebSocket, data: Union[str, bytes]):
+    # Binary frames are msgpack on a msgpack connection and UTF-8 JSON otherwise
+    if isinstance(data, bytes) and msgpack is not None and manager.active_connections[websocket].protocol == "msgpack":
+        try:
+            return msgpack.unpackb(data, raw=False)
+        except Exception as e:
+            raise ValueError(f"Invalid msgpack frame: {e}")
+    return json.loads(data)
+
+
+def _handle_client_message(websocket: WebSocket, user: dict, data: Union[str, bytes]):
+    """
+    Apply a client control message (a JSON text frame whatever the negotiated protocol, or a
+    binary frame: msgpack on a msgpack connection, UTF-8 JSON otherwise):
+        {"action": "subscribe" | "unsubscribe", "topics": ["user:<id>", "inventory", "shipments:<order_id>", "sop_jobs"]}
+    and queue the reply ({"type": "subscriptions", "topics": [...]} or {"type": "error", "detail": ...}).
+    {"action": "pong"} answers a heartbeat ping and gets no reply.
+    """
+    manager.touch(websocket)
+    try:
+        request = _decode_client_message(websocket, data)
+        action, topics = request.get("action"), request.get("topics", [])
+        if action == "pong":
+            return
+        if action not in ("subscribe", "unsubscribe") or not isinstance(topics, list):
+            raise ValueError("Expected {\"action\": \"subscribe\" | \"unsubscribe\", \"topics\": [...]}")
+        if action == "subscribe":
+            forbidden = _forbidden_topics(user, topics)
+            if forbidden:
+                raise ValueError(f"Not allowed to subscribe to: {', '.join(forbidden)}")
+            current = manager.subscribe(websocket, topics)
+        else:
+            current = manager.unsubscribe(websocket, topics)
+    except (ValueError, AttributeError) as e:
+        manager.send(websocket, {"type": "error", "detail": str(e)})
+        return
+    manager.send(websocket, {"type": "subscriptions", "topics": current})
 
-manager = WebSocketManager()
 
 @websocket_router.websocket("/ws/decisions")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+async def websocket_endpoint(
+    websocket: WebSocket,
+    topics: Optional[str] = Query(None, description="Comma-separated topics to subscribe to on connect"),
+    token: Optional[str] = Query(None, description="Access token; browsers cannot set an Authorization header on WebSockets"),
+):
+    authorization = websocket.headers.get("authorization", "")
+    if not token and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
     try:
+        user = await authenticate_token(token)
+    except HTTPException:
+        # Closing before accept rejects the handshake
+        await websocket.close(code=CLOSE_POLICY_VIOLATION)
+        return
+
+    await manager.connect(websocket, manager.negotiate(websocket.scope.get("subprotocols", [])))
+    try:
+        if topics:
+            _handle_client_message(websocket, user, json.dumps({"action": "subscribe", "topics": topics.split(",")}))
 
         while True:
-            await websocket.receive_text()  # Keep connection open
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            text = message.get("text")
+            _handle_client_message(websocket, user, text if text is not None else message.get("bytes") or b"")
     except WebSocketDisconnect:
+        pass
+    finally:
         await manager.disconnect(websocket)
 
+
+@websocket_router.get("/stats")
+async def get_websocket_stats():
+    """Connection, subscription, queued message and drop/eviction counters of the WebSocket fan-out, backplane relay and change feed counters."""
+    return {
+        **manager.stats(),
+        "backplane": manager.backplane.stats() if manager.backplane else None,
+        "change_feed": change_feed.stats(),
+    }
+
+
 async def send_decision_update(message: dict):
-    await manager.send_message(message)
+    # Only the subscribers of the user's topic receive it; delivery happens in each connection's sender task
+    manager.publish(f"user:{message['user_id']}", message)
@@ -4,6 +4,12 @@ Authentication Service Module
 This module handles all authentication-related functionality including password hashing,
 verification, and JWT token generation.
 
+A bcrypt hash or check takes 100-300 ms of CPU. Called from an async handler it would stall
+every request and WebSocket of the worker, so the handlers use `hash_password_async` and
+`verify_password_async`, which run bcrypt on a dedicated thread pool (bcrypt releases the
+GIL while hashing). At most BCRYPT_WORKERS hashes run at once, and when BCRYPT_MAX_QUEUE calls
+are already waiting, new ones fail fast with `PasswordHasherBusy` instead of piling up.
+
 Dependencies:
     - bcrypt: For password hashing
     - PyJWT: For JWT token handling
@@ -11,20 +17,35 @@ Dependencies:
 
 Environment Variables Required:
     - SECRET_KEY: Secret key for JWT token signing
+
+Environment Variables:
+    - BCRYPT_ROUNDS: bcrypt cost factor of new hashes; existing hashes are upgraded on login (default: 12)
+    - BCRYPT_WORKERS: Threads hashing passwords (default: min(4, CPU count))
+    - BCRYPT_MAX_QUEUE: Calls allowed to wait for a thread before new ones are rejected (default: 256)
 """
 
+import asyncio
 import bcrypt
 import jwt
 import datetime
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
 from dotenv import load_dotenv 
 from datetime import datetime, timedelta
 
 load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY")
-print(SECRET_KEY)
 ALGORITHM = "HS256"
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(min(4, os.cpu_count() or 1))))
+BCRYPT_MAX_QUEUE = int(os.getenv("BCRYPT_MAX_QUEUE", "256"))
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many password hashes are already waiting for a thread."""
 
 def hash_password(password: str) -> str:
     """
@@ -42,7 +63,7 @@ def hash_password(password: str) -> str:
     # Convert the password to bytes
     password_bytes = password.encode('utf-8')
     # Generate salt and hash the password
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     # Return the hash as a string
     return hashed.decode('utf-8')
@@ -67,6 +88,114 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     # Verify the password
     return bcrypt.checkpw(password_bytes, hashed_bytes)
 
+def needs_rehash(hashed_password: str) -> bool:
+    """Return True if a hash was made with a cost factor other than BCRYPT_ROUNDS."""
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+
+class PasswordHasher:
+    """
+    Bounded thread pool running bcrypt off the event loop, with queue-depth metrics.
+
+    Example:
+        >>> hasher = PasswordHasher(workers=4, max_queue=64)
+        >>> hashed = await hasher.run(hash_password, "mypassword123")
+    """
+
+    def __init__(self, workers: int = BCRYPT_WORKERS, max_queue: int = BCRYPT_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        self.running = 0
+        self.peak_waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+            self._slots = asyncio.Semaphore(self.workers)
+        return self._executor
+
+    async def run(self, function, *args):
+        """
+        Run a blocking bcrypt call on the pool and return its result.
+
+        Raises:
+            PasswordHasherBusy: If BCRYPT_MAX_QUEUE calls are already waiting
+        """
+        executor = self._pool()
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusy(f"{self.waiting} password hashes already waiting")
+
+        queued = time.perf_counter()
+        self.waiting += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+        try:
+            # Threads are only handed work they can start at once, so `waiting` is the real queue
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        started = time.perf_counter()
+        self.running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+        finally:
+            self.running -= 1
+            self._slots.release()
+            self.completed += 1
+            self.total_wait += started - queued
+            self.total_run += time.perf_counter() - started
+
+    def shutdown(self):
+        """Stop the threads on app shutdown."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._slots = None
+
+    def stats(self) -> Dict[str, object]:
+        """Return pool size, queue depth and timing counters."""
+        return {
+            "workers": self.workers,
+            "rounds": BCRYPT_ROUNDS,
+            "running": self.running,
+            "waiting": self.waiting,
+            "peak_waiting": self.peak_waiting,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait / self.completed * 1000, 2) if self.completed else 0.0,
+            "avg_hash_ms": round(self.total_run / self.completed * 1000, 2) if self.completed else 0.0,
+        }
+
+
+password_hasher = PasswordHasher()
+
+
+async def hash_password_async(password: str) -> str:
+    """`hash_password` on the bcrypt thread pool, for async handlers."""
+    return await password_hasher.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """`verify_password` on the bcrypt thread pool, for async handlers."""
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+
+def shutdown_password_hasher():
+    """Stop the bcrypt threads on app shutdown."""
+    password_hasher.shutdown()
+
+
 def create_access_token(email: str):
     """
     Create a JWT access token for a user.
@@ -86,3 +215,23 @@ def create_access_token(email: str):
     expire = datetime.utcnow() + timedelta(days=1)
     payload = {"sub": email, "exp": expire}
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def decode_access_token(token: str) -> dict:
+    """
+    Verify a JWT access token and return its claims.
+
+    Args:
+        token (str): Token issued by `create_access_token`
+
+    Returns:
+        dict: The claims, with the user's email in "sub" and the expiry timestamp in "exp"
+
+    Raises:
+        jwt.InvalidTokenError: If the signature is wrong, the token expired or a claim is missing
+
+    Example:
+        >>> decode_access_token(create_access_token("user@example.com"))["sub"]
+        'user@example.com'
+    """
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"require": ["sub", "exp"]})
@@ -0,0 +1,243 @@
+"""
+WebSocket Backplane Module
+
+This module relays WebSocket events between API workers. `WebSocketManager` only knows the
+sockets of its own process, so with several uvicorn workers or replicas an event published
+in one process would never reach clients connected to another.
+
+Every published event is delivered to the local subscribers at once and also buffered for
+the backplane. The buffer is flushed as one broker message per WS_BACKPLANE_FLUSH_MS (or
+sooner when WS_BACKPLANE_BATCH events are waiting), and every other worker relays the events
+of each batch it receives to its own local subscribers. A worker ignores its own batches.
+
+Implementations:
+    - memory: In-process bus, for a single worker and for tests (several instances in one
+      process behave like separate workers)
+    - kafka: One Kafka topic consumed by every worker without a consumer group, so each
+      worker sees every batch; requires `aiokafka`
+
+Batch message:
+    {"origin": worker_id, "events": [[topic, message], ...]}
+
+Environment Variables:
+    - WS_BACKPLANE: "memory" or "kafka" (default: "memory")
+    - WS_BACKPLANE_FLUSH_MS: Flush interval in milliseconds (default: 10)
+    - WS_BACKPLANE_BATCH: Events that trigger an early flush (default: 500)
+    - KAFKA_BOOTSTRAP_SERVERS: Kafka brokers (default: "localhost:9092")
+    - WS_BACKPLANE_TOPIC: Kafka topic of the batches (default: "ws-events")
+"""
+
+import asyncio
+import json
+import os
+import uuid
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Tuple
+
+WS_BACKPLANE = os.getenv("WS_BACKPLANE", "memory")
+WS_BACKPLANE_FLUSH_MS = float(os.getenv("WS_BACKPLANE_FLUSH_MS", "10"))
+WS_BACKPLANE_BATCH = int(os.getenv("WS_BACKPLANE_BATCH", "500"))
+KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
+WS_BACKPLANE_TOPIC = os.getenv("WS_BACKPLANE_TOPIC", "ws-events")
+
+Event = Tuple[str, dict]
+Deliver = Callable[[List[Event]], None]
+
+
+class Backplane(ABC):
+    """
+    Batching pub/sub relay between workers. Subclasses implement `_open`, `_send` and `_close`;
+    a subclass missing one of them cannot be instantiated.
+
+    Example:
+        >>> backplane = create_backplane()
+        >>> await backplane.start(manager.deliver_batch)
+        >>> backplane.publish("user:user12345", {"risk": "..."})
+        >>> await backplane.stop()
+    """
+
+    def __init__(self, flush_interval: float = WS_BACKPLANE_FLUSH_MS / 1000, batch_size: int = WS_BACKPLANE_BATCH):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.origin = uuid.uuid4().hex
+        self._deliver: Optional[Deliver] = None
+        self._buffer: List[Event] = []
+        self._pending = asyncio.Event()
+        self._full = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+
+        self.published = 0
+        self.batches_sent = 0
+        self.batches_received = 0
+        self.events_received = 0
+        self.send_errors = 0
+        self.dropped = 0
+
+    async def start(self, deliver: Deliver):
+        """
+        Connect to the broker and start relaying.
+
+        Args:
+            deliver (Callable[[List[Tuple[str, dict]]], None]): Hands events received from
+                other workers to the local subscribers
+        """
+        self._deliver = deliver
+        await self._open()
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Flush what is buffered and disconnect."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self._flush()
+        await self._close()
+
+    def publish(self, topic: str, message: dict):
+        """Buffer an event for the other workers; never waits on the broker."""
+        self._buffer.append((topic, message))
+        self.published += 1
+        self._pending.set()
+        if len(self._buffer) >= self.batch_size:
+            self._full.set()
+
+    async def _flush_loop(self):
+        while True:
+            await self._pending.wait()
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self._flush()
+
+    async def _flush(self):
+        batch, self._buffer = self._buffer, []
+        self._pending.clear()
+        self._full.clear()
+        if not batch:
+            return
+        payload = json.dumps({"origin": self.origin, "events": batch}, default=str).encode("utf-8")
+        try:
+            await self._send(payload)
+            self.batches_sent += 1
+        except Exception as e:
+            self.send_errors += 1
+            self.dropped += len(batch)
+            print(f"❌ Backplane send failed, {len(batch)} events not relayed: {e}")
+
+    def _receive(self, payload: bytes):
+        batch = json.loads(payload)
+        if batch.get("origin") == self.origin:
+            return
+        events = [(topic, message) for topic, message in batch.get("events", [])]
+        self.batches_received += 1
+        self.events_received += len(events)
+        if self._deliver is not None:
+            self._deliver(events)
+
+    @abstractmethod
+    async def _open(self):
+        """Connect to the broker and start delivering received batches to `_receive`."""
+
+    @abstractmethod
+    async def _send(self, payload: bytes):
+        """Send one encoded batch to every worker."""
+
+    @abstractmethod
+    async def _close(self):
+        """Stop receiving and disconnect from the broker."""
+
+    def stats(self) -> Dict[str, object]:
+        """Return relay counters."""
+        return {
+            "backend": type(self).__name__,
+            "buffered": len(self._buffer),
+            "published": self.published,
+            "batches_sent": self.batches_sent,
+            "batches_received": self.batches_received,
+            "events_received": self.events_received,
+            "send_errors": self.send_errors,
+            "dropped": self.dropped,
+        }
+
+
+class InMemoryBackplane(Backplane):
+    """Backplane over an in-process bus shared by every instance created with the same `bus`."""
+
+    _default_bus: List["InMemoryBackplane"] = []
+
+    def __init__(self, bus: Optional[List["InMemoryBackplane"]] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.bus = InMemoryBackplane._default_bus if bus is None else bus
+
+    async def _open(self):
+        self.bus.append(self)
+
+    async def _send(self, payload: bytes):
+        for member in list(self.bus):
+            member._receive(payload)
+
+    async def _close(self):
+        if self in self.bus:
+            self.bus.remove(self)
+
+
+class KafkaBackplane(Backplane):
+    """Backplane over a Kafka topic that every worker consumes in full."""
+
+    def __init__(self, bootstrap_servers: str = KAFKA_BOOTSTRAP_SERVERS, topic: str = WS_BACKPLANE_TOPIC, **kwargs):
+        super().__init__(**kwargs)
+        self.bootstrap_servers = bootstrap_servers
+        self.topic = topic
+        self._producer = None
+        self._consumer = None
+        self._consumer_task: Optional[asyncio.Task] = None
+
+    async def _open(self):
+        try:
+            from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
+        except ImportError as e:
+            raise RuntimeError("WS_BACKPLANE=kafka requires the 'aiokafka' package") from e
+
+        self._producer = AIOKafkaProducer(bootstrap_servers=self.bootstrap_servers, linger_ms=5, compression_type="gzip")
+        # No group_id: every worker reads every partition, starting from new batches only
+        self._consumer = AIOKafkaConsumer(self.topic, bootstrap_servers=self.bootstrap_servers, auto_offset_reset="latest")
+        await self._producer.start()
+        await self._consumer.start()
+        self._consumer_task = asyncio.create_task(self._consume())
+        print(f"✅ Kafka WebSocket backplane on {self.bootstrap_servers}/{self.topic}")
+
+    async def _consume(self):
+        async for record in self._consumer:
+            try:
+                self._receive(record.value)
+            except Exception as e:
+                print(f"❌ Invalid backplane batch skipped: {e}")
+
+    async def _send(self, payload: bytes):
+        await self._producer.send_and_wait(self.topic, payload)
+
+    async def _close(self):
+        if self._consumer_task is not None:
+            self._consumer_task.cancel()
+        if self._consumer is not None:
+            await self._consumer.stop()
+        if self._producer is not None:
+            await self._producer.stop()
+
+
+def create_backplane(kind: str = WS_BACKPLANE) -> Backplane:
+    """
+    Build the backplane selected by WS_BACKPLANE.
+
+    Args:
+        kind (str): "memory" or "kafka"
+
+    Returns:
+        Backplane: An unstarted backplane
+    """
+    if kind == "memory":
+        return InMemoryBackplane()
+    if kind == "kafka":
+        return KafkaBackplane()
+    raise ValueError(f"Unknown WS_BACKPLANE '{kind}', expected 'memory' or 'kafka'")
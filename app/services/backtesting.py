@@ -0,0 +1,282 @@
+"""
+Backtesting Service Module
+
+This module measures forecast quality. Each forecast period of the stored SOP plans is
+scored against the demand realized in that same period, read from the `daily_rollup`
+collection at scoring time; periods that have not fully elapsed yet are skipped. Forecasting
+models are compared with a rolling-origin backtest on the demand history. All scoring is
+done with grouped NumPy array math, never with a Python loop per plan or per product.
+
+Metrics:
+    - mape: Mean absolute percentage error in %, over periods with non-zero actual demand
+    - bias: Mean signed error (forecast - actual), positive when over-forecasting
+    - wape: Weighted absolute percentage error in %, sum(|error|) / sum(actual)
+
+Dependencies:
+    - numpy: For vectorized scoring
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.database import daily_rollup_collection, sop_collection
+from app.models.sop import BacktestRequest
+from app.services.forecasting import build_demand_matrix, forecast_demand, next_period
+from app.services.rollup_service import day_bucket
+from app.services.sop_service import load_sop_history
+
+
+def _metrics(abs_error: np.ndarray, error: np.ndarray, actual: np.ndarray, ape: np.ndarray, ape_count: np.ndarray, count: np.ndarray) -> Dict[str, np.ndarray]:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "mape": np.where(ape_count > 0, 100 * ape / ape_count, np.nan),
+            "bias": np.where(count > 0, error / count, np.nan),
+            "wape": np.where(actual > 0, 100 * abs_error / actual, np.nan),
+        }
+
+
+def grouped_metrics(groups: np.ndarray, forecast: np.ndarray, actual: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Compute MAPE, bias and WAPE for every group in one pass.
+
+    Args:
+        groups (np.ndarray): Integer group index of each observation (0..n_groups-1)
+        forecast (np.ndarray): Forecast value of each observation
+        actual (np.ndarray): Actual value of each observation
+
+    Returns:
+        Dict[str, np.ndarray]: "mape", "bias", "wape" and "count" arrays indexed by group
+
+    Example:
+        >>> grouped_metrics(np.array([0, 0, 1]), np.array([10., 12., 5.]), np.array([10., 10., 4.]))["wape"]
+        array([10., 25.])
+    """
+    size = int(groups.max()) + 1 if groups.size else 0
+    error = forecast - actual
+    positive = actual > 0
+    ape = np.where(positive, np.abs(error) / np.where(positive, actual, 1), 0)
+
+    sums = {
+        "abs_error": np.bincount(groups, np.abs(error), size),
+        "error": np.bincount(groups, error, size),
+        "actual": np.bincount(groups, actual, size),
+        "ape": np.bincount(groups, ape, size),
+        "ape_count": np.bincount(groups, positive, size),
+        "count": np.bincount(groups, minlength=size),
+    }
+    metrics = _metrics(**sums)
+    metrics["count"] = sums["count"]
+    return metrics
+
+
+def _rows(keys: np.ndarray, metrics: Dict[str, np.ndarray], name: str) -> List[dict]:
+    return [
+        {
+            name: key.item() if hasattr(key, "item") else key,
+            "mape": _round(metrics["mape"][index]),
+            "bias": _round(metrics["bias"][index]),
+            "wape": _round(metrics["wape"][index]),
+            "count": int(metrics["count"][index]),
+        }
+        for index, key in enumerate(keys)
+    ]
+
+
+def _round(value: float) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+async def realized_demand(
+    product_ids: List[str], unit: str, start: datetime, end: datetime, collection=daily_rollup_collection
+) -> Dict[Tuple[str, datetime], float]:
+    """
+    Sum the demand recorded in the daily rollups per product and per period.
+
+    Periods are truncated like the planning history, so they line up with the periods of
+    the plans' forecasts.
+
+    Args:
+        product_ids (List[str]): Products to read
+        unit (str): Period size, one of "day", "week" or "month"
+        start (datetime): Inclusive lower bound on the rollup day
+        end (datetime): Exclusive upper bound on the rollup day
+        collection: Daily rollup collection
+
+    Returns:
+        Dict[Tuple[str, datetime], float]: (product_id, period start) -> units sold
+    """
+    pipeline = [
+        {"$match": {"product_id": {"$in": product_ids}, "day": {"$gte": start, "$lt": end}}},
+        {
+            "$group": {
+                "_id": {"product_id": "$product_id", "period": {"$dateTrunc": {"date": "$day", "unit": unit}}},
+                "demand": {"$sum": "$quantity_sold"},
+            }
+        },
+    ]
+    results = await collection.aggregate(pipeline).to_list(None)
+    return {(result["_id"]["product_id"], result["_id"]["period"]): result["demand"] for result in results}
+
+
+async def score_plans(
+    request: BacktestRequest, now: Optional[datetime] = None, plans_collection=sop_collection, rollup_collection=daily_rollup_collection
+) -> Dict[str, List[dict]]:
+    """
+    Score the forecast periods of stored SOP plans against realized demand, per product and per revision.
+
+    Every `forecasted_demand[i]` is compared with the units sold in that same period. Only
+    periods that have fully elapsed are scored; a period without any sale counts as zero
+    demand. Plans made before their period size was recorded are read as `request.period`.
+
+    Args:
+        request (BacktestRequest): Product filter, and period size of older plans
+        now (Optional[datetime]): Scoring time, defaults to the current time
+        plans_collection: SOP plan collection
+        rollup_collection: Daily rollup collection
+
+    Returns:
+        dict: {"by_product": [...], "by_revision": [...]} rows of mape/bias/wape/count, where
+            count is the number of scored forecast periods
+    """
+    today = day_bucket(now or datetime.now(timezone.utc))
+    match: dict = {}
+    if request.product_ids:
+        match["product_id"] = {"$in": request.product_ids}
+
+    pipeline = [
+        {"$match": match},
+        {"$unwind": "$forecasted_demand"},
+        {
+            "$project": {
+                "_id": 0,
+                "product_id": 1,
+                "revision_number": 1,
+                "unit": {"$ifNull": ["$period_unit", request.period]},
+                "period": "$forecasted_demand.period",
+                "forecast": "$forecasted_demand.quantity",
+            }
+        },
+        {"$match": {"period": {"$lt": today}}},
+    ]
+    entries = [
+        entry for entry in await plans_collection.aggregate(pipeline).to_list(None)
+        if next_period(entry["period"], entry["unit"]) <= today
+    ]
+    if not entries:
+        return {"by_product": [], "by_revision": []}
+
+    # One rollup aggregation per period size found among the plans
+    actual_by_period: Dict[Tuple[str, str, datetime], float] = {}
+    for unit in {entry["unit"] for entry in entries}:
+        scored = [entry for entry in entries if entry["unit"] == unit]
+        realized = await realized_demand(
+            sorted({entry["product_id"] for entry in scored}),
+            unit,
+            min(entry["period"] for entry in scored),
+            max(next_period(entry["period"], unit) for entry in scored),
+            rollup_collection,
+        )
+        actual_by_period.update({(product_id, unit, period): demand for (product_id, period), demand in realized.items()})
+
+    forecast = np.fromiter((entry["forecast"] for entry in entries), dtype=float, count=len(entries))
+    actual = np.fromiter(
+        (actual_by_period.get((entry["product_id"], entry["unit"], entry["period"]), 0) for entry in entries),
+        dtype=float, count=len(entries),
+    )
+    products, product_index = np.unique(np.array([entry["product_id"] for entry in entries]), return_inverse=True)
+    revisions, revision_index = np.unique(
+        np.fromiter((entry["revision_number"] for entry in entries), dtype=np.int64, count=len(entries)), return_inverse=True
+    )
+
+    return {
+        "by_product": _rows(products, grouped_metrics(product_index, forecast, actual), "product_id"),
+        "by_revision": _rows(revisions, grouped_metrics(revision_index, forecast, actual), "revision_number"),
+    }
+
+
+def rolling_origin_backtest(demand: np.ndarray, unit: str, horizon: int, models: List[str], min_train: int, step: int) -> Dict[str, object]:
+    """
+    Compare forecasting models with rolling-origin evaluation.
+
+    For every origin, each model is fitted on the periods before it (for all products at
+    once) and scored on the next `horizon` periods.
+
+    Args:
+        demand (np.ndarray): (products x periods) demand history
+        unit (str): Period size ("day", "week" or "month")
+        horizon (int): Periods forecast from each origin
+        models (List[str]): Models to compare
+        min_train (int): Periods in the first training window
+        step (int): Periods between consecutive origins
+
+    Returns:
+        dict: {
+            "origins": int,
+            "models": {model: {"mape", "bias", "wape", "count"}},
+            "wins": {model: number of products for which the model has the lowest WAPE}
+        }
+    """
+    products, periods = demand.shape
+    origins = list(range(min_train, periods - horizon + 1, step))
+    if not origins or not products:
+        return {"origins": 0, "models": {}, "wins": {}}
+
+    # Per model and per product running sums, so no per-product array is ever kept per origin
+    shape = (len(models), products)
+    sums = {name: np.zeros(shape) for name in ("abs_error", "error", "actual", "ape", "ape_count", "count")}
+    for origin in origins:
+        actual = demand[:, origin:origin + horizon]
+        positive = actual > 0
+        for index, model in enumerate(models):
+            error = forecast_demand(demand[:, :origin], unit, horizon, model)["forecast"] - actual
+            sums["abs_error"][index] += np.abs(error).sum(axis=1)
+            sums["error"][index] += error.sum(axis=1)
+            sums["actual"][index] += actual.sum(axis=1)
+            sums["ape"][index] += np.where(positive, np.abs(error) / np.where(positive, actual, 1), 0).sum(axis=1)
+            sums["ape_count"][index] += positive.sum(axis=1)
+            sums["count"][index] += horizon
+
+    overall = _metrics(**{name: values.sum(axis=1) for name, values in sums.items()})
+    per_product_wape = _metrics(**sums)["wape"]
+    winners = np.argmin(np.where(np.isnan(per_product_wape), np.inf, per_product_wape), axis=0)
+    scored = ~np.isnan(per_product_wape).all(axis=0)
+
+    return {
+        "origins": len(origins),
+        "models": {
+            model: {
+                "mape": _round(overall["mape"][index]),
+                "bias": _round(overall["bias"][index]),
+                "wape": _round(overall["wape"][index]),
+                "count": int(sums["count"][index].sum()),
+            }
+            for index, model in enumerate(models)
+        },
+        "wins": {model: int(((winners == index) & scored).sum()) for index, model in enumerate(models)},
+    }
+
+
+async def run_backtest(request: BacktestRequest) -> Dict[str, object]:
+    """
+    Score stored plans and run a rolling-origin model comparison for a request.
+
+    Args:
+        request (BacktestRequest): Filters, period size, horizon and evaluation window
+
+    Returns:
+        dict: {"plans": score_plans(...), "rolling_origin": rolling_origin_backtest(...)}; the
+            date range only restricts the history of the rolling-origin backtest
+    """
+    plans = await score_plans(request)
+
+    history = await load_sop_history(request)
+    product_ids = sorted(history["demand"])
+    _, demand = build_demand_matrix(history["demand"], product_ids, request.period)
+    rolling_origin = rolling_origin_backtest(
+        demand, request.period, request.horizon, request.models, request.min_train_periods, request.step
+    )
+    rolling_origin["products"] = len(product_ids)
+
+    return {"plans": plans, "rolling_origin": rolling_origin}
@@ -0,0 +1,302 @@
+"""
+Change Feed Module
+
+This module turns inserts and updates on `inventory`, `orders` and `shipments` into
+WebSocket events, so clients are pushed changes instead of polling `GET /inventory` and
+`GET /shipments`.
+
+Sources:
+    - MongoDB change streams (`full_document="updateLookup"`), on replica sets and clusters
+    - Polling fallback for standalone servers (e.g. local test instances), which cannot open
+      change streams: new `_id`s are inserts, newer `updated_at` values are updates
+
+Events are coalesced per document for CHANGE_FEED_COALESCE_MS: a burst of writes to the
+same document (e.g. a bulk import) produces one event carrying the latest version and the
+number of changes it stands for. After each flush the position reached (change stream resume
+token, or polling watermark) is saved in `change_feed_state`, so a restart neither misses
+nor replays events.
+
+Only one worker runs the feed at a time, holding a lease in `change_feed_state`; events
+reach the clients of the other workers through the WebSocket backplane.
+
+Topics and events:
+    - inventory: {"type": "inventory_changed", ...}
+    - user:<user_id>: {"type": "order_changed", ...}
+    - shipments:<order_id>: {"type": "shipment_changed", ...}
+    Each event: {"type", "collection", "operation", "id", "changes", "document"}
+
+Environment Variables:
+    - CHANGE_FEED_ENABLED: "0" to disable the feed (default: "1")
+    - CHANGE_FEED_COALESCE_MS: Coalescing window in milliseconds (default: 250)
+    - CHANGE_FEED_POLL_INTERVAL: Seconds between polls in fallback mode (default: 1)
+    - CHANGE_FEED_LEASE_SECONDS: Lease duration of the worker running the feed (default: 30)
+"""
+
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError, OperationFailure, PyMongoError
+
+from app.database import change_feed_state_collection, inventory_collection, orders_collection, shipments_collection
+from app.services.websocket_manager import manager
+
+CHANGE_FEED_ENABLED = os.getenv("CHANGE_FEED_ENABLED", "1") == "1"
+CHANGE_FEED_COALESCE_MS = float(os.getenv("CHANGE_FEED_COALESCE_MS", "250"))
+CHANGE_FEED_POLL_INTERVAL = float(os.getenv("CHANGE_FEED_POLL_INTERVAL", "1"))
+CHANGE_FEED_LEASE_SECONDS = float(os.getenv("CHANGE_FEED_LEASE_SECONDS", "30"))
+
+LEASE_ID = "__lease__"
+WATCHED_OPERATIONS = ["insert", "update", "replace"]
+# Change streams are unavailable on standalone servers (IllegalOperation, or "only supported on replica sets")
+CHANGE_STREAM_UNSUPPORTED = {20, 40573}
+CHANGE_STREAM_HISTORY_LOST = 286
+
+
+def _inventory_topics(document: dict) -> List[str]:
+    return ["inventory"]
+
+
+def _order_topics(document: dict) -> List[str]:
+    return [f"user:{document['user_id']}"] if document.get("user_id") else []
+
+
+def _shipment_topics(document: dict) -> List[str]:
+    return [f"shipments:{document['order_id']}"] if document.get("order_id") else []
+
+
+# name -> (collection, event type, topics of a document)
+FEEDS: Dict[str, Tuple[object, str, Callable[[dict], List[str]]]] = {
+    "inventory": (inventory_collection, "inventory_changed", _inventory_topics),
+    "orders": (orders_collection, "order_changed", _order_topics),
+    "shipments": (shipments_collection, "shipment_changed", _shipment_topics),
+}
+
+
+class ChangeFeed:
+    """
+    Coalescing relay from collection changes to WebSocket topics.
+
+    Example:
+        >>> feed = ChangeFeed()
+        >>> await feed.start()      # on app startup
+        >>> await feed.stop()       # on app shutdown
+    """
+
+    def __init__(
+        self,
+        feeds: Dict[str, Tuple[object, str, Callable[[dict], List[str]]]] = FEEDS,
+        publish: Callable[[str, dict], int] = manager.publish,
+        state_collection=change_feed_state_collection,
+        coalesce_window: float = CHANGE_FEED_COALESCE_MS / 1000,
+        poll_interval: float = CHANGE_FEED_POLL_INTERVAL,
+        lease_seconds: float = CHANGE_FEED_LEASE_SECONDS,
+    ):
+        self.feeds = feeds
+        self.publish = publish
+        self.state = state_collection
+        self.coalesce_window = coalesce_window
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.owner = uuid.uuid4().hex
+
+        # (feed name, document id) -> pending event
+        self._pending: Dict[Tuple[str, object], dict] = {}
+        # feed name -> position reached by the recorded events, saved on flush
+        self._positions: Dict[str, dict] = {}
+        self._saved: Dict[str, dict] = {}
+        self._flush_lock = asyncio.Lock()
+        self._tasks: List[asyncio.Task] = []
+        self._lease_task: Optional[asyncio.Task] = None
+
+        self.modes: Dict[str, str] = {}
+        self.changes = 0
+        self.published = 0
+
+    # Lifecycle
+
+    async def start(self):
+        """Start competing for the lease; the holder runs the watchers."""
+        self._lease_task = asyncio.create_task(self._lease_loop())
+
+    async def stop(self):
+        """Stop watching, publish what is pending and release the lease."""
+        if self._lease_task is not None:
+            self._lease_task.cancel()
+            self._lease_task = None
+        await self._stop_watchers()
+        await self.state.delete_one({"_id": LEASE_ID, "owner": self.owner})
+
+    async def _acquire_lease(self) -> bool:
+        now = datetime.now(timezone.utc)
+        try:
+            await self.state.find_one_and_update(
+                {"_id": LEASE_ID, "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def _lease_loop(self):
+        while True:
+            try:
+                leader = await self._acquire_lease()
+            except PyMongoError as e:
+                print(f"❌ Change feed lease check failed: {e}")
+                leader = False
+            if leader and not self._tasks:
+                print("✅ Change feed started on this worker")
+                self._tasks = [asyncio.create_task(self._run(name)) for name in self.feeds]
+                self._tasks.append(asyncio.create_task(self._flush_loop()))
+            elif not leader and self._tasks:
+                print("⚠️ Change feed lease lost, stopping watchers")
+                await self._stop_watchers()
+            await asyncio.sleep(self.lease_seconds / 3)
+
+    async def _stop_watchers(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.flush()
+
+    # Sources
+
+    async def _run(self, name: str):
+        try:
+            await self._follow(name)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.modes[name] = "failed"
+            print(f"❌ Change feed for '{name}' stopped: {e}")
+
+    async def _follow(self, name: str):
+        saved = await self.state.find_one({"_id": name}) or {}
+        self._saved[name] = {key: saved[key] for key in ("resume_token", "last_id", "last_updated") if key in saved}
+        try:
+            await self._watch(name, saved.get("resume_token"))
+        except OperationFailure as e:
+            if e.code not in CHANGE_STREAM_UNSUPPORTED and "replica set" not in str(e):
+                raise
+            print(f"⚠️ Change streams unavailable, polling '{name}' every {self.poll_interval}s")
+            await self._poll(name, saved)
+
+    async def _watch(self, name: str, resume_token: Optional[dict]):
+        collection = self.feeds[name][0]
+        pipeline = [{"$match": {"operationType": {"$in": WATCHED_OPERATIONS}}}]
+        while True:
+            try:
+                async with collection.watch(pipeline, full_document="updateLookup", resume_after=resume_token) as stream:
+                    self.modes[name] = "change_stream"
+                    async for change in stream:
+                        resume_token = change["_id"]
+                        document = change.get("fullDocument")
+                        if document is not None:
+                            self._record(name, change["operationType"], document, {"resume_token": resume_token})
+                return
+            except OperationFailure as e:
+                if e.code != CHANGE_STREAM_HISTORY_LOST or resume_token is None:
+                    raise
+                # The oplog no longer holds the saved position: resume from now
+                print(f"⚠️ Change stream history lost for '{name}', resuming from now")
+                resume_token = None
+
+    async def _poll(self, name: str, saved: dict):
+        collection = self.feeds[name][0]
+        self.modes[name] = "polling"
+        last_id, last_updated = saved.get("last_id"), saved.get("last_updated")
+        if "last_updated" not in saved:
+            # First run: start from the current end instead of replaying the collection
+            newest = await collection.find({}, {"_id": 1}).sort("_id", -1).limit(1).to_list(1)
+            last_id = newest[0]["_id"] if newest else None
+            # Naive UTC, as Mongo returns stored dates
+            last_updated = datetime.now(timezone.utc).replace(tzinfo=None)
+            self._positions[name] = {"last_id": last_id, "last_updated": last_updated}
+
+        while True:
+            # Nothing seen yet means the collection was empty: every document is new. Both
+            # branches of the $or are indexed (_id and updated_at, see app.indexes)
+            query = {} if last_id is None else {"$or": [{"_id": {"$gt": last_id}}, {"updated_at": {"$gt": last_updated}}]}
+            async for document in collection.find(query).sort("_id", 1):
+                inserted = last_id is None or document["_id"] > last_id
+                if inserted:
+                    last_id = document["_id"]
+                if document.get("updated_at") and (last_updated is None or document["updated_at"] > last_updated):
+                    last_updated = document["updated_at"]
+                self._record(name, "insert" if inserted else "update", document, {"last_id": last_id, "last_updated": last_updated})
+            await asyncio.sleep(self.poll_interval)
+
+    # Coalescing
+
+    def _record(self, name: str, operation: str, document: dict, position: dict):
+        key = (name, document["_id"])
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = {"operation": operation, "document": document, "changes": 1}
+        else:
+            # Keep the latest version; a burst that started with the insert stays an insert
+            pending["document"] = document
+            pending["changes"] += 1
+        self._positions[name] = position
+        self.changes += 1
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.coalesce_window)
+            await self.flush()
+
+    async def flush(self):
+        """Publish the coalesced events and save the position they reach."""
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            positions, self._positions = self._positions, {}
+            for (name, document_id), event in pending.items():
+                _, event_type, topics = self.feeds[name]
+                message = {
+                    "type": event_type,
+                    "collection": name,
+                    "operation": event["operation"],
+                    "id": str(document_id),
+                    "changes": event["changes"],
+                    "document": {**event["document"], "_id": str(document_id)},
+                }
+                for topic in topics(event["document"]):
+                    self.publish(topic, message)
+                    self.published += 1
+
+            for name, position in positions.items():
+                if position != self._saved.get(name):
+                    await self.state.update_one(
+                        {"_id": name}, {"$set": {**position, "updated_at": datetime.now(timezone.utc)}}, upsert=True
+                    )
+                    self._saved[name] = position
+
+    def stats(self) -> Dict[str, object]:
+        """Return the source mode per collection and change/publish counters."""
+        return {
+            "leader": bool(self._tasks),
+            "modes": dict(self.modes),
+            "pending": len(self._pending),
+            "changes": self.changes,
+            "published": self.published,
+        }
+
+
+change_feed = ChangeFeed()
+
+
+async def start_change_feed():
+    """Start the change feed on app startup unless CHANGE_FEED_ENABLED=0."""
+    if CHANGE_FEED_ENABLED:
+        await change_feed.start()
+
+
+async def stop_change_feed():
+    """Stop the change feed on app shutdown."""
+    if CHANGE_FEED_ENABLED:
+        await change_feed.stop()
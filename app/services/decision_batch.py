@@ -0,0 +1,121 @@
+"""
+Decision Batch Module
+
+This module analyzes many decision contexts in one request. A fixed number of workers pull
+contexts from the batch and run them through `get_risks_and_decisions` (cache, request
+coalescing and the LLM scheduler included, at bulk priority), and every result is yielded
+as soon as it is ready, in completion order.
+
+A failing context only produces an error result for its own index. Successful analyses
+can be saved as `DecisionContext` documents with a single `insert_many` once the batch is
+done, and are then added to the retrieval index and the users' decision memory.
+
+Environment Variables:
+    - DECISION_BATCH_CONCURRENCY: Default number of contexts analyzed at once (default: 8)
+"""
+
+import asyncio
+import os
+from typing import AsyncIterator, List, Optional
+
+from pydantic import ValidationError
+from pymongo.errors import PyMongoError
+
+from app.database import decision_context_collection
+from app.models.decisioncontext import Context, DecisionContext
+from app.services.decision_index import decision_index
+from app.services.decision_memory import record_decision_contexts
+from app.services.llm_scheduler import PRIORITY_BULK
+from app.services.llm_service import get_risks_and_decisions
+
+DECISION_BATCH_CONCURRENCY = int(os.getenv("DECISION_BATCH_CONCURRENCY", "8"))
+
+
+async def _analyze(index: int, context: Context, use_cache: bool) -> dict:
+    try:
+        result = await get_risks_and_decisions(context.model_dump(), use_cache=use_cache, priority=PRIORITY_BULK)
+    except Exception as e:
+        print(f"❌ Batch item {index} failed: {e}")
+        return {"index": index, "error": f"Exception during analysis: {str(e)}"}
+    if "error" in result:
+        return {"index": index, "error": result["error"]}
+    return {"index": index, "risks_decisions": result["risks_decisions"]}
+
+
+async def analyze_batch(
+    contexts: List[Context],
+    user_id: str,
+    concurrency: Optional[int] = None,
+    persist: bool = False,
+    use_cache: bool = True,
+) -> AsyncIterator[dict]:
+    """
+    Analyze a batch of contexts with bounded concurrency, yielding results as they finish.
+
+    Args:
+        contexts (List[Context]): Contexts to analyze
+        user_id (str): Owner of the persisted decision contexts
+        concurrency (Optional[int]): Contexts in flight at once (default: DECISION_BATCH_CONCURRENCY)
+        persist (bool): Save the successful analyses with one `insert_many` at the end
+        use_cache (bool): Use the LLM response cache
+
+    Yields:
+        dict: One {"index", "risks_decisions"} or {"index", "error"} per context, then
+            {"summary": {"total", "succeeded", "failed", "inserted"}} (plus "inserted_ids"
+            when persisting)
+
+    Example:
+        >>> async for line in analyze_batch(contexts, "user12345", concurrency=4):
+        ...     print(line)
+        {'index': 1, 'risks_decisions': [...]}
+        {'index': 0, 'error': 'LLM API error: ...'}
+        {'summary': {'total': 2, 'succeeded': 1, 'failed': 1, 'inserted': 0}}
+    """
+    workers_count = min(concurrency or DECISION_BATCH_CONCURRENCY, len(contexts))
+    pending = iter(enumerate(contexts))
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def worker():
+        # The iterator is shared, so each context is taken by exactly one worker
+        for index, context in pending:
+            await results.put(await _analyze(index, context, use_cache))
+
+    workers = [asyncio.create_task(worker()) for _ in range(workers_count)]
+    documents = []
+    failed = 0
+    try:
+        for _ in range(len(contexts)):
+            result = await results.get()
+            if "error" in result:
+                failed += 1
+            elif persist:
+                try:
+                    documents.append((result["index"], DecisionContext(
+                        user_id=user_id, context=contexts[result["index"]], risks_decisions=result["risks_decisions"]
+                    ).model_dump(exclude={"id"})))
+                except ValidationError as e:
+                    failed += 1
+                    result = {"index": result["index"], "error": f"Invalid LLM output: {e.error_count()} validation errors"}
+            yield result
+    finally:
+        # Stops the remaining work if the client goes away mid-batch
+        for task in workers:
+            task.cancel()
+
+    summary = {"total": len(contexts), "succeeded": len(contexts) - failed, "failed": failed, "inserted": 0}
+    if documents:
+        try:
+            inserted = await decision_context_collection.insert_many([document for _, document in documents])
+        except PyMongoError as e:
+            print(f"❌ Batch insert failed: {e}")
+            summary["insert_error"] = str(e)
+        else:
+            summary["inserted"] = len(inserted.inserted_ids)
+            summary["inserted_ids"] = {}
+            for (index, document), inserted_id in zip(documents, inserted.inserted_ids):
+                summary["inserted_ids"][index] = str(inserted_id)
+                await decision_index.add(user_id, inserted_id, document)
+            await record_decision_contexts(
+                (document, inserted_id) for (_, document), inserted_id in zip(documents, inserted.inserted_ids)
+            )
+    yield {"summary": summary}
@@ -0,0 +1,185 @@
+"""
+Decision Index Module
+
+This module keeps a per-user BM25 retrieval index over past decision contexts, so the
+best-decision prompt only carries the few contexts relevant to the current problem instead
+of the user's whole history.
+
+Each user index is an in-memory inverted index (term -> postings of document number and
+term frequency, stored in compact `array` buffers) scored with NumPy. It is built from
+`decision_context_collection` the first time a user is queried, updated incrementally when
+a context is created, and rebuilt if another worker inserted contexts meanwhile (detected
+with an indexed count). The least recently used user indexes are evicted.
+
+Environment Variables:
+    - DECISION_INDEX_USERS: User indexes kept in memory (default: 1000)
+"""
+
+import asyncio
+import math
+import os
+import re
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.database import decision_context_collection
+
+DECISION_INDEX_USERS = int(os.getenv("DECISION_INDEX_USERS", "1000"))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or that the to was were will with"
+    " due our we this these those than then there".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of `text` without stop words and single characters."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if len(token) > 1 and token not in STOP_WORDS]
+
+
+def decision_context_text(document: dict) -> str:
+    """
+    Flatten a decision context document into the text that is indexed.
+
+    Args:
+        document (dict): Stored DecisionContext document
+
+    Returns:
+        str: Previsions, processes, constraints, risks, decisions and justifications
+    """
+    context = document.get("context") or {}
+    parts = []
+    for field in ("previsions", "processes", "constraints"):
+        parts.extend(context.get(field) or [])
+    for item in document.get("risks_decisions") or []:
+        parts.extend(value for value in (item.get("risk"), item.get("decision"), item.get("justification")) if value)
+    return " ".join(parts)
+
+
+class DecisionIndex:
+    """
+    BM25 inverted index over one user's decision contexts.
+
+    Example:
+        >>> index = DecisionIndex()
+        >>> index.add("65b0...", "Expected supplier delays ... Use alternative supplier")
+        >>> index.search("supplier late", k=3)
+        [('65b0...', 1.73)]
+    """
+
+    def __init__(self):
+        self.doc_ids: List = []
+        self.doc_lengths = array("I")
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def add(self, doc_id, text: str):
+        """Index one document."""
+        number = len(self.doc_ids)
+        tokens = tokenize(text)
+        frequencies: Dict[str, int] = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+        for term, frequency in frequencies.items():
+            documents, counts = self.postings.setdefault(term, (array("I"), array("I")))
+            documents.append(number)
+            counts.append(frequency)
+
+        self.doc_ids.append(doc_id)
+        self.doc_lengths.append(len(tokens))
+        self.total_length += len(tokens)
+
+    def search(self, query: str, k: int) -> List[Tuple[object, float]]:
+        """
+        Return the `k` best matching documents for `query`.
+
+        Documents are scored with BM25; when no query term occurs in the index the `k` most
+        recently added documents are returned with a score of 0.
+
+        Args:
+            query (str): Free-text problem description
+            k (int): Number of documents to return
+
+        Returns:
+            List[Tuple[object, float]]: (doc_id, score) pairs, best first
+        """
+        count = len(self.doc_ids)
+        if not count:
+            return []
+
+        lengths = np.frombuffer(self.doc_lengths, dtype=np.uint32).astype(np.float64)
+        normalizer = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(self.total_length / count, 1e-9))
+        scores = np.zeros(count)
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            documents, counts = self.postings[term]
+            indexes = np.frombuffer(documents, dtype=np.uint32)
+            frequencies = np.frombuffer(counts, dtype=np.uint32).astype(np.float64)
+            idf = math.log(1 + (count - len(indexes) + 0.5) / (len(indexes) + 0.5))
+            scores[indexes] += idf * frequencies * (BM25_K1 + 1) / (frequencies + normalizer[indexes])
+
+        k = min(k, count)
+        if not scores.any():
+            return [(self.doc_ids[index], 0.0) for index in range(count - 1, count - 1 - k, -1)]
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.doc_ids[index], float(scores[index])) for index in top if scores[index] > 0]
+
+
+class DecisionIndexRegistry:
+    """Per-user DecisionIndex instances, loaded lazily and evicted least recently used first."""
+
+    def __init__(self, max_users: int = DECISION_INDEX_USERS):
+        self.max_users = max_users
+        self._indexes: "OrderedDict[str, DecisionIndex]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def _build(self, user_id: str) -> DecisionIndex:
+        index = DecisionIndex()
+        cursor = decision_context_collection.find({"user_id": user_id}, {"context": 1, "risks_decisions": 1}).sort("_id", 1)
+        async for document in cursor:
+            index.add(document["_id"], decision_context_text(document))
+        return index
+
+    async def get(self, user_id: str) -> DecisionIndex:
+        """Return the up-to-date index of a user, building it from MongoDB if needed."""
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            index = self._indexes.get(user_id)
+            stored = await decision_context_collection.count_documents({"user_id": user_id})
+            if index is None or len(index) != stored:
+                index = await self._build(user_id)
+                self._indexes[user_id] = index
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.max_users:
+                evicted, _ = self._indexes.popitem(last=False)
+                self._locks.pop(evicted, None)
+            return index
+
+    async def add(self, user_id: str, doc_id, document: dict):
+        """Index a newly inserted decision context if its user's index is loaded."""
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                index.add(doc_id, decision_context_text(document))
+
+    async def search(self, user_id: str, query: str, k: int) -> List[Tuple[object, float]]:
+        """Return the top `k` (doc_id, score) pairs of a user's contexts for `query`."""
+        index = await self.get(user_id)
+        return index.search(query, k)
+
+
+decision_index = DecisionIndexRegistry()
@@ -0,0 +1,262 @@
+"""
+Decision Memory Module
+
+This module keeps one compact "decision memory" document per user in `decision_memory`,
+summarizing their whole decision history in a fixed size. It is updated incrementally with
+atomic `$inc`/`$push` upserts whenever a decision context is created or a decision's
+approval changes, so the best-decision prompt can carry the user's history without
+re-reading and serializing every `DecisionContext`.
+
+Memory document shape:
+    {
+        "_id": user_id,
+        "contexts": int, "decisions": int, "approved": int,
+        "risk_categories": {category: int},        # risks seen per category
+        "approved_by_category": {category: int},   # approved decisions per category
+        "recent_approved": [                        # last DECISION_MEMORY_RECENT approvals
+            {"context_id": str, "index": int, "risk": str, "decision": str, "category": str, "date": datetime}
+        ],
+        "first_decision_at": datetime, "last_decision_at": datetime, "updated_at": datetime
+    }
+
+Usage:
+    Rebuild every memory from the stored decision contexts (backfill or repair):
+        python -m app.services.decision_memory rebuild
+
+Environment Variables:
+    - DECISION_MEMORY_RECENT: Approved decisions kept per user (default: 10)
+"""
+
+import asyncio
+import os
+import sys
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.database import decision_context_collection, decision_memory_collection
+from app.services.decision_index import tokenize
+
+DECISION_MEMORY_RECENT = int(os.getenv("DECISION_MEMORY_RECENT", "10"))
+
+# Checked in order; a risk gets the category with the most keyword hits (ties go to the first)
+RISK_CATEGORIES = {
+    "supply": ("supplier", "supply", "vendor", "procure", "shortage", "material", "sourcing"),
+    "demand": ("demand", "stockout", "forecast", "sales", "spike", "season", "order"),
+    "capacity": ("capacity", "storage", "warehouse", "space", "overflow", "bottleneck", "inventory"),
+    "transport": ("delay", "shipment", "shipping", "delivery", "transport", "route", "port", "freight", "carrier", "congestion", "truck"),
+    "cost": ("cost", "budget", "price", "expense", "financial", "margin"),
+    "quality": ("quality", "defect", "damage", "spoil", "return", "waste"),
+    "workforce": ("labor", "labour", "staff", "workforce", "employee", "strike", "worker"),
+    "compliance": ("regulation", "compliance", "customs", "legal", "permit", "tariff"),
+}
+OTHER_CATEGORY = "other"
+
+
+def risk_category(risk: str) -> str:
+    """
+    Classify a risk description into one of RISK_CATEGORIES by keyword prefix.
+
+    Args:
+        risk (str): Risk description
+
+    Returns:
+        str: Category name, or "other"
+
+    Example:
+        >>> risk_category("Stockouts due to high demand")
+        'demand'
+    """
+    tokens = tokenize(risk or "")
+    best, best_hits = OTHER_CATEGORY, 0
+    for category, keywords in RISK_CATEGORIES.items():
+        hits = sum(1 for token in tokens if token.startswith(keywords))
+        if hits > best_hits:
+            best, best_hits = category, hits
+    return best
+
+
+def _approved_entry(context_id: str, index: int, item: dict, date: Optional[datetime]) -> dict:
+    return {
+        "context_id": context_id,
+        "index": index,
+        "risk": item.get("risk"),
+        "decision": item.get("decision"),
+        "category": risk_category(item.get("risk")),
+        "date": date,
+    }
+
+
+def _context_delta(document: dict, context_id: str) -> Tuple[Counter, List[dict]]:
+    counts: Counter = Counter(contexts=1)
+    approved = []
+    for index, item in enumerate(document.get("risks_decisions") or []):
+        category = risk_category(item.get("risk"))
+        counts["decisions"] += 1
+        counts[f"risk_categories.{category}"] += 1
+        if item.get("approved"):
+            counts["approved"] += 1
+            counts[f"approved_by_category.{category}"] += 1
+            approved.append(_approved_entry(context_id, index, item, document.get("date")))
+    return counts, approved
+
+
+async def _recent_approved(user_id: str) -> List[dict]:
+    # Latest approved decisions read back from the stored contexts, oldest first like `$push`
+    cursor = decision_context_collection.find(
+        {"user_id": user_id, "risks_decisions.approved": True}, {"date": 1, "risks_decisions": 1}
+    ).sort("date", -1).limit(DECISION_MEMORY_RECENT)
+    entries: List[dict] = []
+    async for document in cursor:
+        entries = [
+            _approved_entry(str(document["_id"]), index, item, document.get("date"))
+            for index, item in enumerate(document.get("risks_decisions") or [])
+            if item.get("approved")
+        ] + entries
+    return entries[-DECISION_MEMORY_RECENT:]
+
+
+async def record_decision_contexts(documents: Iterable[Tuple[dict, object]]):
+    """
+    Fold newly inserted decision contexts into their users' memories, one update per user.
+
+    Args:
+        documents (Iterable[Tuple[dict, object]]): (DecisionContext document, inserted `_id`) pairs
+    """
+    per_user: Dict[str, dict] = {}
+    for document, context_id in documents:
+        memory = per_user.setdefault(document["user_id"], {"counts": Counter(), "approved": [], "dates": []})
+        counts, approved = _context_delta(document, str(context_id))
+        memory["counts"].update(counts)
+        memory["approved"].extend(approved)
+        if document.get("date"):
+            memory["dates"].append(document["date"])
+
+    for user_id, memory in per_user.items():
+        update = {
+            "$inc": dict(memory["counts"]),
+            "$set": {"updated_at": datetime.now(timezone.utc)},
+        }
+        if memory["approved"]:
+            update["$push"] = {"recent_approved": {"$each": memory["approved"], "$slice": -DECISION_MEMORY_RECENT}}
+        if memory["dates"]:
+            update["$min"] = {"first_decision_at": min(memory["dates"])}
+            update["$max"] = {"last_decision_at": max(memory["dates"])}
+        await decision_memory_collection.update_one({"_id": user_id}, update, upsert=True)
+
+
+async def record_decision_context(document: dict, context_id):
+    """Fold one newly inserted decision context into its user's memory."""
+    await record_decision_contexts([(document, context_id)])
+
+
+async def record_approval_change(user_id: str, context_id: str, index: int, item: dict, approved: bool, date: Optional[datetime] = None):
+    """
+    Apply an approval flip of one risk/decision to its user's memory.
+
+    Call only when the stored `approved` value actually changed, after it was written.
+    Unapproving refills `recent_approved` from the stored contexts, so older approvals take
+    the place of the removed one instead of the list shrinking for good.
+
+    Args:
+        user_id (str): Owner of the decision context
+        context_id (str): `_id` of the decision context
+        index (int): Position of the item in `risks_decisions`
+        item (dict): The risk/decision item
+        approved (bool): New approval state
+        date (Optional[datetime]): Date of the decision context
+    """
+    category = risk_category(item.get("risk"))
+    step = 1 if approved else -1
+    update = {
+        "$inc": {"approved": step, f"approved_by_category.{category}": step},
+        "$set": {"updated_at": datetime.now(timezone.utc)},
+    }
+    if approved:
+        update["$push"] = {
+            "recent_approved": {"$each": [_approved_entry(context_id, index, item, date)], "$slice": -DECISION_MEMORY_RECENT}
+        }
+    else:
+        update["$set"]["recent_approved"] = await _recent_approved(user_id)
+    await decision_memory_collection.update_one({"_id": user_id}, update, upsert=True)
+
+
+async def get_decision_memory(user_id: str) -> Optional[dict]:
+    """Return the stored decision memory of a user, or None if they have no history."""
+    return await decision_memory_collection.find_one({"_id": user_id})
+
+
+def memory_prompt_summary(memory: dict) -> dict:
+    """
+    Reduce a decision memory to the fixed-size summary placed in the best-decision prompt.
+
+    Args:
+        memory (dict): Stored decision memory document
+
+    Returns:
+        dict: Totals, per-category risk/approval counts (most frequent first), decision
+            frequency and the most recent approved decisions
+    """
+    risks = memory.get("risk_categories") or {}
+    approvals = memory.get("approved_by_category") or {}
+    summary = {
+        "contexts_analyzed": memory.get("contexts", 0),
+        "decisions": memory.get("decisions", 0),
+        "approved_decisions": memory.get("approved", 0),
+        "risk_categories": {
+            category: {"risks": count, "approved": approvals.get(category, 0)}
+            for category, count in sorted(risks.items(), key=lambda entry: -entry[1])
+            if count
+        },
+        "recent_approved_decisions": [
+            {"risk": entry["risk"], "decision": entry["decision"], "category": entry["category"]}
+            for entry in reversed(memory.get("recent_approved") or [])
+        ],
+    }
+
+    first, last = memory.get("first_decision_at"), memory.get("last_decision_at")
+    if first and last:
+        weeks = max((last - first).total_seconds() / (7 * 86400), 1)
+        summary["contexts_per_week"] = round(memory.get("contexts", 0) / weeks, 2)
+    return summary
+
+
+async def rebuild_decision_memory(user_id: Optional[str] = None) -> int:
+    """
+    Recompute decision memories from the stored decision contexts.
+
+    Args:
+        user_id (Optional[str]): Only rebuild this user's memory; None for every user
+
+    Returns:
+        int: Number of memories written
+    """
+    query = {"user_id": user_id} if user_id else {}
+    if user_id:
+        await decision_memory_collection.delete_one({"_id": user_id})
+    else:
+        await decision_memory_collection.delete_many({})
+
+    batch: List[Tuple[dict, object]] = []
+    users = set()
+    cursor = decision_context_collection.find(query, {"user_id": 1, "date": 1, "risks_decisions": 1}).sort("_id", 1)
+    async for document in cursor:
+        batch.append((document, document["_id"]))
+        users.add(document["user_id"])
+        if len(batch) >= 1000:
+            await record_decision_contexts(batch)
+            batch = []
+    if batch:
+        await record_decision_contexts(batch)
+    return len(users)
+
+
+async def _main(command: str):
+    if command != "rebuild":
+        raise SystemExit(f"Unknown command '{command}', expected 'rebuild'")
+    users = await rebuild_decision_memory()
+    print(f"✅ Rebuilt decision memory: {users} users")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "rebuild"))
@@ -0,0 +1,260 @@
+"""
+Forecasting Service Module
+
+This module forecasts demand for many products at once. Sales history is laid out as a
+(products x periods) NumPy matrix and every model runs on the whole matrix, with its
+parameter grid stacked along the product axis, so the only Python loop is over time.
+
+Models:
+    - moving_average: Mean of the last `window` periods
+    - ses: Simple exponential smoothing
+    - holt: Holt's linear trend (double exponential smoothing)
+    - holt_winters: Additive Holt-Winters, when at least two seasons of history exist
+
+With model="auto", every model and parameter combination is scored on its one-step-ahead
+in-sample error and the best one is kept per product.
+
+Dependencies:
+    - numpy: For vectorized model evaluation
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+SEASON_LENGTHS = {"day": 7, "week": 52, "month": 12}
+MODELS = ("moving_average", "ses", "holt", "holt_winters")
+
+MOVING_AVERAGE_WINDOWS = (3, 6, 12)
+ALPHAS = (0.1, 0.3, 0.5, 0.8)
+BETAS = (0.05, 0.2)
+GAMMAS = (0.1, 0.3)
+
+
+def next_period(value: datetime, unit: str) -> datetime:
+    """
+    Return the start of the period following `value`.
+
+    Args:
+        value (datetime): Start of a period, as produced by `$dateTrunc`
+        unit (str): "day", "week" or "month"
+
+    Returns:
+        datetime: Start of the next period
+    """
+    if unit == "day":
+        return value + timedelta(days=1)
+    if unit == "week":
+        return value + timedelta(weeks=1)
+    return value.replace(year=value.year + value.month // 12, month=value.month % 12 + 1)
+
+
+def period_range(first: datetime, last: datetime, unit: str) -> List[datetime]:
+    """Return every period start from `first` to `last` inclusive, filling gaps."""
+    periods = [first]
+    while periods[-1] < last:
+        periods.append(next_period(periods[-1], unit))
+    return periods
+
+
+def future_periods(last: datetime, unit: str, horizon: int) -> List[datetime]:
+    """Return the `horizon` period starts following `last`."""
+    periods = []
+    for _ in range(horizon):
+        last = next_period(last, unit)
+        periods.append(last)
+    return periods
+
+
+def build_demand_matrix(
+    groups: Dict[str, dict], product_ids: List[str], unit: str, span: Optional[Tuple[datetime, datetime]] = None
+) -> Tuple[List[datetime], np.ndarray]:
+    """
+    Lay out per-product period totals as a dense (products x periods) matrix.
+
+    Args:
+        groups (Dict[str, dict]): product_id -> {"periods": [{"period", "quantity"}]},
+            as returned in `load_sop_history(...)["demand"]`
+        product_ids (List[str]): Row order of the matrix; products without history get a zero row
+        unit (str): Period size, used to fill periods without any sale
+        span (Optional[Tuple[datetime, datetime]]): First and last column period, when the
+            matrix must line up with other product groups; defaults to the observed periods
+
+    Returns:
+        Tuple[List[datetime], np.ndarray]: Column periods and the demand matrix
+
+    Example:
+        >>> periods, matrix = build_demand_matrix(history["demand"], ["P-1", "P-2"], "month")
+        >>> matrix.shape
+        (2, 24)
+    """
+    observed = [entry["period"] for group in groups.values() for entry in group["periods"]]
+    if span is None:
+        if not observed:
+            return [], np.zeros((len(product_ids), 0))
+        span = (min(observed), max(observed))
+
+    periods = period_range(span[0], span[1], unit)
+    column = {period: index for index, period in enumerate(periods)}
+
+    rows, columns, quantities = [], [], []
+    for row, product_id in enumerate(product_ids):
+        for entry in groups.get(product_id, {"periods": []})["periods"]:
+            rows.append(row)
+            columns.append(column[entry["period"]])
+            quantities.append(entry["quantity"])
+
+    matrix = np.zeros((len(product_ids), len(periods)))
+    np.add.at(matrix, (np.asarray(rows, dtype=np.intp), np.asarray(columns, dtype=np.intp)), quantities)
+    return periods, matrix
+
+
+def _stack(demand: np.ndarray, *grids: Tuple[float, ...]) -> Tuple[np.ndarray, List[np.ndarray]]:
+    # Repeat the matrix once per parameter combination so every combination runs in the same pass
+    combinations = np.array(np.meshgrid(*grids, indexing="ij")).reshape(len(grids), -1)
+    stacked = np.tile(demand, (combinations.shape[1], 1))
+    parameters = [np.repeat(values, demand.shape[0]) for values in combinations]
+    return stacked, parameters
+
+
+def _moving_average(demand: np.ndarray, horizon: int, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    periods = demand.shape[1]
+    cumulative = np.concatenate([np.zeros((demand.shape[0], 1)), np.cumsum(demand, axis=1)], axis=1)
+    ends = np.arange(1, periods)
+    starts = np.maximum(0, ends - window)
+
+    fitted = np.full(demand.shape, np.nan)
+    fitted[:, 1:] = (cumulative[:, ends] - cumulative[:, starts]) / (ends - starts)
+    last = min(window, periods)
+    forecast = (cumulative[:, -1] - cumulative[:, -1 - last]) / last
+    return fitted, np.repeat(forecast[:, None], horizon, axis=1)
+
+
+def _ses(demand: np.ndarray, horizon: int, alpha: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    fitted = np.full(demand.shape, np.nan)
+    level = demand[:, 0].copy()
+    for t in range(1, demand.shape[1]):
+        fitted[:, t] = level
+        level = alpha * demand[:, t] + (1 - alpha) * level
+    return fitted, np.repeat(level[:, None], horizon, axis=1)
+
+
+def _holt(demand: np.ndarray, horizon: int, alpha: np.ndarray, beta: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    fitted = np.full(demand.shape, np.nan)
+    level = demand[:, 0].copy()
+    trend = demand[:, 1] - demand[:, 0]
+    for t in range(1, demand.shape[1]):
+        fitted[:, t] = level + trend
+        new_level = alpha * demand[:, t] + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        level = new_level
+    steps = np.arange(1, horizon + 1)
+    return fitted, level[:, None] + trend[:, None] * steps
+
+
+def _holt_winters(
+    demand: np.ndarray, horizon: int, season: int, alpha: np.ndarray, beta: np.ndarray, gamma: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    periods = demand.shape[1]
+    fitted = np.full(demand.shape, np.nan)
+    level = demand[:, :season].mean(axis=1)
+    trend = (demand[:, season:2 * season].mean(axis=1) - level) / season
+    seasonal = demand[:, :season] - level[:, None]
+    for t in range(season, periods):
+        index = t % season
+        fitted[:, t] = level + trend + seasonal[:, index]
+        new_level = alpha * (demand[:, t] - seasonal[:, index]) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        seasonal[:, index] = gamma * (demand[:, t] - new_level) + (1 - gamma) * seasonal[:, index]
+        level = new_level
+    steps = np.arange(1, horizon + 1)
+    season_index = (periods + steps - 1) % season
+    return fitted, level[:, None] + trend[:, None] * steps + seasonal[:, season_index]
+
+
+def _best_of(demand: np.ndarray, fitted: np.ndarray, forecast: np.ndarray, start: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Rows are parameter combinations stacked in blocks of one row per product
+    products = demand.shape[0]
+    errors = np.abs(fitted[:, start:] - np.tile(demand[:, start:], (fitted.shape[0] // products, 1)))
+    mae = errors.mean(axis=1).reshape(-1, products)
+    best = np.argmin(mae, axis=0)
+    rows = best * products + np.arange(products)
+    return mae[best, np.arange(products)], forecast[rows]
+
+
+def _run_model(model: str, demand: np.ndarray, horizon: int, season: int, start: int) -> Tuple[np.ndarray, np.ndarray]:
+    if model == "moving_average":
+        runs = [_moving_average(demand, horizon, window) for window in MOVING_AVERAGE_WINDOWS]
+        fitted = np.concatenate([run[0] for run in runs])
+        forecast = np.concatenate([run[1] for run in runs])
+    elif model == "ses":
+        stacked, (alpha,) = _stack(demand, ALPHAS)
+        fitted, forecast = _ses(stacked, horizon, alpha)
+    elif model == "holt":
+        stacked, (alpha, beta) = _stack(demand, ALPHAS, BETAS)
+        fitted, forecast = _holt(stacked, horizon, alpha, beta)
+    else:
+        stacked, (alpha, beta, gamma) = _stack(demand, ALPHAS, BETAS, GAMMAS)
+        fitted, forecast = _holt_winters(stacked, horizon, season, alpha, beta, gamma)
+    return _best_of(demand, fitted, forecast, start)
+
+
+def forecast_demand(demand: np.ndarray, unit: str, horizon: int, model: str = "auto") -> Dict[str, object]:
+    """
+    Forecast the next `horizon` periods for every row of a demand matrix.
+
+    Args:
+        demand (np.ndarray): (products x periods) history, oldest period first
+        unit (str): Period size ("day", "week" or "month"), sets the Holt-Winters season length
+        horizon (int): Number of future periods to forecast
+        model (str): One of MODELS, or "auto" to pick the most accurate model per product
+
+    Returns:
+        dict: {
+            "forecast": np.ndarray (products x horizon), non-negative,
+            "confidence": np.ndarray (products,), 1 - in-sample MAE / mean demand, in [0, 1],
+            "model": List[str], model used for each product
+        }
+
+    Example:
+        >>> result = forecast_demand(matrix, "month", horizon=3)
+        >>> result["forecast"].shape
+        (20000, 3)
+    """
+    products, periods = demand.shape
+    if periods < 3:
+        # Not enough history to score any model: carry the last observation forward
+        last = demand[:, -1] if periods else np.zeros(products)
+        return {
+            "forecast": np.repeat(last[:, None], horizon, axis=1),
+            "confidence": np.zeros(products),
+            "model": ["naive"] * products,
+        }
+
+    season = SEASON_LENGTHS[unit]
+    seasonal = periods > 2 * season
+    candidates = list(MODELS) if model == "auto" else [model]
+    if not seasonal and "holt_winters" in candidates:
+        candidates.remove("holt_winters")
+        candidates = candidates or ["holt"]
+
+    # Every model is scored on the same periods, after the Holt-Winters warm-up when it competes
+    start = 2 * season if seasonal and "holt_winters" in candidates else 1
+    results = [_run_model(name, demand, horizon, season, start) for name in candidates]
+
+    mae = np.stack([result[0] for result in results])
+    best = np.argmin(mae, axis=0)
+    rows = np.arange(products)
+    forecast = np.stack([result[1] for result in results])[best, rows]
+
+    mean_demand = np.abs(demand[:, start:]).mean(axis=1)
+    best_mae = mae[best, rows]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        confidence = np.where(mean_demand > 0, 1 - best_mae / mean_demand, (best_mae == 0).astype(float))
+
+    return {
+        "forecast": np.clip(forecast, 0, None),
+        "confidence": np.clip(confidence, 0, 1),
+        "model": [candidates[index] for index in best],
+    }
@@ -0,0 +1,89 @@
+"""
+JSON Stream Module
+
+This module parses a JSON array while it is still arriving, e.g. token by token from a
+streaming LLM completion, and hands out each top-level element as soon as its closing
+bracket has been received.
+
+Anything before the opening `[` (a ```json fence, a sentence of preamble) and after the
+closing `]` is ignored, so the usual LLM wrapping around the array needs no cleanup.
+"""
+
+import json
+from typing import Any, List
+
+
+class JSONArrayStreamParser:
+    """
+    Incremental parser for the elements of a top-level JSON array.
+
+    Example:
+        >>> parser = JSONArrayStreamParser()
+        >>> parser.feed('```json\\n[{"risk": "Port str')
+        []
+        >>> parser.feed('ike", "decision": "Reroute"}, {"ri')
+        [{'risk': 'Port strike', 'decision': 'Reroute'}]
+    """
+
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._started = False
+        self.finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.count = 0
+
+    def feed(self, chunk: str) -> List[Any]:
+        """
+        Consume the next piece of text.
+
+        Args:
+            chunk (str): Text received since the previous call
+
+        Returns:
+            List[Any]: Elements completed by this chunk, in order
+
+        Raises:
+            json.JSONDecodeError: If a completed element is not valid JSON
+        """
+        items = []
+        for char in chunk:
+            if self.finished:
+                break
+
+            if not self._started:
+                if char == "[":
+                    self._started = True
+                continue
+
+            if self._depth == 0:
+                # Between elements: only the element start and the array end matter
+                if char == "]":
+                    self.finished = True
+                elif char in "{[":
+                    self._depth = 1
+                    self._buffer = [char]
+                elif char == '"':
+                    raise json.JSONDecodeError("Only objects and arrays are streamed as elements", chunk, 0)
+                continue
+
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    items.append(json.loads("".join(self._buffer)))
+                    self._buffer = []
+                    self.count += 1
+        return items
@@ -0,0 +1,153 @@
+"""
+LLM Cache Module
+
+This module caches parsed LLM responses, keyed by a content hash of the normalized request,
+the model name and the prompt version. Identical (or whitespace/order-only different)
+decision contexts are answered from the cache instead of spending seconds and quota on
+OpenRouter.
+
+Tiers:
+    - In-process LRU with a TTL, always on
+    - MongoDB collection `llm_cache` with a TTL index (see `app.indexes`), when LLM_CACHE_PERSIST=1; shared by
+      all workers and kept across restarts
+
+Environment Variables:
+    - LLM_CACHE_SIZE: Entries in the in-process tier (default: 1024)
+    - LLM_CACHE_TTL: Seconds an entry stays valid (default: 3600)
+    - LLM_CACHE_PERSIST: "1" to enable the MongoDB tier (default: "0")
+"""
+
+import copy
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from app.database import llm_cache_collection
+
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_PERSIST = os.getenv("LLM_CACHE_PERSIST", "0") == "1"
+
+
+def normalize_context(context: Dict[str, Any]) -> Dict[str, list]:
+    """
+    Normalize a decision context so near-identical submissions share a cache key.
+
+    Whitespace inside each entry is collapsed and every list is sorted, since the order
+    of previsions, processes and constraints does not change the analysis.
+
+    Args:
+        context (Dict[str, Any]): {"previsions": [...], "processes": [...], "constraints": [...]}
+
+    Returns:
+        Dict[str, list]: The normalized context
+    """
+    return {
+        field: sorted(" ".join(str(entry).split()) for entry in context.get(field, []))
+        for field in ("previsions", "processes", "constraints")
+    }
+
+
+def cache_key(payload: Any, model: str, prompt_version: str) -> str:
+    """
+    Hash a request payload, model and prompt version into a cache key.
+
+    Args:
+        payload (Any): JSON-serializable, already normalized request content
+        model (str): LLM model name
+        prompt_version (str): Version of the prompt template
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    raw = json.dumps([payload, model, prompt_version], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two-tier (in-process LRU + optional MongoDB) TTL cache for parsed LLM responses.
+
+    Values are copied in and out, so a caller mutating the response it got (or stored)
+    never changes what the next caller receives.
+
+    Example:
+        >>> cache = LLMResponseCache(maxsize=256, ttl=600)
+        >>> await cache.set(key, {"risks_decisions": [...]})
+        >>> await cache.get(key)
+        {'risks_decisions': [...]}
+    """
+
+    def __init__(self, maxsize: int = LLM_CACHE_SIZE, ttl: int = LLM_CACHE_TTL, collection=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.collection = collection
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, value: Any, expires_at: float):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Return a copy of the cached value for `key`, or None on a miss or after expiry."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return copy.deepcopy(value)
+            del self._entries[key]
+
+        if self.collection is not None:
+            document = await self.collection.find_one(
+                {"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}}, {"value": 1, "expires_at": 1}
+            )
+            if document:
+                expires_at = document["expires_at"].replace(tzinfo=timezone.utc)
+                remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+                self._remember(key, document["value"], time.monotonic() + remaining)
+                self.persistent_hits += 1
+                return copy.deepcopy(document["value"])
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any):
+        """Store `value` under `key` in every tier for `ttl` seconds."""
+        self._remember(key, copy.deepcopy(value), time.monotonic() + self.ttl)
+        if self.collection is not None:
+            expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+            await self.collection.replace_one({"_id": key}, {"value": value, "expires_at": expires_at}, upsert=True)
+
+    def clear(self):
+        """Drop the in-process tier and reset the counters."""
+        self._entries.clear()
+        self.memory_hits = self.persistent_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size of the in-process tier."""
+        lookups = self.memory_hits + self.persistent_hits + self.misses
+        hits = self.memory_hits + self.persistent_hits
+        return {
+            "entries": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "persistent": self.collection is not None,
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+response_cache = LLMResponseCache(collection=llm_cache_collection if LLM_CACHE_PERSIST else None)
@@ -0,0 +1,349 @@
+"""
+LLM Scheduler Module
+
+This module admits LLM API calls under the provider's limits instead of sending them all at
+once and turning every 429 into a failed request.
+
+Admission:
+    - Token bucket: at most LLM_RATE_LIMIT requests per second, with bursts of LLM_RATE_BURST
+    - Per-model concurrency cap: at most LLM_MAX_CONCURRENCY calls in flight per model
+    - Priority queue: waiting calls are admitted by priority class, then arrival order, so
+      interactive calls overtake bulk analysis
+
+Retries:
+    429, 500, 502, 503 and 504 responses and transport errors are retried up to
+    LLM_MAX_RETRIES times with full-jitter exponential backoff. A `Retry-After` header is
+    honored, and after a 429 no call to that model is admitted until it has elapsed.
+
+Environment Variables:
+    - LLM_RATE_LIMIT: Requests per second, 0 for no limit (default: 5)
+    - LLM_RATE_BURST: Token bucket size (default: 10)
+    - LLM_MAX_CONCURRENCY: Calls in flight per model (default: 8)
+    - LLM_MAX_RETRIES: Retries after the first attempt (default: 3)
+    - LLM_BACKOFF_BASE / LLM_BACKOFF_MAX: Backoff bounds in seconds (default: 0.5 / 30)
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncContextManager, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+LLM_RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", "5"))
+LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", "10"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_STANDARD = 1
+PRIORITY_BULK = 2
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_STANDARD: "standard", PRIORITY_BULK: "bulk"}
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+WAIT_SAMPLES = 1000
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Convert a `Retry-After` header (seconds or HTTP date) into seconds from now.
+
+    Args:
+        value (Optional[str]): Header value
+
+    Returns:
+        Optional[float]: Non-negative delay, or None if absent or unparsable
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class LLMScheduler:
+    """
+    Rate-limit-aware, prioritized admission and retry of LLM API calls.
+
+    Example:
+        >>> scheduler = LLMScheduler(rate=2, burst=4, max_concurrency=2)
+        >>> response = await scheduler.request(lambda: client.post(URL, json=data), MODEL, PRIORITY_INTERACTIVE)
+        >>> async with scheduler.stream(lambda: client.stream("POST", URL, json=data), MODEL) as response:
+        ...     async for line in response.aiter_lines(): ...
+    """
+
+    def __init__(
+        self,
+        rate: float = LLM_RATE_LIMIT,
+        burst: int = LLM_RATE_BURST,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_base: float = LLM_BACKOFF_BASE,
+        backoff_max: float = LLM_BACKOFF_MAX,
+    ):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._paused_until: Dict[str, float] = {}
+        self._active: Dict[str, int] = defaultdict(int)
+        # model -> heap of [priority, sequence, enqueued_at, future]
+        self._queues: Dict[str, List[list]] = defaultdict(list)
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        self.admitted = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failures = 0
+        self._waits: deque = deque(maxlen=WAIT_SAMPLES)
+        self._max_wait = 0.0
+
+    # Admission
+
+    def _refill(self, now: float):
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _can_admit(self, model: str, now: float) -> bool:
+        return (
+            self._active[model] < self.max_concurrency
+            and self._paused_until.get(model, 0) <= now
+            and (self.rate <= 0 or self._tokens >= 1)
+        )
+
+    def _admit(self, model: str, started: float):
+        if self.rate > 0:
+            self._tokens -= 1
+        self._active[model] += 1
+        self.admitted += 1
+        waited = time.monotonic() - started
+        self._waits.append(waited)
+        self._max_wait = max(self._max_wait, waited)
+
+    def _release(self, model: str):
+        self._active[model] -= 1
+        self._wakeup.set()
+
+    def _next_waiter(self, now: float) -> Optional[str]:
+        # Best queued call among the models that have a free slot and are not paused
+        best = None
+        for model, queue in self._queues.items():
+            while queue and queue[0][3].done():
+                heapq.heappop(queue)
+            if not queue or self._active[model] >= self.max_concurrency or self._paused_until.get(model, 0) > now:
+                continue
+            if best is None or queue[0][:2] < self._queues[best][0][:2]:
+                best = model
+        return best
+
+    async def _dispatch(self):
+        while any(self._queues.values()):
+            now = time.monotonic()
+            self._refill(now)
+            model = self._next_waiter(now)
+            if model is None:
+                # Wait for a release, or for the earliest pause to end
+                self._wakeup.clear()
+                paused = [until - now for until in self._paused_until.values() if until > now]
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), min(paused) if paused else None)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            if self.rate > 0 and self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                continue
+
+            _, _, started, future = heapq.heappop(self._queues[model])
+            future.set_result(None)
+            self._admit(model, started)
+        self._dispatcher = None
+
+    async def acquire(self, model: str, priority: int = PRIORITY_STANDARD):
+        """
+        Wait until a call to `model` may be sent. Pair every acquire with `release`.
+
+        Args:
+            model (str): LLM model name, the unit of the concurrency cap
+            priority (int): PRIORITY_INTERACTIVE, PRIORITY_STANDARD or PRIORITY_BULK
+        """
+        started = time.monotonic()
+        self._refill(started)
+        if not any(self._queues.values()) and self._can_admit(model, started):
+            self._admit(model, started)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queues[model], [priority, next(self._sequence), started, future])
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        self._wakeup.set()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Admitted just as the caller was cancelled: hand the slot back
+            if future.done() and not future.cancelled():
+                self._release(model)
+            raise
+
+    def release(self, model: str):
+        """Free the slot taken by `acquire`."""
+        self._release(model)
+
+    @asynccontextmanager
+    async def slot(self, model: str, priority: int = PRIORITY_STANDARD) -> AsyncIterator[None]:
+        """Hold an admission slot for `model` for the duration of the block."""
+        await self.acquire(model, priority)
+        try:
+            yield
+        finally:
+            self.release(model)
+
+    # Retries
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential delay for `attempt`, never shorter than `retry_after`."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    def _retry_delay(self, model: str, attempt: int, response: httpx.Response) -> Optional[float]:
+        if response.status_code not in RETRY_STATUSES:
+            return None
+        if response.status_code == 429:
+            self.rate_limited += 1
+        if attempt >= self.max_retries:
+            self.failures += 1
+            return None
+        retry_after = parse_retry_after(response.headers.get("retry-after"))
+        if response.status_code == 429 and retry_after is not None:
+            self._paused_until[model] = time.monotonic() + min(retry_after, self.backoff_max)
+        return self.backoff(attempt, retry_after)
+
+    async def _sleep_before_retry(self, model: str, attempt: int, delay: float, reason: str):
+        self.retries += 1
+        print(f"⚠️ LLM call to {model} failed ({reason}), retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+        await asyncio.sleep(delay)
+
+    async def request(
+        self, send: Callable[[], Awaitable[httpx.Response]], model: str, priority: int = PRIORITY_STANDARD
+    ) -> httpx.Response:
+        """
+        Send a request once admitted, retrying rate limits, server errors and transport errors.
+
+        Args:
+            send (Callable[[], Awaitable[httpx.Response]]): Sends the request, called once per attempt
+            model (str): LLM model name
+            priority (int): Priority class of the call
+
+        Returns:
+            httpx.Response: The first non-retryable response, or the last one once retries are exhausted
+
+        Raises:
+            httpx.TransportError: If the last attempt failed to connect or read
+        """
+        for attempt in itertools.count():
+            async with self.slot(model, priority):
+                try:
+                    response = await send()
+                except httpx.TransportError as e:
+                    if attempt >= self.max_retries:
+                        self.failures += 1
+                        raise
+                    delay, reason = self.backoff(attempt), type(e).__name__
+                else:
+                    delay, reason = self._retry_delay(model, attempt, response), f"HTTP {response.status_code}"
+                    if delay is None:
+                        return response
+            await self._sleep_before_retry(model, attempt, delay, reason)
+
+    @asynccontextmanager
+    async def stream(
+        self, open_stream: Callable[[], AsyncContextManager[httpx.Response]], model: str, priority: int = PRIORITY_STANDARD
+    ) -> AsyncIterator[httpx.Response]:
+        """
+        Open a streaming request once admitted, holding the slot until the block exits.
+
+        Only failures before the body is read are retried; an error while the caller reads
+        the stream is raised to the caller.
+
+        Args:
+            open_stream (Callable[[], AsyncContextManager[httpx.Response]]): e.g. `lambda: client.stream(...)`
+            model (str): LLM model name
+            priority (int): Priority class of the call
+
+        Yields:
+            httpx.Response: The open response (possibly an error status once retries are exhausted)
+        """
+        for attempt in itertools.count():
+            delivered = False
+            async with self.slot(model, priority):
+                try:
+                    async with open_stream() as response:
+                        delay, reason = self._retry_delay(model, attempt, response), f"HTTP {response.status_code}"
+                        if delay is None:
+                            delivered = True
+                            yield response
+                            return
+                except httpx.TransportError as e:
+                    if delivered or attempt >= self.max_retries:
+                        if not delivered:
+                            self.failures += 1
+                        raise
+                    delay, reason = self.backoff(attempt), type(e).__name__
+            await self._sleep_before_retry(model, attempt, delay, reason)
+
+    # Metrics
+
+    def stats(self) -> Dict[str, object]:
+        """Return queue depth, in-flight calls, wait-time percentiles and retry counters."""
+        depth = defaultdict(int)
+        for queue in self._queues.values():
+            for priority, _, _, future in queue:
+                if not future.done():
+                    depth[PRIORITY_NAMES.get(priority, str(priority))] += 1
+        waits = sorted(self._waits)
+
+        def percentile(fraction: float) -> float:
+            return round(waits[min(len(waits) - 1, int(fraction * len(waits)))], 4) if waits else 0.0
+
+        now = time.monotonic()
+        self._refill(now)
+        return {
+            "queue_depth": dict(depth),
+            "in_flight": {model: count for model, count in self._active.items() if count},
+            "paused": {model: round(until - now, 2) for model, until in self._paused_until.items() if until > now},
+            "tokens": round(self._tokens, 2) if self.rate > 0 else None,
+            "admitted": self.admitted,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "failures": self.failures,
+            "wait_seconds": {"p50": percentile(0.5), "p95": percentile(0.95), "max": round(self._max_wait, 4)},
+        }
@@ -11,6 +11,14 @@ Dependencies:
 
 Environment Variables Required:
     - OPENROUTER_API_KEY: API key for OpenRouter service
+
+Optional Environment Variables:
+    - LLM_API_URL: Chat-completions endpoint (default: OpenRouter), e.g. a local stub server
+    - LLM_MODEL: Model name sent to the API
+    - LLM_MAX_CONNECTIONS / LLM_MAX_KEEPALIVE: Connection pool limits (default: 20 / 10)
+    - LLM_CONNECT_TIMEOUT / LLM_READ_TIMEOUT: Timeouts in seconds (default: 5 / 120)
+    - LLM_HTTP2: "0" to disable HTTP/2 (default: "1")
+    - LLM_RATE_LIMIT, LLM_MAX_CONCURRENCY, LLM_MAX_RETRIES, ...: Call scheduling, see `llm_scheduler`
 """
 
 import os
@@ -19,7 +27,11 @@ import json
 import re
 from dotenv import load_dotenv
 from bson import ObjectId
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Dict, List, Optional
+from app.services.json_stream import JSONArrayStreamParser
+from app.services.llm_cache import response_cache, cache_key, normalize_context
+from app.services.llm_scheduler import LLMScheduler, PRIORITY_INTERACTIVE, PRIORITY_STANDARD
+from app.services.singleflight import SingleFlight
 
 # Load environment variables
 load_dotenv()
@@ -28,12 +40,91 @@ API_KEY = os.getenv("OPENROUTER_API_KEY")
 if not API_KEY:
     raise ValueError("❌ Missing API Key! Set OPENROUTER_API_KEY in your .env file.")
 
-URL = "https://openrouter.ai/api/v1/chat/completions"
+URL = os.getenv("LLM_API_URL", "https://openrouter.ai/api/v1/chat/completions")
+MODEL = os.getenv("LLM_MODEL", "google/gemini-2.0-pro-exp-02-05:free")
+# Bump when the risks/decisions prompt changes so cached answers to the old prompt are not reused
+RISKS_PROMPT_VERSION = "risks-v1"
 HEADERS = {
     "Authorization": f"Bearer {API_KEY}",
     "Content-Type": "application/json",
 }
 
+HTTP_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+    max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", "10")),
+    keepalive_expiry=60,
+)
+HTTP_TIMEOUT = httpx.Timeout(
+    connect=float(os.getenv("LLM_CONNECT_TIMEOUT", "5")),
+    read=float(os.getenv("LLM_READ_TIMEOUT", "120")),
+    write=10.0,
+    pool=10.0,
+)
+HTTP2 = os.getenv("LLM_HTTP2", "1") == "1"
+
+_http_client: Optional[httpx.AsyncClient] = None
+# Concurrent requests for the same prompt key share one upstream call
+_in_flight = SingleFlight()
+# Every upstream call is admitted by priority under the rate limit and retried on 429/5xx
+scheduler = LLMScheduler()
+
+
+def create_http_client(**kwargs) -> httpx.AsyncClient:
+    """
+    Create the pooled HTTP client used for every LLM API call.
+
+    Args:
+        **kwargs: Overrides for `httpx.AsyncClient` (e.g. `transport=` in tests)
+
+    Returns:
+        httpx.AsyncClient: Keep-alive client with pool limits, HTTP/2 and explicit timeouts
+    """
+    options = {"http2": HTTP2, "limits": HTTP_LIMITS, "timeout": HTTP_TIMEOUT, "headers": HEADERS}
+    options.update(kwargs)
+    return httpx.AsyncClient(**options)
+
+
+def set_http_client(client: Optional[httpx.AsyncClient]):
+    """
+    Install the shared HTTP client, e.g. one pointed at a local stub server in tests.
+
+    Args:
+        client (Optional[httpx.AsyncClient]): Client to use, or None to reset
+    """
+    global _http_client
+    _http_client = client
+
+
+def in_flight_stats() -> Dict[str, int]:
+    """Return single-flight counters for the LLM calls."""
+    return _in_flight.stats()
+
+
+def scheduler_stats() -> Dict[str, object]:
+    """Return queue depth, wait-time and retry metrics of the LLM call scheduler."""
+    return scheduler.stats()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client, creating it on first use outside the app lifespan."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = create_http_client()
+    return _http_client
+
+
+async def start_http_client():
+    """Open the shared HTTP client on app startup."""
+    get_http_client()
+
+
+async def close_http_client():
+    """Close the shared HTTP client and its pooled connections on app shutdown."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
 def convert_objectid_to_str(data: Any) -> Any:
     """
     Recursively convert ObjectId fields to strings in a MongoDB document.
@@ -58,7 +149,7 @@ def convert_objectid_to_str(data: Any) -> Any:
     else:
         return data
 
-async def get_risks_and_decisions(context_data: dict):
+async def get_risks_and_decisions(context_data: dict, use_cache: bool = True, priority: int = PRIORITY_STANDARD):
     """
     Analyze logistics context using OpenRouter LLM API and return potential risks and recommended decisions.
 
@@ -67,6 +158,10 @@ async def get_risks_and_decisions(context_data: dict):
             - previsions (list): List of logistics forecasts or predictions
             - processes (list): List of current logistics processes
             - constraints (list): List of operational constraints
+        use_cache (bool): Read the response cache first; when False the API is always called
+            and the fresh result replaces the cached one. Either way, concurrent calls for the
+            same context share a single API request.
+        priority (int): Scheduling class of the API call (see `llm_scheduler`)
 
     Returns:
         dict: A dictionary containing either:
@@ -97,8 +192,23 @@ async def get_risks_and_decisions(context_data: dict):
             ]
         }
     """
-    print("📤 Context Data Received:", context_data)
+    key = cache_key(normalize_context(context_data), MODEL, RISKS_PROMPT_VERSION)
+    if use_cache:
+        cached = await response_cache.get(key)
+        if cached is not None:
+            return cached
+
+    async def fetch():
+        result = await _fetch_risks_and_decisions(context_data, priority)
+        if "error" not in result:
+            await response_cache.set(key, result)
+        return result
+
+    return await _in_flight.do(key, fetch)
+
 
+def _risks_request(context_data: dict) -> dict:
+    """Build the chat-completions request body of the risks/decisions prompt."""
     prompt = f"""
     Given the following logistics context:
     - Previsions: {context_data.get('previsions', [])}
@@ -110,59 +220,159 @@ async def get_risks_and_decisions(context_data: dict):
     - "risk": A description of the risk.
     - "decision": A recommended decision to mitigate the risk.
     """
-    print(API_KEY)
-
-    data = {
-        "model": "google/gemini-2.0-pro-exp-02-05:free",
+    return {
+        "model": MODEL,
         "messages": [
             {"role": "system", "content": "You are an AI assisting with logistics optimization."},
             {"role": "user", "content": prompt}
         ]
     }
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(URL, headers=HEADERS, json=data)
 
-            print("📥 Response Status Code:", response.status_code)
-            print("📥 Raw API Response:", response.text)
+async def _fetch_risks_and_decisions(context_data: dict, priority: int = PRIORITY_STANDARD):
+    """Call the LLM API for `get_risks_and_decisions`, bypassing the cache."""
+    print("📤 Context Data Received:", context_data)
 
-            if response.status_code == 401:
-                return {"error": "Unauthorized: Check your API key."}
+    data = _risks_request(context_data)
+    client = get_http_client()
+    try:
+        response = await scheduler.request(lambda: client.post(URL, json=data), MODEL, priority)
 
-            if response.status_code != 200:
-                return {"error": f"LLM API error: {response.text}"}
+        print("📥 Response Status Code:", response.status_code)
+        print("📥 Raw API Response:", response.text)
+
+        if response.status_code == 401:
+            return {"error": "Unauthorized: Check your API key."}
+
+        if response.status_code != 200:
+            return {"error": f"LLM API error: {response.text}"}
+
+        # Extract and clean JSON response
+        response_json = response.json()
+        response_content = response_json["choices"][0]["message"]["content"]
+
+        clean_json = re.sub(r"```json\n|\n```", "", response_content).strip()
+
+        risks_decisions = json.loads(clean_json)
+        print("✅ Parsed Response:", risks_decisions)
+
+        return {"risks_decisions": risks_decisions}
+
+    except json.JSONDecodeError:
+        print("❌ Failed to parse response JSON:", response.text)
+        return {"error": "Failed to parse response JSON. Ensure the LLM API returns valid JSON."}
+
+    except httpx.HTTPStatusError as http_err:
+        print(f"❌ HTTP error: {http_err}")
+        return {"error": f"HTTP error: {str(http_err)}"}
 
-            # Extract and clean JSON response
-            response_json = response.json()
-            response_content = response_json["choices"][0]["message"]["content"]
+    except Exception as e:
+        print(f"❌ Exception: {e}")
+        return {"error": f"Exception during LLM API call: {str(e)}"}
 
-            clean_json = re.sub(r"```json\n|\n```", "", response_content).strip()
+async def stream_risks_and_decisions(context_data: dict, use_cache: bool = True) -> AsyncIterator[dict]:
+    """
+    Stream the risks and decisions for a logistics context, one item at a time.
+
+    The completion is requested with `"stream": true` and its JSON array is parsed while the
+    tokens arrive, so each `{"risk", "decision"}` object is yielded as soon as it is complete
+    instead of after the whole completion. The complete list is cached like the result of
+    `get_risks_and_decisions`, and a cache hit is replayed without calling the API.
 
-            risks_decisions = json.loads(clean_json)
-            print("✅ Parsed Response:", risks_decisions)
+    Args:
+        context_data (dict): Logistics context, see `get_risks_and_decisions`
+        use_cache (bool): Replay a cached result when available
 
-            return {"risks_decisions": risks_decisions}
+    Yields:
+        dict: Each risk/decision object, or a final {"error": str} if the call or parsing fails
 
-        except json.JSONDecodeError:
-            print("❌ Failed to parse response JSON:", response.text)
-            return {"error": "Failed to parse response JSON. Ensure the LLM API returns valid JSON."}
+    Example:
+        >>> async for item in stream_risks_and_decisions(context):
+        ...     print(item)
+        {'risk': 'Warehouse overflow due to high demand', 'decision': 'Lease additional storage'}
+    """
+    key = cache_key(normalize_context(context_data), MODEL, RISKS_PROMPT_VERSION)
+    if use_cache:
+        cached = await response_cache.get(key)
+        if cached is not None:
+            for item in cached["risks_decisions"]:
+                yield item
+            return
+
+    print("📤 Context Data Received (stream):", context_data)
+    data = {**_risks_request(context_data), "stream": True}
+    parser = JSONArrayStreamParser()
+    content: List[str] = []
+    items: List[dict] = []
+
+    client = get_http_client()
+    try:
+        async with scheduler.stream(lambda: client.stream("POST", URL, json=data), MODEL, PRIORITY_STANDARD) as response:
+            print("📥 Response Status Code:", response.status_code)
+            if response.status_code == 401:
+                yield {"error": "Unauthorized: Check your API key."}
+                return
+            if response.status_code != 200:
+                await response.aread()
+                yield {"error": f"LLM API error: {response.text}"}
+                return
+
+            # Server-sent events: "data: {chunk}" lines, ": comment" keep-alives, "data: [DONE]"
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                payload = line[5:].strip()
+                if payload == "[DONE]":
+                    break
+                chunk = json.loads(payload)
+                if "error" in chunk:
+                    yield {"error": f"LLM API error: {chunk['error']}"}
+                    return
+
+                delta = (chunk.get("choices") or [{}])[0].get("delta", {}).get("content") or ""
+                content.append(delta)
+                for item in parser.feed(delta):
+                    items.append(item)
+                    yield item
+
+    except json.JSONDecodeError:
+        print("❌ Failed to parse streamed JSON:", "".join(content))
+        yield {"error": "Failed to parse response JSON. Ensure the LLM API returns valid JSON."}
+        return
+
+    except httpx.HTTPError as http_err:
+        print(f"❌ HTTP error: {http_err}")
+        yield {"error": f"HTTP error: {str(http_err)}"}
+        return
+
+    if not parser.finished:
+        print("❌ Incomplete streamed JSON:", "".join(content))
+        yield {"error": "Failed to parse response JSON. Ensure the LLM API returns valid JSON."}
+        return
+
+    print(f"✅ Streamed {len(items)} risks/decisions")
+    await response_cache.set(key, {"risks_decisions": items})
+
+
+def _memory_section(memory: Optional[dict]) -> str:
+    if not memory:
+        return ""
+    return f"""Summary of the user's decision history (risk categories, approvals, recent approved decisions):
+    {json.dumps(memory, default=str)}
 
-        except httpx.HTTPStatusError as http_err:
-            print(f"❌ HTTP error: {http_err}")
-            return {"error": f"HTTP error: {str(http_err)}"}
+    """
 
-        except Exception as e:
-            print(f"❌ Exception: {e}")
-            return {"error": f"Exception during LLM API call: {str(e)}"}
 
-async def get_best_decision(problem: str, decision_contexts: list):
+async def get_best_decision(problem: str, decision_contexts: list, memory: Optional[dict] = None):
     """
     Analyze past decision contexts and suggest the best decision for a given problem using OpenRouter LLM API.
 
     Args:
         problem (str): Description of the current logistics problem to solve
-        decision_contexts (list): List of previous decision contexts from MongoDB, containing ObjectId fields
+        decision_contexts (list): Previous decision contexts from MongoDB relevant to the problem
+            (see `decision_index`), containing ObjectId fields
+        memory (Optional[dict]): Fixed-size summary of the user's whole decision history
+            (see `decision_memory.memory_prompt_summary`)
 
     Returns:
         dict: A dictionary containing either:
@@ -201,46 +411,48 @@ async def get_best_decision(problem: str, decision_contexts: list):
     Given the following problem:
     - Problem: {problem}
 
-    Based on previous decision contexts:
-    {json.dumps(decision_contexts, indent=2)}
+    {_memory_section(memory)}Based on the most relevant previous decision contexts:
+    {json.dumps(decision_contexts, default=str)}
 
     Suggest the best decision to resolve the problem, considering past decisions.
     Format your response as a JSON object with:
     - "best_decision": The recommended decision.
     """
-    print(API_KEY)
-
     data = {
-        "model": "google/gemini-2.0-pro-exp-02-05:free",
+        "model": MODEL,
         "messages": [
             {"role": "system", "content": "You are an AI assisting with logistics optimization."},
             {"role": "user", "content": prompt}
         ]
     }
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(URL, headers=HEADERS, json=data)
+    client = get_http_client()
+    try:
+        response = await scheduler.request(lambda: client.post(URL, json=data), MODEL, PRIORITY_INTERACTIVE)
 
-            print("📥 Response Status Code:", response.status_code)
-            print("📥 Raw API Response:", response.text)
+        print("📥 Response Status Code:", response.status_code)
+        print("📥 Raw API Response:", response.text)
 
-            if response.status_code == 401:
-                return {"error": "Unauthorized: Check your API key."}
+        if response.status_code == 401:
+            return {"error": "Unauthorized: Check your API key."}
 
-            if response.status_code != 200:
-                return {"error": f"LLM API error: {response.text}"} 
+        if response.status_code != 200:
+            return {"error": f"LLM API error: {response.text}"} 
+
+        response_json = response.json()
+        response_content = response_json["choices"][0]["message"]["content"]
 
-            response_json = response.json()
-            response_content = response_json["choices"][0]["message"]["content"]
+        clean_json = re.sub(r"```json\n|\n```", "", response_content).strip()
 
-            clean_json = re.sub(r"```json\n|\n```", "", response_content).strip()
+        best_decision = json.loads(clean_json)  
+        print("✅ Parsed Response:", best_decision)
 
-            best_decision = json.loads(clean_json)  
-            print("✅ Parsed Response:", best_decision)
+        return {"best_decision": best_decision}
 
-            return {"best_decision": best_decision}
+    except json.JSONDecodeError:
+        print("❌ Failed to parse response JSON:", response.text)
+        return {"error": "Failed to parse response JSON. Ensure the LLM API returns valid JSON."}
 
-        except json.JSONDecodeError:
-            print("❌ Failed to parse response JSON:", response.text)
-            return {"error": "Failed to parse response JSON. Ensure the LLM API returns valid JSON."}
\ No newline at end of file
+    except httpx.HTTPError as http_err:
+        print(f"❌ HTTP error: {http_err}")
+        return {"error": f"HTTP error: {str(http_err)}"}
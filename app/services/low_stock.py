@@ -0,0 +1,187 @@
+"""
+Low Stock Module
+
+This module keeps a `below_reorder_point` flag on every inventory record
+(`stock_level <= reorder_point`) and acts on it:
+    - Every write maintains the flag in the same update: stock movements through the
+      pipeline stages of `reorder_flag_stages`, create/PUT from the submitted values
+    - A partial index holds only the flagged records (see `app.indexes`), so the
+      "items to reorder" list reads just those rows instead of scanning all inventory
+    - When a write flips the flag (a crossing), the update records it in `reorder_crossing`
+      and a `low_stock_crossing` event is published, one per warehouse
+
+Crossing event, published to the `low_stock` and `low_stock:<warehouse_id>` topics:
+    {
+        "type": "low_stock_crossing",
+        "warehouse_id": str | None,
+        "crossings": [
+            {"inventory_id", "product_id", "stock_level", "reorder_point", "min_stock_level",
+             "below": bool}   # True: dropped to the reorder point, False: recovered above it
+        ]
+    }
+
+Usage:
+    Set the flag on existing records (backfill, or repair after writes that bypassed the API):
+        python -m app.services.low_stock rebuild
+"""
+
+import asyncio
+import sys
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from app.database import inventory_collection
+from app.services.websocket_manager import manager
+
+BELOW_REORDER_POINT = {"$lte": ["$stock_level", "$reorder_point"]}
+
+CROSSING_PROJECTION = {
+    "product_id": 1, "warehouse_id": 1, "stock_level": 1, "reorder_point": 1, "min_stock_level": 1,
+    "below_reorder_point": 1, "reorder_crossing": 1,
+}
+
+
+def is_below_reorder_point(inventory: dict) -> bool:
+    """Return whether a record's stock level is at or below its reorder point."""
+    return inventory["stock_level"] <= inventory["reorder_point"]
+
+
+def reorder_flag_stages(crossing_id: str, now: datetime) -> List[dict]:
+    """
+    Update-pipeline stages that recompute `below_reorder_point` after `stock_level` changed.
+
+    When the flag flips, `reorder_crossing` is set to {"id": crossing_id, "below", "at"}, so
+    the writer can find the records it moved across the reorder point.
+
+    Args:
+        crossing_id (str): ID of this write attempt, e.g. the movement ID; a retry of a
+            bulk batch uses a new one so its writer only publishes its own crossings
+        now (datetime): Timestamp of the write
+
+    Returns:
+        List[dict]: Stages to append to an update pipeline
+    """
+    crossed = {"$ne": [BELOW_REORDER_POINT, {"$ifNull": ["$below_reorder_point", False]}]}
+    return [
+        {
+            "$set": {
+                "reorder_crossing": {
+                    "$cond": [
+                        crossed,
+                        {"id": {"$literal": crossing_id}, "below": BELOW_REORDER_POINT, "at": now},
+                        "$reorder_crossing",
+                    ]
+                }
+            }
+        },
+        {"$set": {"below_reorder_point": BELOW_REORDER_POINT}},
+    ]
+
+
+def crossing_event(inventory: dict) -> dict:
+    """Describe one record that crossed its reorder point."""
+    return {
+        "inventory_id": str(inventory["_id"]),
+        "product_id": inventory.get("product_id"),
+        "stock_level": inventory.get("stock_level"),
+        "reorder_point": inventory.get("reorder_point"),
+        "min_stock_level": inventory.get("min_stock_level"),
+        "below": is_below_reorder_point(inventory),
+    }
+
+
+def publish_crossings(records: Iterable[dict]) -> int:
+    """
+    Publish one `low_stock_crossing` event per warehouse for records that crossed their reorder point.
+
+    Args:
+        records (Iterable[dict]): Inventory documents after the write
+
+    Returns:
+        int: Number of events published
+    """
+    by_warehouse: Dict[Optional[str], List[dict]] = defaultdict(list)
+    for record in records:
+        by_warehouse[record.get("warehouse_id")].append(crossing_event(record))
+
+    for warehouse_id, crossings in by_warehouse.items():
+        event = {"type": "low_stock_crossing", "warehouse_id": warehouse_id, "crossings": crossings}
+        manager.publish("low_stock", event)
+        if warehouse_id:
+            manager.publish(f"low_stock:{warehouse_id}", event)
+    return len(by_warehouse)
+
+
+async def get_reorder_list(warehouse_id: Optional[str] = None, collection=inventory_collection) -> Dict[str, object]:
+    """
+    List the records at or below their reorder point, grouped per warehouse.
+
+    Reads only flagged records, through the partial index on `below_reorder_point`.
+
+    Args:
+        warehouse_id (Optional[str]): Only this warehouse
+        collection: Inventory collection
+
+    Returns:
+        dict: {"items": int, "warehouses": [{"warehouse_id", "count", "items": [...]}]}, each
+            item with the quantity that brings it back to `max_stock_level`
+
+    Example:
+        >>> await get_reorder_list("W-1")
+        {'items': 2, 'warehouses': [{'warehouse_id': 'W-1', 'count': 2, 'items': [...]}]}
+    """
+    match = {"below_reorder_point": True}
+    if warehouse_id is not None:
+        match["warehouse_id"] = warehouse_id
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"warehouse_id": 1, "product_id": 1}},
+        {
+            "$group": {
+                "_id": "$warehouse_id",
+                "count": {"$sum": 1},
+                "items": {
+                    "$push": {
+                        "inventory_id": {"$toString": "$_id"},
+                        "product_id": "$product_id",
+                        "stock_level": "$stock_level",
+                        "reorder_point": "$reorder_point",
+                        "min_stock_level": "$min_stock_level",
+                        "max_stock_level": "$max_stock_level",
+                        "below_min_stock": {"$lt": ["$stock_level", "$min_stock_level"]},
+                        "reorder_quantity": {"$max": [0, {"$subtract": ["$max_stock_level", "$stock_level"]}]},
+                    }
+                },
+            }
+        },
+        {"$sort": {"_id": 1}},
+    ]
+    groups = await collection.aggregate(pipeline).to_list(None)
+    warehouses = [{"warehouse_id": group["_id"], "count": group["count"], "items": group["items"]} for group in groups]
+    return {"items": sum(group["count"] for group in warehouses), "warehouses": warehouses}
+
+
+async def rebuild_low_stock_flags(collection=inventory_collection) -> int:
+    """
+    Recompute `below_reorder_point` on every record, without publishing crossings.
+
+    Returns:
+        int: Number of records whose flag changed
+    """
+    result = await collection.update_many(
+        {"stock_level": {"$exists": True}, "reorder_point": {"$exists": True}},
+        [{"$set": {"below_reorder_point": BELOW_REORDER_POINT}}],
+    )
+    return result.modified_count
+
+
+async def _main(command: str):
+    if command != "rebuild":
+        raise SystemExit(f"Unknown command '{command}', expected 'rebuild'")
+    changed = await rebuild_low_stock_flags()
+    print(f"✅ Rebuilt low-stock flags: {changed} records changed")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "rebuild"))
@@ -0,0 +1,215 @@
+"""
+Pagination Service Module
+
+This module provides keyset (cursor) pagination and NDJSON streaming for the list endpoints.
+Pages are addressed by an opaque cursor that encodes the sort value and `_id` of the last
+document returned, so every page is an index seek instead of an offset scan.
+
+Dependencies:
+    - motor: For async MongoDB cursors
+    - bson: For round-tripping ObjectId and datetime values through the cursor
+"""
+
+import base64
+import json
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from bson import json_util
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 1000
+
+
+def encode_cursor(sort_field: str, document: dict) -> str:
+    """
+    Encode the position of a document into an opaque pagination cursor.
+
+    Args:
+        sort_field (str): Field the listing is ordered by (`_id` for insertion order)
+        document (dict): Last document of the current page
+
+    Returns:
+        str: URL-safe cursor to pass back as `after`
+
+    Example:
+        >>> encode_cursor("_id", {"_id": ObjectId("507f1f77bcf86cd799439011")})
+        'eyJfaWQiOiB7IiRvaWQiOiAiNTA3ZjFmNzdiY2Y4NmNkNzk5NDM5MDExIn19'
+    """
+    position = {"_id": document["_id"]}
+    if sort_field != "_id":
+        position[sort_field] = document.get(sort_field)
+    raw = json_util.dumps(position).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """
+    Decode a cursor produced by `encode_cursor`.
+
+    Args:
+        cursor (str): Opaque cursor received in the `after` query parameter
+
+    Returns:
+        dict: The `_id` (and sort field value) of the last document already returned
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    if not isinstance(position, dict) or "_id" not in position:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return position
+
+
+def keyset_filter(query: dict, sort_field: str, after: Optional[str]) -> dict:
+    """
+    Combine a base query with the keyset condition for the page that follows `after`.
+
+    Args:
+        query (dict): Base MongoDB filter
+        sort_field (str): Field the listing is ordered by
+        after (Optional[str]): Cursor of the previous page, or None for the first page
+
+    Returns:
+        dict: MongoDB filter selecting only documents after the cursor position
+    """
+    if not after:
+        return query
+
+    position = decode_cursor(after)
+    if sort_field == "_id":
+        condition = {"_id": {"$gt": position["_id"]}}
+    else:
+        value = position.get(sort_field)
+        condition = {
+            "$or": [
+                {sort_field: {"$gt": value}},
+                {sort_field: value, "_id": {"$gt": position["_id"]}},
+            ]
+        }
+    return {"$and": [query, condition]} if query else condition
+
+
+def stringify_id(document: dict) -> dict:
+    """
+    Return a raw MongoDB document with its `_id` converted to a string.
+
+    Args:
+        document (dict): Raw document as returned by Motor
+
+    Returns:
+        dict: The same document, JSON-serializable `_id`
+    """
+    document["_id"] = str(document["_id"])
+    return document
+
+
+def _projection(projection: Optional[dict], sort_field: str) -> Optional[dict]:
+    # The sort field is needed to build the next cursor even when it is not displayed
+    if projection is None or sort_field == "_id":
+        return projection
+    return {**projection, sort_field: 1}
+
+
+def _sort_spec(sort_field: str) -> list:
+    if sort_field == "_id":
+        return [("_id", 1)]
+    return [(sort_field, 1), ("_id", 1)]
+
+
+async def paginate(
+    collection,
+    transform: Callable[[dict], Any],
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+    query: Optional[dict] = None,
+    sort_field: str = "_id",
+    projection: Optional[dict] = None,
+) -> Dict[str, Any]:
+    """
+    Fetch one keyset page from a collection.
+
+    One extra document is requested to know whether another page exists, so the
+    last page never reports a dangling `next_cursor`.
+
+    Args:
+        collection: Motor collection to read from
+        transform (Callable[[dict], Any]): Converts a raw document into the response item
+        limit (int): Maximum number of items in the page
+        after (Optional[str]): Cursor returned by the previous page
+        query (Optional[dict]): Base MongoDB filter
+        sort_field (str): Field to order by; `_id` is always used as the tie-breaker
+        projection (Optional[dict]): Fields to read, None for whole documents
+
+    Returns:
+        dict: {"items": list, "next_cursor": Optional[str]}
+
+    Example:
+        >>> page = await paginate(orders_collection, lambda o: Order(**o), limit=50)
+        >>> page["next_cursor"]
+        'eyJfaWQiOiB7IiRvaWQiOiAi...'
+    """
+    documents = await (
+        collection.find(keyset_filter(query or {}, sort_field, after), _projection(projection, sort_field))
+        .sort(_sort_spec(sort_field))
+        .limit(limit + 1)
+        .to_list(limit + 1)
+    )
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(sort_field, documents[-1])
+
+    return {"items": [transform(document) for document in documents], "next_cursor": next_cursor}
+
+
+def _to_json_line(item: Any) -> str:
+    if hasattr(item, "model_dump_json"):
+        return item.model_dump_json()
+    return json.dumps(item, default=str)
+
+
+async def _ndjson_lines(cursor, transform: Callable[[dict], Any]) -> AsyncIterator[str]:
+    async for document in cursor:
+        yield _to_json_line(transform(document)) + "\n"
+
+
+def stream_ndjson(
+    collection,
+    transform: Callable[[dict], Any],
+    after: Optional[str] = None,
+    query: Optional[dict] = None,
+    sort_field: str = "_id",
+    projection: Optional[dict] = None,
+) -> StreamingResponse:
+    """
+    Stream every matching document as newline-delimited JSON.
+
+    Documents are written as the Motor cursor yields them, so memory stays flat
+    regardless of the collection size. `after` can be used to resume an export.
+
+    Args:
+        collection: Motor collection to read from
+        transform (Callable[[dict], Any]): Converts a raw document into the streamed item
+        after (Optional[str]): Cursor to resume from
+        query (Optional[dict]): Base MongoDB filter
+        sort_field (str): Field to order by; `_id` is always used as the tie-breaker
+        projection (Optional[dict]): Fields to read, None for whole documents
+
+    Returns:
+        StreamingResponse: `application/x-ndjson` response
+    """
+    cursor = (
+        collection.find(keyset_filter(query or {}, sort_field, after), _projection(projection, sort_field))
+        .sort(_sort_spec(sort_field))
+        .batch_size(STREAM_BATCH_SIZE)
+    )
+    return StreamingResponse(_ndjson_lines(cursor, transform), media_type="application/x-ndjson")
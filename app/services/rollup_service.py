@@ -0,0 +1,177 @@
+"""
+Rollup Service Module
+
+This module maintains the `daily_rollup` collection: one document per product and per day
+holding pre-aggregated sales and production totals. Rows are updated with atomic `$inc`
+upserts on every insert, so planning and analytics read O(products x periods) rows instead
+of scanning the raw `sales` and `production` collections.
+
+Rollup document shape:
+    {
+        "product_id": str,
+        "day": datetime,            # UTC midnight
+        "quantity_sold": int, "revenue": float, "sales_count": int,
+        "quantity_produced": int, "waste_quantity": int, "production_count": int,
+        "updated_at": datetime
+    }
+
+Usage:
+    Rebuild the rollups from raw history (backfill or repair after drift):
+        python -m app.services.rollup_service rebuild
+"""
+
+import asyncio
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from app.database import client, database, sales_collection, production_collection, daily_rollup_collection
+
+ROLLUP_KEY = ["product_id", "day"]
+
+SALES_FIELDS = {"quantity_sold": "$quantity_sold", "revenue": "$revenue", "sales_count": 1}
+PRODUCTION_FIELDS = {"quantity_produced": "$quantity_produced", "waste_quantity": "$waste_quantity", "production_count": 1}
+
+
+def day_bucket(value: datetime) -> datetime:
+    """
+    Truncate a timestamp to its UTC day, as stored in the rollup `day` field.
+
+    Args:
+        value (datetime): Naive (assumed UTC) or timezone-aware timestamp
+
+    Returns:
+        datetime: Naive UTC midnight of that day
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def day_range(start: Optional[datetime] = None, end: Optional[datetime] = None) -> dict:
+    """
+    Filter on the rollup `day` field covering every day touched by [start, end].
+
+    Both bounds are truncated with `day_bucket`, so a mid-day bound keeps its whole day,
+    as the raw-collection query on exact timestamps would have.
+
+    Args:
+        start (Optional[datetime]): Inclusive lower bound
+        end (Optional[datetime]): Inclusive upper bound
+
+    Returns:
+        dict: {"$gte": ..., "$lte": ...} with the given bounds, empty without bounds
+    """
+    match = {}
+    if start:
+        match["$gte"] = day_bucket(start)
+    if end:
+        match["$lte"] = day_bucket(end)
+    return match
+
+
+async def _increment(product_id: str, day: datetime, increments: Dict[str, float]):
+    update = {"$inc": increments, "$set": {"updated_at": datetime.now(timezone.utc)}}
+    try:
+        await daily_rollup_collection.update_one({"product_id": product_id, "day": day}, update, upsert=True)
+    except DuplicateKeyError:
+        # Two concurrent upserts raced to create the row, the loser retries as a plain update
+        await daily_rollup_collection.update_one({"product_id": product_id, "day": day}, update, upsert=True)
+
+
+async def record_sale(sale: dict):
+    """
+    Add a newly inserted sale to its product/day rollup row.
+
+    Args:
+        sale (dict): Sale document as inserted in `sales_collection`
+    """
+    await _increment(sale["product_id"], day_bucket(sale["sale_date"]), {
+        "quantity_sold": sale["quantity_sold"],
+        "revenue": sale["revenue"],
+        "sales_count": 1,
+    })
+
+
+async def record_production(production: dict):
+    """
+    Add a newly inserted production record to its product/day rollup row.
+
+    Args:
+        production (dict): Production document as inserted in `production_collection`
+    """
+    await _increment(production["product_id"], day_bucket(production["production_date"]), {
+        "quantity_produced": production["quantity_produced"],
+        "waste_quantity": production["waste_quantity"],
+        "production_count": 1,
+    })
+
+
+async def ensure_rollup_indexes(collection=daily_rollup_collection):
+    """Create the unique (product_id, day) index the upserts and `$merge` rely on."""
+    await collection.create_index([("product_id", 1), ("day", 1)], unique=True)
+
+
+def _daily_pipeline(date_field: str, fields: Dict[str, object]) -> List[dict]:
+    return [
+        {
+            "$group": {
+                "_id": {
+                    "product_id": "$product_id",
+                    "day": {"$dateTrunc": {"date": f"${date_field}", "unit": "day"}},
+                },
+                **{name: {"$sum": source} for name, source in fields.items()},
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "product_id": "$_id.product_id",
+                "day": "$_id.day",
+                "updated_at": "$$NOW",
+                **{name: 1 for name in fields},
+            }
+        },
+    ]
+
+
+async def rebuild_rollups() -> int:
+    """
+    Rebuild the whole rollup collection from the raw sales and production history.
+
+    The new rollups are built server-side into a staging collection and swapped in with
+    `renameCollection`, so readers never observe a partially rebuilt collection. Inserts
+    that land while the rebuild runs may be missed; run it during a quiet window.
+
+    Returns:
+        int: Number of rollup rows after the rebuild
+    """
+    staging_name = f"{daily_rollup_collection.name}_rebuild"
+    staging = database.get_collection(staging_name)
+    await staging.drop()
+    await ensure_rollup_indexes(staging)
+
+    merge = {"$merge": {"into": staging_name, "on": ROLLUP_KEY, "whenMatched": "merge", "whenNotMatched": "insert"}}
+    await sales_collection.aggregate(_daily_pipeline("sale_date", SALES_FIELDS) + [merge], allowDiskUse=True).to_list(None)
+    await production_collection.aggregate(_daily_pipeline("production_date", PRODUCTION_FIELDS) + [merge], allowDiskUse=True).to_list(None)
+
+    await client.admin.command(
+        "renameCollection",
+        f"{database.name}.{staging_name}",
+        to=f"{database.name}.{daily_rollup_collection.name}",
+        dropTarget=True,
+    )
+    return await daily_rollup_collection.count_documents({})
+
+
+async def _main(command: str):
+    if command != "rebuild":
+        raise SystemExit(f"Unknown command '{command}', expected 'rebuild'")
+    rows = await rebuild_rollups()
+    print(f"✅ Rebuilt daily rollups: {rows} rows")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "rebuild"))
@@ -0,0 +1,65 @@
+"""
+Single-Flight Module
+
+This module coalesces identical concurrent async calls: while a call for a key is in flight,
+later callers with the same key await that call instead of starting their own, and every
+caller receives the same result or exception.
+
+The shared call runs as its own task and each caller awaits it through `asyncio.shield`, so
+a caller that is cancelled (e.g. a client disconnecting) stops waiting without cancelling
+the call for the others.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls that share a key.
+
+    Example:
+        >>> flights = SingleFlight()
+        >>> results = await asyncio.gather(*(flights.do("key", fetch) for _ in range(10)))
+        >>> # fetch() ran once, all ten callers got its result
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, function: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run `function()` unless a call for `key` is already in flight, then await its result.
+
+        Args:
+            key (str): Identity of the call
+            function (Callable[[], Awaitable[Any]]): Coroutine factory performing the call
+
+        Returns:
+            Any: Result of the shared call
+
+        Raises:
+            Exception: Whatever the shared call raised, re-raised in every caller
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(function())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every caller was cancelled before it finished
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of upstream calls, coalesced callers and calls in flight."""
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._calls)}
@@ -0,0 +1,286 @@
+"""
+S&OP Job Runner Module
+
+This module runs S&OP plan generation in the background. A job splits the catalog into
+shards of contiguous `product_id` ranges; each shard's history is aggregated from the
+daily rollups and its plans are built in a process pool, so large catalogs neither block
+the event loop nor time out the request.
+
+Each shard is fingerprinted from its rollup rows (row count, quantity totals and latest
+`updated_at`). When a job is re-run and a shard's fingerprint and planning parameters are
+unchanged, its plans are reused from `sop_shard_cache` instead of being recomputed.
+
+The history window (first demand period and last period) is computed once per job and
+passed to every shard, so all shards forecast the same periods as a synchronous run would.
+
+If a shard fails, the other shards are cancelled and the plans already stored under the
+job are deleted, so a failed job leaves no partial plans. A running job refreshes its
+`heartbeat_at`; jobs whose heartbeat stopped (the worker running them was restarted) are
+marked failed at startup by `fail_stale_sop_jobs`.
+
+Progress and completion events are published to the `sop_jobs` WebSocket topic.
+
+Job document (`sop_jobs`):
+    {
+        "_id": job_id, "status": "queued" | "running" | "completed" | "failed",
+        "request": dict, "shards_total": int, "shards_done": int, "shards_reused": int,
+        "plans": int, "error": Optional[str], "created_at": datetime, "heartbeat_at": datetime,
+        "finished_at": datetime
+    }
+
+Environment Variables:
+    - SOP_JOB_WORKERS: Worker processes in the pool (default: CPU count)
+    - SOP_SHARD_SIZE: Products per shard (default: 2000)
+    - SOP_JOB_HEARTBEAT: Seconds between heartbeats of a running job; a job is stale after
+      three missed heartbeats (default: 30)
+"""
+
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from app.database import daily_rollup_collection, sop_collection, sop_jobs_collection, sop_shard_cache_collection
+from app.models.sop import SOPRequest
+from app.services.websocket_manager import manager
+from app.services.rollup_service import day_range
+from app.services.sop_planner import build_sop_plans
+from app.services.sop_service import load_sop_history, store_sop_plans
+
+SOP_JOB_WORKERS = int(os.getenv("SOP_JOB_WORKERS", os.cpu_count() or 1))
+SOP_SHARD_SIZE = int(os.getenv("SOP_SHARD_SIZE", "2000"))
+SOP_JOB_HEARTBEAT = float(os.getenv("SOP_JOB_HEARTBEAT", "30"))
+
+_executor: Optional[ProcessPoolExecutor] = None
+_running = set()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: forking a process that runs an event loop and Motor's threads is unsafe
+        _executor = ProcessPoolExecutor(max_workers=SOP_JOB_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def shutdown_sop_jobs():
+    """Stop the worker processes on app shutdown."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _plan_shard(history: dict, request: SOPRequest, window: Tuple[Optional[datetime], datetime]) -> List[dict]:
+    # Runs in a worker process
+    return [plan.model_dump() for plan in build_sop_plans(history, request, window)]
+
+
+def _rollup_match(request: SOPRequest, product_ids: Optional[List[str]] = None) -> dict:
+    match: dict = {}
+    if product_ids is not None:
+        match["product_id"] = {"$in": product_ids}
+    elif request.product_ids:
+        match["product_id"] = {"$in": request.product_ids}
+    if request.start_date or request.end_date:
+        match["day"] = day_range(request.start_date, request.end_date)
+    return match
+
+
+async def _shard_product_ids(request: SOPRequest) -> List[List[str]]:
+    product_ids = sorted(await daily_rollup_collection.distinct("product_id", _rollup_match(request)))
+    return [product_ids[index:index + SOP_SHARD_SIZE] for index in range(0, len(product_ids), SOP_SHARD_SIZE)]
+
+
+async def _history_window(request: SOPRequest) -> Optional[Tuple[Optional[datetime], datetime]]:
+    # Same rule as build_sop_plans on the whole history: the demand matrix spans the periods
+    # of the products with demand, and the forecast follows the last of them (or the last
+    # capacity period when nothing was sold)
+    def truncate(field: str) -> dict:
+        return {"$dateTrunc": {"date": field, "unit": request.period}}
+
+    pipeline = [
+        {"$match": _rollup_match(request)},
+        {"$group": {"_id": "$product_id", "first": {"$min": "$day"}, "last": {"$max": "$day"}, "demand": {"$sum": "$quantity_sold"}}},
+        {
+            "$group": {
+                "_id": None,
+                "first": {"$min": {"$cond": [{"$gt": ["$demand", 0]}, "$first", None]}},
+                "last_demand": {"$max": {"$cond": [{"$gt": ["$demand", 0]}, "$last", None]}},
+                "last": {"$max": "$last"},
+            }
+        },
+        {"$project": {"first": truncate("$first"), "last_demand": truncate("$last_demand"), "last": truncate("$last")}},
+    ]
+    results = await daily_rollup_collection.aggregate(pipeline).to_list(1)
+    if not results:
+        return None
+    window = results[0]
+    return window.get("first"), window.get("last_demand") or window["last"]
+
+
+async def _shard_key(request: SOPRequest, product_ids: List[str], window: Tuple[Optional[datetime], datetime]) -> str:
+    pipeline = [
+        {"$match": _rollup_match(request, product_ids)},
+        {
+            "$group": {
+                "_id": None,
+                "rows": {"$sum": 1},
+                "quantity_sold": {"$sum": "$quantity_sold"},
+                "quantity_produced": {"$sum": "$quantity_produced"},
+                "updated_at": {"$max": "$updated_at"},
+            }
+        },
+    ]
+    fingerprint = await daily_rollup_collection.aggregate(pipeline).to_list(1)
+    parameters = request.model_dump(mode="json", exclude={"product_ids"})
+    payload = json.dumps([parameters, product_ids, window, fingerprint], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def _run_shard(
+    job_id: str,
+    request: SOPRequest,
+    product_ids: List[str],
+    window: Tuple[Optional[datetime], datetime],
+    semaphore: asyncio.Semaphore,
+    stores: Set[asyncio.Future],
+) -> int:
+    async with semaphore:
+        key = await _shard_key(request, product_ids, window)
+        cached = await sop_shard_cache_collection.find_one({"_id": key})
+
+        if cached:
+            plans = cached["plans"]
+        else:
+            shard_request = request.model_copy(update={"product_ids": product_ids})
+            history = await load_sop_history(shard_request)
+            loop = asyncio.get_running_loop()
+            plans = await loop.run_in_executor(_get_executor(), _plan_shard, history, shard_request, window)
+            await sop_shard_cache_collection.replace_one(
+                {"_id": key},
+                {"plans": plans, "created_at": datetime.now(timezone.utc)},
+                upsert=True,
+            )
+
+    if plans:
+        # Shielded: a cancelled shard must not leave an insert running behind the cleanup
+        store = asyncio.ensure_future(store_sop_plans([dict(plan) for plan in plans], job_id=job_id))
+        stores.add(store)
+        await asyncio.shield(store)
+
+    job = await sop_jobs_collection.find_one_and_update(
+        {"_id": job_id},
+        {"$inc": {"shards_done": 1, "shards_reused": 1 if cached else 0, "plans": len(plans)}},
+        return_document=ReturnDocument.AFTER,
+    )
+    manager.publish("sop_jobs", {
+        "type": "sop_job_progress",
+        "job_id": job_id,
+        "shards_done": job["shards_done"],
+        "shards_total": job["shards_total"],
+        "shards_reused": job["shards_reused"],
+    })
+    return len(plans)
+
+
+async def _heartbeat(job_id: str):
+    while True:
+        await asyncio.sleep(SOP_JOB_HEARTBEAT)
+        await sop_jobs_collection.update_one({"_id": job_id}, {"$set": {"heartbeat_at": datetime.now(timezone.utc)}})
+
+
+async def _run_job(job_id: str, request: SOPRequest):
+    heartbeat = asyncio.create_task(_heartbeat(job_id))
+    stores: Set[asyncio.Future] = set()
+    try:
+        shards = await _shard_product_ids(request)
+        window = await _history_window(request) if shards else None
+        await sop_jobs_collection.update_one(
+            {"_id": job_id}, {"$set": {"status": "running", "shards_total": len(shards)}}
+        )
+
+        semaphore = asyncio.Semaphore(SOP_JOB_WORKERS)
+        # The first failing shard cancels the others
+        async with asyncio.TaskGroup() as group:
+            for shard in shards:
+                group.create_task(_run_shard(job_id, request, shard, window, semaphore, stores))
+
+        update = {"status": "completed", "finished_at": datetime.now(timezone.utc)}
+    except Exception as e:
+        error = e.exceptions[0] if isinstance(e, ExceptionGroup) else e
+        print(f"❌ S&OP job {job_id} failed: {error}")
+        await asyncio.gather(*stores, return_exceptions=True)
+        await sop_collection.delete_many({"job_id": job_id})
+        update = {"status": "failed", "error": str(error), "plans": 0, "finished_at": datetime.now(timezone.utc)}
+    finally:
+        heartbeat.cancel()
+
+    await sop_jobs_collection.update_one({"_id": job_id}, {"$set": update})
+    manager.publish("sop_jobs", {"type": "sop_job_" + update["status"], "job_id": job_id})
+
+
+async def fail_stale_sop_jobs() -> int:
+    """
+    Mark queued or running jobs whose heartbeat stopped as failed and delete their plans.
+
+    Called at startup: a job only runs in the process that queued it, so a restart leaves
+    its job document "running" forever. Jobs of live workers keep a fresh heartbeat and
+    are left alone.
+
+    Returns:
+        int: Number of jobs marked failed
+    """
+    stale = datetime.now(timezone.utc) - timedelta(seconds=3 * SOP_JOB_HEARTBEAT)
+    query = {
+        "status": {"$in": ["queued", "running"]},
+        "$or": [{"heartbeat_at": {"$lt": stale}}, {"heartbeat_at": {"$exists": False}}],
+    }
+    job_ids = await sop_jobs_collection.distinct("_id", query)
+    if not job_ids:
+        return 0
+
+    await sop_collection.delete_many({"job_id": {"$in": job_ids}})
+    result = await sop_jobs_collection.update_many(
+        {**query, "_id": {"$in": job_ids}},
+        {"$set": {"status": "failed", "error": "Interrupted by a worker restart", "plans": 0, "finished_at": datetime.now(timezone.utc)}},
+    )
+    print(f"⚠️ Marked {result.modified_count} interrupted S&OP jobs as failed")
+    return result.modified_count
+
+
+async def start_sop_job(request: SOPRequest) -> str:
+    """
+    Queue a background S&OP job and return immediately.
+
+    Args:
+        request (SOPRequest): The planning request
+
+    Returns:
+        str: Job ID to poll with `GET /sop/jobs/{job_id}`
+    """
+    job_id = str(ObjectId())
+    await sop_jobs_collection.insert_one({
+        "_id": job_id,
+        "status": "queued",
+        "request": request.model_dump(),
+        "shards_total": 0,
+        "shards_done": 0,
+        "shards_reused": 0,
+        "plans": 0,
+        "error": None,
+        "created_at": datetime.now(timezone.utc),
+        "heartbeat_at": datetime.now(timezone.utc),
+    })
+
+    task = asyncio.create_task(_run_job(job_id, request))
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+    return job_id
@@ -0,0 +1,75 @@
+"""
+S&OP Planner Module
+
+This module turns aggregated demand and capacity history into SOP plans. It is pure CPU
+work with no database access, so it can run in the request process or in a worker
+process of the S&OP job runner.
+
+Dependencies:
+    - numpy: Through `forecasting`, for vectorized demand forecasts
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.models.sop import SOP, SOPRequest
+from app.services.forecasting import build_demand_matrix, forecast_demand, future_periods
+
+PERIOD_LABELS = {"day": "daily", "week": "weekly", "month": "monthly"}
+
+
+def build_sop_plans(
+    history: Dict[str, Dict[str, dict]], request: SOPRequest, window: Optional[Tuple[Optional[datetime], datetime]] = None
+) -> List[SOP]:
+    """
+    Turn aggregated history into one SOP plan per product.
+
+    Demand for every product is forecast in a single vectorized pass over the
+    (products x periods) demand matrix.
+
+    Args:
+        history (dict): Output of `load_sop_history`
+        request (SOPRequest): The planning request
+        window (Optional[Tuple[Optional[datetime], datetime]]): First demand period (None
+            without any demand) and last period of the whole request, when `history` only
+            covers a shard of it; fixes the demand matrix columns and the forecast periods
+            so every shard plans like a single run would. Derived from `history` when omitted
+
+    Returns:
+        List[SOP]: Plans ordered by product_id, as revision 1 until `store_sop_plans`
+            assigns the next revision of each product
+    """
+    product_ids = sorted(set(history["demand"]) | set(history["capacity"]))
+    span = window if window and window[0] is not None else None
+    periods, demand = build_demand_matrix(history["demand"], product_ids, request.period, span)
+    forecast = forecast_demand(demand, request.period, request.horizon, request.model)
+
+    if window:
+        last_period = window[1]
+    else:
+        last_period = periods[-1] if periods else max(
+            entry["period"] for group in history["capacity"].values() for entry in group["periods"]
+        )
+    horizon = future_periods(last_period, request.period, request.horizon)
+
+    plans = []
+    for row, product_id in enumerate(product_ids):
+        capacity = history["capacity"].get(product_id, {"periods": [], "total": 0})
+        demand_total = float(demand[row].sum())
+
+        plans.append(SOP(
+            product_id=product_id,
+            forecasted_demand=[
+                {"period": period, "quantity": round(float(quantity), 2)}
+                for period, quantity in zip(horizon, forecast["forecast"][row])
+            ],
+            production_capacity=capacity["periods"],
+            planned_production=int(capacity["total"]),
+            planned_inventory=int(capacity["total"] - demand_total),
+            period=horizon[0],
+            period_unit=request.period,
+            confidence_level=round(float(forecast["confidence"][row]), 4),
+            revision_number=1,
+            notes=f"{forecast['model'][row]} forecast from {PERIOD_LABELS[request.period]} sales and production history",
+        ))
+    return plans
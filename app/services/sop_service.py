@@ -0,0 +1,150 @@
+"""
+S&OP Service Module
+
+This module builds Sales & Operations Planning inputs with MongoDB aggregation pipelines.
+Demand (sales) and capacity (production) are grouped per product and per period on the
+server from the per-day rollups maintained by `rollup_service`, so plans cover the full
+history without loading raw documents into Python. Plans are then built by `sop_planner`.
+
+Dependencies:
+    - motor: For async MongoDB aggregation
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from app.database import daily_rollup_collection, sop_collection
+from app.models.sop import SOPRequest
+from app.services.rollup_service import day_range
+from app.services.sop_planner import build_sop_plans
+
+
+def build_rollup_pipeline(
+    product_ids: Optional[List[str]] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    period: str = "month",
+) -> List[dict]:
+    """
+    Build the aggregation pipeline that sums the daily rollups per product and per period.
+
+    Args:
+        product_ids (Optional[List[str]]): Restrict to these products
+        start (Optional[datetime]): Inclusive lower bound; its whole day is included
+        end (Optional[datetime]): Inclusive upper bound; its whole day is included
+        period (str): Bucket size, one of "day", "week" or "month"
+
+    Returns:
+        List[dict]: Pipeline yielding one document per product:
+            {"_id": product_id, "periods": [{"period", "demand", "capacity"}], "demand": number, "capacity": number}
+
+    Example:
+        >>> build_rollup_pipeline(["P-1"], period="week")
+    """
+    match: dict = {}
+    if product_ids:
+        match["product_id"] = {"$in": product_ids}
+    if start or end:
+        match["day"] = day_range(start, end)
+
+    return [
+        {"$match": match},
+        {
+            "$group": {
+                "_id": {
+                    "product_id": "$product_id",
+                    "period": {"$dateTrunc": {"date": "$day", "unit": period}},
+                },
+                "demand": {"$sum": "$quantity_sold"},
+                "capacity": {"$sum": "$quantity_produced"},
+            }
+        },
+        {"$sort": {"_id.product_id": 1, "_id.period": 1}},
+        {
+            "$group": {
+                "_id": "$_id.product_id",
+                "periods": {"$push": {"period": "$_id.period", "demand": "$demand", "capacity": "$capacity"}},
+                "demand": {"$sum": "$demand"},
+                "capacity": {"$sum": "$capacity"},
+            }
+        },
+    ]
+
+
+async def load_sop_history(request: SOPRequest) -> Dict[str, Dict[str, dict]]:
+    """
+    Aggregate demand and capacity per product and period for a planning request.
+
+    Reads the pre-aggregated `daily_rollup` rows rather than raw sales and production.
+
+    Args:
+        request (SOPRequest): Product and date-range filters and the period size
+
+    Returns:
+        dict: {"demand": {product_id: group}, "capacity": {product_id: group}} where each
+            group has "periods" (list of {"period", "quantity"}) and "total"
+    """
+    pipeline = build_rollup_pipeline(request.product_ids, request.start_date, request.end_date, request.period)
+    results = await daily_rollup_collection.aggregate(pipeline, allowDiskUse=True).to_list(None)
+
+    history = {"demand": {}, "capacity": {}}
+    for result in results:
+        for kind in ("demand", "capacity"):
+            if result[kind]:
+                history[kind][result["_id"]] = {
+                    "periods": [{"period": entry["period"], "quantity": entry[kind]} for entry in result["periods"]],
+                    "total": result[kind],
+                }
+    return history
+
+
+async def _latest_revisions(product_ids: List[str]) -> Dict[str, int]:
+    pipeline = [
+        {"$match": {"product_id": {"$in": product_ids}}},
+        {"$group": {"_id": "$product_id", "revision_number": {"$max": "$revision_number"}}},
+    ]
+    results = await sop_collection.aggregate(pipeline).to_list(None)
+    return {result["_id"]: result["revision_number"] or 0 for result in results}
+
+
+async def store_sop_plans(plans: List[dict], job_id: Optional[str] = None) -> List[dict]:
+    """
+    Store plans as the next revision of each product's plan.
+
+    Args:
+        plans (List[dict]): Dumped SOP plans
+        job_id (Optional[str]): S&OP job that produced the plans, if any
+
+    Returns:
+        List[dict]: The stored plans, with their `id` set
+    """
+    revisions = await _latest_revisions([plan["product_id"] for plan in plans])
+    created_at = datetime.now(timezone.utc)
+    for plan in plans:
+        plan.pop("_id", None)
+        plan["revision_number"] = revisions.get(plan["product_id"], 0) + 1
+        plan["created_at"] = created_at
+        plan["job_id"] = job_id
+
+    await sop_collection.insert_many(plans)
+    for plan in plans:
+        plan["id"] = str(plan.pop("_id"))
+    return plans
+
+
+async def generate_sop_plans(request: SOPRequest) -> List[dict]:
+    """
+    Build and store S&OP plans for the requested products and date range.
+
+    Args:
+        request (SOPRequest): Product and date-range filters and the period size
+
+    Returns:
+        List[dict]: Stored plans, with their `id` set
+    """
+    history = await load_sop_history(request)
+    if not history["demand"] and not history["capacity"]:
+        return []
+
+    plans = [plan.model_dump() for plan in build_sop_plans(history, request)]
+    return await store_sop_plans(plans)
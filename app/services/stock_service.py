@@ -0,0 +1,221 @@
+"""
+Stock Service Module
+
+This module applies stock movements to inventory records atomically. A movement is an
+increment of `stock_level` guarded by the filter of the same update, so concurrent pickers
+never overwrite each other and a movement can never take stock below zero or above
+`max_stock_level`. The guard, the increment and reading the new level happen in a single
+`find_one_and_update` round trip. The update is a pipeline so that it also maintains the
+low-stock flag (see `low_stock`); records it moves across their reorder point are published
+as crossing events.
+
+Bulk movements are netted per inventory record and sent as one unordered `bulk_write`, so
+thousands of movements cost one round trip per 100k operations instead of one per movement.
+
+Retries: a movement with a `movement_id`, and every bulk batch, records its ID in the
+record's `recent_movements` (the last STOCK_MOVEMENT_HISTORY IDs). An update whose ID is
+already there does not match, so retrying after a timeout does not apply it twice. The same
+IDs tell which records of a bulk batch were left unchanged. A retry does not publish the
+crossings of records an earlier attempt already moved again.
+
+Every applied movement is also appended to the record's `movement_log` (the last
+STOCK_MOVEMENT_HISTORY entries), with its delta, reason, movement ID, batch ID and time.
+Bulk movements are logged one by one, before netting.
+
+Environment Variables:
+    - STOCK_MOVEMENT_HISTORY: Movement/batch IDs and log entries remembered per record (default: 100)
+"""
+
+import os
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+
+from app.database import inventory_collection
+from app.services.low_stock import CROSSING_PROJECTION, publish_crossings, reorder_flag_stages
+
+STOCK_MOVEMENT_HISTORY = int(os.getenv("STOCK_MOVEMENT_HISTORY", "100"))
+
+LEVEL_PROJECTION = {"product_id": 1, "warehouse_id": 1, "stock_level": 1, "max_stock_level": 1, "below_reorder_point": 1}
+
+
+def movement_guard(delta: int) -> dict:
+    """
+    Filter that only matches records the movement keeps within 0..max_stock_level.
+
+    Args:
+        delta (int): Units added (positive) or removed (negative)
+
+    Returns:
+        dict: MongoDB filter to combine with the record's `_id`
+    """
+    if delta < 0:
+        return {"stock_level": {"$gte": -delta}}
+    if delta > 0:
+        return {"$expr": {"$lte": [{"$add": ["$stock_level", delta]}, "$max_stock_level"]}}
+    return {}
+
+
+def _bounded_append(field: str, items: list) -> dict:
+    # $literal keeps strings starting with "$" (e.g. a reason) from being read as field paths
+    appended = {"$concatArrays": [{"$ifNull": [f"${field}", []]}, {"$literal": items}]}
+    return {"$slice": [appended, -STOCK_MOVEMENT_HISTORY]}
+
+
+def movement_update(delta: int, crossing_id: str, movement_id: Optional[str] = None, log: Optional[List[dict]] = None) -> List[dict]:
+    """
+    Update pipeline applying `delta`, recording `movement_id` among the record's recent
+    movements, appending `log` to its movement log and recomputing the low-stock flag.
+
+    Args:
+        delta (int): Units added (positive) or removed (negative)
+        crossing_id (str): ID recorded in `reorder_crossing` if the flag flips
+        movement_id (Optional[str]): ID remembered in `recent_movements` to make retries safe
+        log (Optional[List[dict]]): Entries ({"delta", "reason", "movement_id", "batch_id"}) appended
+            to `movement_log`, each stamped with the update time
+
+    Returns:
+        List[dict]: Update pipeline
+    """
+    now = datetime.now(timezone.utc)
+    changes = {"stock_level": {"$add": ["$stock_level", delta]}, "last_updated": now, "updated_at": now}
+    if movement_id:
+        changes["recent_movements"] = _bounded_append("recent_movements", [movement_id])
+    if log:
+        changes["movement_log"] = _bounded_append("movement_log", [{**entry, "at": now} for entry in log])
+    return [{"$set": changes}] + reorder_flag_stages(crossing_id, now)
+
+
+def _level(document: dict) -> dict:
+    return {**document, "id": str(document.pop("_id"))}
+
+
+async def apply_stock_movement(
+    inventory_id: str, delta: int, movement_id: Optional[str] = None, reason: Optional[str] = None, collection=inventory_collection
+) -> dict:
+    """
+    Atomically add `delta` to a record's stock level.
+
+    Args:
+        inventory_id (str): Inventory record ID
+        delta (int): Units added (positive) or removed (negative)
+        movement_id (Optional[str]): Client-generated ID making retries safe
+        reason (Optional[str]): Why the stock moved, recorded in the movement log
+        collection: Inventory collection
+
+    Returns:
+        dict: The new level ({"id", "product_id", "warehouse_id", "stock_level", "max_stock_level", "below_reorder_point"}),
+            or {"error": "invalid_id" | "not_found" | "out_of_range", ...} with the current level
+            for out_of_range
+
+    Example:
+        >>> await apply_stock_movement("65c3...", -5, movement_id="pick-8812", reason="pick")
+        {'id': '65c3...', 'product_id': 'P-1', 'stock_level': 37, ...}
+    """
+    if not ObjectId.is_valid(inventory_id):
+        return {"error": "invalid_id"}
+    query = {"_id": ObjectId(inventory_id), **movement_guard(delta)}
+    if movement_id:
+        query["recent_movements"] = {"$ne": movement_id}
+
+    crossing_id = movement_id or uuid.uuid4().hex
+    document = await collection.find_one_and_update(
+        query,
+        movement_update(delta, crossing_id, movement_id, log=[{"delta": delta, "reason": reason, "movement_id": movement_id}]),
+        projection={**LEVEL_PROJECTION, **CROSSING_PROJECTION},
+        return_document=ReturnDocument.AFTER,
+    )
+    if document is not None:
+        if (document.get("reorder_crossing") or {}).get("id") == crossing_id:
+            publish_crossings([document])
+        return _level({key: document[key] for key in ("_id", *LEVEL_PROJECTION) if key in document})
+
+    # Slow path, only when the guard rejected the movement: say why
+    current = await collection.find_one({"_id": ObjectId(inventory_id)}, {**LEVEL_PROJECTION, "recent_movements": 1})
+    if current is None:
+        return {"error": "not_found"}
+    if movement_id and movement_id in current.pop("recent_movements", []):
+        # Already applied by an earlier attempt
+        return _level(current)
+    current.pop("recent_movements", None)
+    return {"error": "out_of_range", "current": _level(current)}
+
+
+async def apply_stock_movements(movements: List[dict], batch_id: Optional[str] = None, collection=inventory_collection) -> dict:
+    """
+    Apply many movements with one unordered `bulk_write`.
+
+    Movements for the same record are netted first, so the guard applies to each record's net
+    change and a record is either fully updated or left unchanged. Each movement is still
+    logged on its own, with its reason and movement ID.
+
+    Args:
+        movements (List[dict]): {"inventory_id": str, "delta": int, "reason": Optional[str], "movement_id": Optional[str]} items
+        batch_id (Optional[str]): Client-generated ID making retries safe; generated when omitted
+        collection: Inventory collection
+
+    Returns:
+        dict: {"batch_id", "movements", "items", "applied", "rejected": [{"inventory_id", "delta", "reason"}]}
+
+    Example:
+        >>> await apply_stock_movements([{"inventory_id": "65c3...", "delta": -2, "reason": "pick"}, {"inventory_id": "65c4...", "delta": 40}])
+        {'batch_id': '...', 'movements': 2, 'items': 2, 'applied': 2, 'rejected': []}
+    """
+    batch_id = batch_id or uuid.uuid4().hex
+    # Marks the crossings of this call's writes; a retry reuses batch_id but gets a new attempt ID,
+    # so records an earlier attempt already moved are not published again
+    attempt_id = uuid.uuid4().hex
+    net: Dict[str, int] = defaultdict(int)
+    logs: Dict[str, List[dict]] = defaultdict(list)
+    for movement in movements:
+        net[movement["inventory_id"]] += movement["delta"]
+        logs[movement["inventory_id"]].append({
+            "delta": movement["delta"],
+            "reason": movement.get("reason"),
+            "movement_id": movement.get("movement_id"),
+            "batch_id": batch_id,
+        })
+
+    rejected = [
+        {"inventory_id": inventory_id, "delta": delta, "reason": "invalid_id"}
+        for inventory_id, delta in net.items() if not ObjectId.is_valid(inventory_id)
+    ]
+    valid = [inventory_id for inventory_id in net if ObjectId.is_valid(inventory_id)]
+    targets = {ObjectId(inventory_id): net[inventory_id] for inventory_id in valid}
+    operations = [
+        UpdateOne(
+            {"_id": ObjectId(inventory_id), "recent_movements": {"$ne": batch_id}, **movement_guard(net[inventory_id])},
+            movement_update(net[inventory_id], attempt_id, batch_id, log=logs[inventory_id]),
+        )
+        for inventory_id in valid
+    ]
+
+    applied = 0
+    if operations:
+        result = await collection.bulk_write(operations, ordered=False)
+        applied = result.modified_count
+        if applied == len(operations):
+            # Only the records this call moved across their reorder point are read back
+            crossed = await collection.find(
+                {"_id": {"$in": list(targets)}, "reorder_crossing.id": attempt_id}, CROSSING_PROJECTION
+            ).to_list(None)
+        else:
+            # Records carrying the batch ID were updated, now or by an earlier attempt
+            found = await collection.find(
+                {"_id": {"$in": list(targets)}}, {**CROSSING_PROJECTION, "recent_movements": 1}
+            ).to_list(None)
+            updated = {document["_id"] for document in found if batch_id in document.get("recent_movements", [])}
+            existing = {document["_id"] for document in found}
+            applied = len(updated)
+            rejected += [
+                {"inventory_id": str(object_id), "delta": delta, "reason": "out_of_range" if object_id in existing else "not_found"}
+                for object_id, delta in targets.items() if object_id not in updated
+            ]
+            crossed = [document for document in found if (document.get("reorder_crossing") or {}).get("id") == attempt_id]
+        publish_crossings(crossed)
+
+    return {"batch_id": batch_id, "movements": len(movements), "items": len(net), "applied": applied, "rejected": rejected}
@@ -0,0 +1,418 @@
+"""
+WebSocket Manager Module
+
+This module fans messages out to the connected WebSocket clients without letting one slow
+or dead client hold up the others or the request that produced the message.
+
+Each connection gets a bounded outbound queue drained by its own sender task. A broadcast
+serializes the message once and only enqueues it, so it never awaits a socket. When a
+client does not keep up and its queue is full, the drop policy applies:
+    - drop_oldest: discard the oldest queued message to make room (the client misses it)
+    - disconnect: close the connection with code 1013 (try again later)
+
+A connection whose send fails or takes longer than WS_SEND_TIMEOUT is removed.
+
+Clients subscribe to topics and `publish` only touches the subscribers of a topic, through
+a topic -> connections index, so traffic grows with the interested clients instead of
+users x events. Topics:
+    - user:<user_id>: decision updates of one user
+    - inventory: inventory changes
+    - shipments:<order_id>: shipment changes of one order
+    - low_stock, low_stock:<warehouse_id>: reorder point crossings, all or of one warehouse
+    - sop_jobs: S&OP job progress
+
+With several workers, `publish` also hands the event to the backplane (see `backplane`),
+which relays it to the subscribers connected to the other workers.
+
+Clients pick the wire format with the `Sec-WebSocket-Protocol` header:
+    - json (default): one JSON text frame per event
+    - json-batch: one JSON text frame holding an array of the events queued at send time
+    - msgpack: the same batches as one binary msgpack frame; requires `msgpack`
+Batching protocols wait WS_BATCH_MS after the first queued event so bursts share a frame.
+Each event is encoded once per format, however many clients receive it. Compression is
+negotiated by the server (uvicorn enables permessage-deflate by default).
+
+Every WS_HEARTBEAT_INTERVAL a {"type": "ping"} event is queued for each client; a client
+that has sent nothing (a pong or any other message) for WS_IDLE_TIMEOUT is closed with code
+1001 and reaped, so dead mobile connections do not pile up.
+
+Environment Variables:
+    - WS_QUEUE_SIZE: Outbound messages buffered per connection (default: 256)
+    - WS_DROP_POLICY: "drop_oldest" or "disconnect" (default: "drop_oldest")
+    - WS_SEND_TIMEOUT: Seconds a single send may take before the client is evicted (default: 10)
+    - WS_MAX_TOPICS: Topics one connection may subscribe to (default: 100)
+    - WS_BATCH_MS: Milliseconds a batching protocol waits to fill a frame (default: 25)
+    - WS_BATCH_MAX: Events per batched frame (default: 100)
+    - WS_HEARTBEAT_INTERVAL: Seconds between pings (default: 20)
+    - WS_IDLE_TIMEOUT: Seconds without client messages before the connection is reaped (default: 60)
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from fastapi import WebSocket
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; clients then negotiate a JSON protocol
+    msgpack = None
+
+from app.services.backplane import Backplane, create_backplane
+
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "256"))
+WS_DROP_POLICY = os.getenv("WS_DROP_POLICY", "drop_oldest")
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+WS_MAX_TOPICS = int(os.getenv("WS_MAX_TOPICS", "100"))
+WS_BATCH_MS = float(os.getenv("WS_BATCH_MS", "25"))
+WS_BATCH_MAX = int(os.getenv("WS_BATCH_MAX", "100"))
+WS_HEARTBEAT_INTERVAL = float(os.getenv("WS_HEARTBEAT_INTERVAL", "20"))
+WS_IDLE_TIMEOUT = float(os.getenv("WS_IDLE_TIMEOUT", "60"))
+
+TOPIC_PATTERN = re.compile(r"^(inventory|sop_jobs|low_stock|low_stock:[\w\-]{1,64}|user:[\w\-.@]{1,128}|shipments:[\w\-]{1,64})$")
+
+DROP_POLICIES = ("drop_oldest", "disconnect")
+PROTOCOLS = ("json", "json-batch", "msgpack")
+CLOSE_GOING_AWAY = 1001
+CLOSE_TRY_AGAIN_LATER = 1013
+
+
+class Outbound:
+    """An event queued for one or more clients, encoded lazily and at most once per format."""
+
+    __slots__ = ("message", "_text", "_packed")
+
+    def __init__(self, message: dict):
+        self.message = message
+        self._text: Optional[str] = None
+        self._packed: Optional[bytes] = None
+
+    def text(self) -> str:
+        if self._text is None:
+            self._text = json.dumps(self.message, default=str)
+        return self._text
+
+    def packed(self) -> bytes:
+        if self._packed is None:
+            self._packed = msgpack.packb(self.message, default=str)
+        return self._packed
+
+
+class Connection:
+    """One client socket with its outbound queue, sender task and negotiated protocol."""
+
+    def __init__(self, websocket: WebSocket, queue_size: int, protocol: str = "json"):
+        self.websocket = websocket
+        self.protocol = protocol
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sender: Optional[asyncio.Task] = None
+        self.dropped = 0
+        self.sent = 0
+        self.frames = 0
+        self.bytes_sent = 0
+        self.closing = False
+        self.topics: Set[str] = set()
+        self.last_seen = time.monotonic()
+
+
+class WebSocketManager:
+    """
+    Registry of connected clients with non-blocking, per-connection queued fan-out.
+
+    Example:
+        >>> manager = WebSocketManager(queue_size=64, drop_policy="disconnect")
+        >>> await manager.connect(websocket)
+        >>> manager.broadcast({"type": "sop_job_completed", "job_id": "..."})
+        1
+    """
+
+    def __init__(
+        self,
+        queue_size: int = WS_QUEUE_SIZE,
+        drop_policy: str = WS_DROP_POLICY,
+        send_timeout: float = WS_SEND_TIMEOUT,
+        batch_window: float = WS_BATCH_MS / 1000,
+        batch_max: int = WS_BATCH_MAX,
+        heartbeat_interval: float = WS_HEARTBEAT_INTERVAL,
+        idle_timeout: float = WS_IDLE_TIMEOUT,
+    ):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown WebSocket drop policy '{drop_policy}', expected one of {DROP_POLICIES}")
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.send_timeout = send_timeout
+        self.batch_window = batch_window
+        self.batch_max = batch_max
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.active_connections: Dict[WebSocket, Connection] = {}
+        self.topics: Dict[str, Set[Connection]] = {}
+        self.backplane: Optional[Backplane] = None
+        self.dropped = 0
+        self.evicted = 0
+        self.reaped = 0
+        self.frames = 0
+        self.bytes_sent = 0
+        self._closing = set()
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def negotiate(offered: Sequence[str]) -> Optional[str]:
+        """
+        Pick the first supported protocol from the client's `Sec-WebSocket-Protocol` list.
+
+        Args:
+            offered (Sequence[str]): Subprotocols offered by the client, in preference order
+
+        Returns:
+            Optional[str]: The protocol to accept, or None for the default JSON protocol
+        """
+        for protocol in offered:
+            if protocol in PROTOCOLS and (protocol != "msgpack" or msgpack is not None):
+                return protocol
+        return None
+
+    async def connect(self, websocket: WebSocket, subprotocol: Optional[str] = None):
+        """Accept a client with the negotiated subprotocol and start its sender task."""
+        await websocket.accept(subprotocol=subprotocol)
+        connection = Connection(websocket, self.queue_size, subprotocol or "json")
+        connection.sender = asyncio.create_task(self._send_loop(connection))
+        self.active_connections[websocket] = connection
+        if self._heartbeat is None and self.heartbeat_interval > 0:
+            self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+
+    def touch(self, websocket: WebSocket):
+        """Record that a client is alive, on every message it sends."""
+        connection = self.active_connections.get(websocket)
+        if connection is not None:
+            connection.last_seen = time.monotonic()
+
+    async def disconnect(self, websocket: WebSocket):
+        """Forget a client that went away and stop its sender task."""
+        connection = self.active_connections.pop(websocket, None)
+        if connection is not None:
+            self._drop_subscriptions(connection)
+            if connection.sender is not None:
+                connection.sender.cancel()
+
+    def subscribe(self, websocket: WebSocket, topics: Iterable[str]) -> List[str]:
+        """
+        Subscribe a connected client to topics.
+
+        Args:
+            websocket (WebSocket): A connected client
+            topics (Iterable[str]): Topic names, see TOPIC_PATTERN
+
+        Returns:
+            List[str]: The client's subscriptions after the call
+
+        Raises:
+            ValueError: If a topic name is invalid or the client would exceed WS_MAX_TOPICS
+        """
+        connection = self.active_connections[websocket]
+        # Checked before building the set: client JSON may hold unhashable items such as {}
+        topics = list(topics)
+        invalid = sorted(str(topic) for topic in topics if not isinstance(topic, str) or not TOPIC_PATTERN.match(topic))
+        if invalid:
+            raise ValueError(f"Invalid topics: {', '.join(invalid)}")
+        topics = set(topics)
+        if len(connection.topics | topics) > WS_MAX_TOPICS:
+            raise ValueError(f"At most {WS_MAX_TOPICS} topics per connection")
+
+        for topic in topics:
+            self.topics.setdefault(topic, set()).add(connection)
+        connection.topics |= topics
+        return sorted(connection.topics)
+
+    def unsubscribe(self, websocket: WebSocket, topics: Iterable[str]) -> List[str]:
+        """Remove subscriptions of a connected client and return the remaining ones."""
+        connection = self.active_connections[websocket]
+        for topic in {topic for topic in topics if isinstance(topic, str)} & connection.topics:
+            self._remove_subscriber(topic, connection)
+        return sorted(connection.topics)
+
+    def _remove_subscriber(self, topic: str, connection: Connection):
+        connection.topics.discard(topic)
+        subscribers = self.topics.get(topic)
+        if subscribers is not None:
+            subscribers.discard(connection)
+            if not subscribers:
+                del self.topics[topic]
+
+    def _drop_subscriptions(self, connection: Connection):
+        for topic in list(connection.topics):
+            self._remove_subscriber(topic, connection)
+
+    async def _send_loop(self, connection: Connection):
+        batched = connection.protocol != "json"
+        try:
+            while True:
+                batch = [await connection.queue.get()]
+                if batched:
+                    if self.batch_window > 0:
+                        await asyncio.sleep(self.batch_window)
+                    while len(batch) < self.batch_max and not connection.queue.empty():
+                        batch.append(connection.queue.get_nowait())
+                await asyncio.wait_for(self._send_frame(connection, batch), self.send_timeout)
+                connection.sent += len(batch)
+                connection.frames += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Dropping WebSocket client after failed send: {type(e).__name__}")
+            await self._evict(connection)
+
+    async def _send_frame(self, connection: Connection, batch: List[Outbound]):
+        if connection.protocol == "msgpack":
+            frame = msgpack.Packer().pack_array_header(len(batch)) + b"".join(item.packed() for item in batch)
+            await connection.websocket.send_bytes(frame)
+        else:
+            frame = batch[0].text() if connection.protocol == "json" else "[" + ",".join(item.text() for item in batch) + "]"
+            await connection.websocket.send_text(frame)
+        connection.bytes_sent += len(frame)
+        self.frames += 1
+        self.bytes_sent += len(frame)
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            now = time.monotonic()
+            ping = Outbound({"type": "ping", "ts": time.time()})
+            for connection in list(self.active_connections.values()):
+                if now - connection.last_seen > self.idle_timeout:
+                    print("⚠️ Reaping idle WebSocket client")
+                    self.reaped += 1
+                    await self._evict(connection, CLOSE_GOING_AWAY)
+                else:
+                    self._enqueue(connection, ping)
+
+    async def _evict(self, connection: Connection, code: int = 1011):
+        if self.active_connections.pop(connection.websocket, None) is None:
+            return
+        self._drop_subscriptions(connection)
+        self.evicted += 1
+        if connection.sender is not None and connection.sender is not asyncio.current_task():
+            connection.sender.cancel()
+        try:
+            await connection.websocket.close(code=code)
+        except Exception:
+            pass  # Already closed or broken
+
+    def _enqueue(self, connection: Connection, item: Outbound) -> bool:
+        if connection.closing:
+            return False
+        try:
+            connection.queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        connection.dropped += 1
+        self.dropped += 1
+        if self.drop_policy == "disconnect":
+            connection.closing = True
+            task = asyncio.create_task(self._evict(connection, CLOSE_TRY_AGAIN_LATER))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+            return False
+        connection.queue.get_nowait()
+        connection.queue.put_nowait(item)
+        return True
+
+    def publish(self, topic: str, message: dict) -> int:
+        """
+        Queue a message for the subscribers of `topic` only, without waiting for any socket,
+        and relay it to the other workers through the backplane.
+
+        Args:
+            topic (str): Topic name, e.g. "user:user12345"
+            message (dict): JSON-serializable message; a "topic" key is added for the client
+
+        Returns:
+            int: Number of local connections the message was queued for
+        """
+        if self.backplane is not None:
+            self.backplane.publish(topic, message)
+        return self.deliver(topic, message)
+
+    def deliver_batch(self, events: List[Tuple[str, dict]]):
+        """Deliver events relayed from other workers to the local subscribers."""
+        for topic, message in events:
+            self.deliver(topic, message)
+
+    def deliver(self, topic: str, message: dict) -> int:
+        """Queue a message for the local subscribers of `topic` only."""
+        subscribers = self.topics.get(topic)
+        if not subscribers:
+            return 0
+        item = Outbound({"topic": topic, **message})
+        return sum(self._enqueue(connection, item) for connection in list(subscribers))
+
+    def send(self, websocket: WebSocket, message: dict) -> bool:
+        """Queue a message for one client, e.g. a reply to its subscribe request."""
+        connection = self.active_connections.get(websocket)
+        return connection is not None and self._enqueue(connection, Outbound(message))
+
+    def broadcast(self, message: dict) -> int:
+        """
+        Queue a message for every client connected to this worker without waiting for any socket.
+
+        Args:
+            message (dict): JSON-serializable message, encoded once per protocol for all clients
+
+        Returns:
+            int: Number of connections the message was queued for
+        """
+        item = Outbound(message)
+        return sum(self._enqueue(connection, item) for connection in list(self.active_connections.values()))
+
+    async def send_message(self, message: dict):
+        """Broadcast `message`; kept awaitable for existing callers, it returns once queued."""
+        self.broadcast(message)
+
+    async def close_all(self):
+        """Stop every sender task and the heartbeat and close every socket, on app shutdown."""
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        for connection in list(self.active_connections.values()):
+            await self._evict(connection, CLOSE_GOING_AWAY)
+
+    def stats(self) -> Dict[str, object]:
+        """Return connection, queue and drop counters."""
+        connections = list(self.active_connections.values())
+        return {
+            "connections": len(connections),
+            "topics": len(self.topics),
+            "subscriptions": sum(len(subscribers) for subscribers in self.topics.values()),
+            "queued": sum(connection.queue.qsize() for connection in connections),
+            "max_queue": max((connection.queue.qsize() for connection in connections), default=0),
+            "queue_size": self.queue_size,
+            "drop_policy": self.drop_policy,
+            "dropped": self.dropped,
+            "evicted": self.evicted,
+            "reaped": self.reaped,
+            "protocols": {protocol: sum(c.protocol == protocol for c in connections) for protocol in PROTOCOLS},
+            "frames": self.frames,
+            "bytes_sent": self.bytes_sent,
+        }
+
+
+manager = WebSocketManager()
+
+
+async def start_backplane(backplane: Optional[Backplane] = None):
+    """Connect the shared manager to the cross-worker backplane (WS_BACKPLANE by default), on app startup."""
+    backplane = backplane or create_backplane()
+    await backplane.start(manager.deliver_batch)
+    manager.backplane = backplane
+
+
+async def stop_backplane():
+    """Flush and disconnect the backplane on app shutdown."""
+    if manager.backplane is not None:
+        backplane, manager.backplane = manager.backplane, None
+        await backplane.stop()
@@ -0,0 +1,66 @@
+import sys
+import os
+import asyncio
+import threading
+
+import bcrypt
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.auth_service import BCRYPT_ROUNDS, PasswordHasher, PasswordHasherBusy, needs_rehash, verify_password
+
+
+def test_pool_verifies_without_blocking_the_event_loop():
+    hashed = bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=10)).decode("utf-8")
+
+    async def scenario():
+        hasher = PasswordHasher(workers=2, max_queue=16)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.001)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        results = await asyncio.gather(
+            *(hasher.run(verify_password, password, hashed) for password in ["secret", "wrong", "secret", "secret"])
+        )
+        task.cancel()
+        hasher.shutdown()
+        return results, ticks, hasher.stats()
+
+    results, ticks, stats = asyncio.run(scenario())
+    assert results == [True, False, True, True]
+    # The loop kept running while the hashes were computed
+    assert ticks > 10
+    assert stats["completed"] == 4 and stats["waiting"] == 0 and stats["peak_waiting"] >= 2
+
+
+def test_full_queue_rejects_new_calls():
+    release = threading.Event()
+
+    async def scenario():
+        hasher = PasswordHasher(workers=1, max_queue=1)
+        running = asyncio.create_task(hasher.run(release.wait))
+        waiting = asyncio.create_task(hasher.run(release.wait))
+        await asyncio.sleep(0.01)
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.run(release.wait)
+        release.set()
+        await asyncio.gather(running, waiting)
+        hasher.shutdown()
+        return hasher.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["rejected"] == 1 and stats["completed"] == 2
+
+
+def test_needs_rehash_compares_cost_factor():
+    current = bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode("utf-8")
+    weaker = bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=4)).decode("utf-8")
+    assert not needs_rehash(current)
+    assert needs_rehash(weaker) == (BCRYPT_ROUNDS != 4)
+    assert not needs_rehash("not-a-bcrypt-hash")
@@ -0,0 +1,56 @@
+import sys
+import os
+import asyncio
+from datetime import datetime
+
+from mongomock_motor import AsyncMongoMockClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.models.sop import BacktestRequest
+from app.services.backtesting import score_plans
+
+
+class FakeRollups:
+    """Answers the realized-demand aggregation with monthly totals ($dateTrunc is not in mongomock)."""
+
+    def __init__(self, demand):
+        self.demand = demand
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        rows = [
+            {"_id": {"product_id": product_id, "period": period}, "demand": demand}
+            for (product_id, period), demand in self.demand.items()
+        ]
+
+        class Cursor:
+            async def to_list(self, length):
+                return rows
+
+        return Cursor()
+
+
+def test_score_plans_compares_each_forecast_period_with_realized_demand():
+    plans = AsyncMongoMockClient()["test"]["sop"]
+    rollups = FakeRollups({("P-1", datetime(2025, 1, 1)): 10, ("P-1", datetime(2025, 2, 1)): 20})
+
+    async def run():
+        await plans.insert_one({
+            "product_id": "P-1", "revision_number": 1, "period_unit": "month", "actual_demand": 999,
+            "forecasted_demand": [
+                {"period": datetime(2025, 1, 1), "quantity": 12},
+                {"period": datetime(2025, 2, 1), "quantity": 15},
+                {"period": datetime(2025, 3, 1), "quantity": 50},
+            ],
+        })
+        return await score_plans(BacktestRequest(), now=datetime(2025, 3, 15), plans_collection=plans, rollup_collection=rollups)
+
+    scores = asyncio.run(run())
+
+    # March has not elapsed yet, so only January (+2) and February (-5) are scored
+    assert scores["by_product"] == [{"product_id": "P-1", "mape": 22.5, "bias": -1.5, "wape": 23.3333, "count": 2}]
+    assert scores["by_revision"][0]["revision_number"] == 1
+    match = rollups.pipelines[0][0]["$match"]
+    assert match["day"] == {"$gte": datetime(2025, 1, 1), "$lt": datetime(2025, 3, 1)}
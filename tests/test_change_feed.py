@@ -0,0 +1,39 @@
+import sys
+import os
+import asyncio
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.change_feed import ChangeFeed, _order_topics
+
+
+class FakeStateCollection:
+    def __init__(self):
+        self.documents = {}
+
+    async def update_one(self, query, update, upsert=False):
+        self.documents.setdefault(query["_id"], {}).update(update["$set"])
+
+
+def test_burst_is_coalesced_into_one_event_per_document():
+    published = []
+    state = FakeStateCollection()
+    feed = ChangeFeed(
+        feeds={"orders": (None, "order_changed", _order_topics)},
+        publish=lambda topic, message: published.append((topic, message)),
+        state_collection=state,
+    )
+
+    for status in ("pending", "packed", "shipped"):
+        feed._record("orders", "update", {"_id": "o1", "user_id": "u1", "status": status}, {"resume_token": {"_data": status}})
+    feed._record("orders", "insert", {"_id": "o2", "user_id": "u2", "status": "pending"}, {"resume_token": {"_data": "o2"}})
+    asyncio.run(feed.flush())
+
+    assert [topic for topic, _ in published] == ["user:u1", "user:u2"]
+    latest = published[0][1]
+    assert latest["type"] == "order_changed"
+    assert latest["changes"] == 3
+    assert latest["document"]["status"] == "shipped"
+    # The position after the last recorded change is saved, so a restart resumes after it
+    assert state.documents["orders"]["resume_token"] == {"_data": "o2"}
+    assert feed.stats()["pending"] == 0
@@ -0,0 +1,36 @@
+import sys
+import os
+import asyncio
+from datetime import datetime
+
+from mongomock_motor import AsyncMongoMockClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services import decision_memory
+
+
+def test_unapproving_refills_recent_approved_from_older_approvals(monkeypatch):
+    database = AsyncMongoMockClient()["test"]
+    monkeypatch.setattr(decision_memory, "decision_context_collection", database["decision_context"])
+    monkeypatch.setattr(decision_memory, "decision_memory_collection", database["decision_memory"])
+    monkeypatch.setattr(decision_memory, "DECISION_MEMORY_RECENT", 2)
+
+    async def run():
+        documents = [
+            {"user_id": "u", "date": datetime(2025, 1, day), "risks_decisions": [{"risk": f"risk {day}", "decision": f"decision {day}", "approved": True}]}
+            for day in (1, 2, 3)
+        ]
+        inserted = await database["decision_context"].insert_many(documents)
+        await decision_memory.record_decision_contexts(zip(documents, inserted.inserted_ids))
+
+        # The newest approval is withdrawn: the route flips the stored value first
+        newest = inserted.inserted_ids[2]
+        await database["decision_context"].update_one({"_id": newest}, {"$set": {"risks_decisions.0.approved": False}})
+        await decision_memory.record_approval_change("u", str(newest), 0, documents[2]["risks_decisions"][0], False, documents[2]["date"])
+        return await decision_memory.get_decision_memory("u")
+
+    memory = asyncio.run(run())
+
+    assert memory["approved"] == 2
+    assert [entry["decision"] for entry in memory["recent_approved"]] == ["decision 1", "decision 2"]
@@ -0,0 +1,67 @@
+import sys
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.dependencies import get_current_user
+from app.routes import decisioncontext
+
+ALICE = {"_id": "alice-id", "email": "alice@example.com"}
+CONTEXT = {"previsions": ["p"], "processes": ["q"], "constraints": ["c"]}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    database = AsyncMongoMockClient()["test"]
+    monkeypatch.setattr(decisioncontext, "database", type("Database", (), {"decision_context_collection": database["decision_context"]}))
+    monkeypatch.setattr(decisioncontext, "decision_context_collection", database["decision_context"])
+
+    async def ignore(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(decisioncontext.decision_index, "add", ignore)
+    monkeypatch.setattr(decisioncontext, "record_decision_context", ignore)
+    monkeypatch.setattr(decisioncontext, "record_approval_change", ignore)
+
+    app = FastAPI()
+    app.include_router(decisioncontext.decision_context_router, prefix="/api")
+    app.dependency_overrides[get_current_user] = lambda: ALICE
+    with TestClient(app) as client:
+        yield client
+
+
+def test_decision_contexts_are_scoped_to_the_caller(client):
+    created = client.post("/api/decision-context/create/", json={
+        "user_id": "alice-id", "context": CONTEXT, "risks_decisions": [{"risk": "r", "decision": "d"}],
+    })
+    assert created.status_code == 200
+    context_id = created.json()["_id"]
+
+    # Another user's contexts can be neither read nor written
+    assert client.get("/api/decision-contexts/user", params={"user_id": "bob-id"}).status_code == 403
+    assert client.post("/api/decision-context/create/", json={"user_id": "bob-id", "context": CONTEXT}).status_code == 403
+    assert client.post("/api/decision-context/submit/", params={"user_id": "bob-id"}, json=CONTEXT).status_code == 403
+
+    # The caller's own contexts, by default or by email
+    assert [context["_id"] for context in client.get("/api/decision-contexts/user").json()] == [context_id]
+    assert client.get("/api/decision-contexts/user", params={"user_id": "alice@example.com"}).status_code == 404
+
+    approval = client.patch(f"/api/decision-context/{context_id}/risks-decisions/0/approval", params={"approved": True})
+    assert approval.json()["changed"] is True
+
+
+def test_approving_another_users_context_is_not_found(client):
+    async def insert():
+        result = await decisioncontext.decision_context_collection.insert_one(
+            {"user_id": "bob-id", "context": CONTEXT, "risks_decisions": [{"risk": "r", "decision": "d", "approved": False}]}
+        )
+        return str(result.inserted_id)
+
+    context_id = client.portal.call(insert)
+    response = client.patch(f"/api/decision-context/{context_id}/risks-decisions/0/approval", params={"approved": True})
+    assert response.status_code == 404
@@ -0,0 +1,85 @@
+import sys
+import os
+import asyncio
+import time
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import dependencies
+from app.services import auth_service
+
+
+class FakeUsersCollection:
+    def __init__(self, users):
+        self.users = users
+        self.reads = 0
+
+    async def find_one(self, query, projection=None):
+        self.reads += 1
+        user = self.users.get(query["email"])
+        return {key: value for key, value in user.items() if key != "password"} if user else None
+
+
+@pytest.fixture
+def users(monkeypatch):
+    monkeypatch.setattr(auth_service, "SECRET_KEY", "test-secret-key-with-at-least-32-bytes")
+    collection = FakeUsersCollection({"ana@example.com": {"_id": "u1", "email": "ana@example.com", "password": "hash"}})
+    monkeypatch.setattr(dependencies, "users_collection", collection)
+    dependencies._verified_tokens.clear()
+    dependencies._users.clear()
+    return collection
+
+
+def test_repeated_requests_need_no_verification_or_database_read(users):
+    token = auth_service.create_access_token("ana@example.com")
+
+    async def scenario():
+        return [await dependencies.authenticate_token(token) for _ in range(5)]
+
+    results = asyncio.run(scenario())
+    assert all(user == {"_id": "u1", "email": "ana@example.com"} for user in results)
+    assert users.reads == 1
+    stats = dependencies.auth_cache_stats()
+    assert stats["token_misses"] == 1 and stats["token_hits"] == 4
+
+    dependencies.invalidate_user("ana@example.com")
+    asyncio.run(dependencies.authenticate_token(token))
+    assert users.reads == 2
+
+
+def test_cached_token_is_rejected_after_its_expiry(users):
+    expires = int(time.time()) + 1
+    token = jwt.encode({"sub": "ana@example.com", "exp": expires}, auth_service.SECRET_KEY, algorithm="HS256")
+    asyncio.run(dependencies.authenticate_token(token))
+    assert token in dependencies._verified_tokens
+
+    time.sleep(expires + 0.05 - time.time())
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(dependencies.authenticate_token(token))
+    assert error.value.detail == "Token expired"
+    assert token not in dependencies._verified_tokens
+
+
+def test_invalid_token_and_unknown_user_are_rejected(users):
+    for token in (None, "not-a-token", auth_service.create_access_token("ghost@example.com")):
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(dependencies.authenticate_token(token))
+        assert error.value.status_code == 401
+
+
+def test_auth_stats_require_a_token(users):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.routes.auth import auth_router
+
+    app = FastAPI()
+    app.include_router(auth_router, prefix="/auth")
+    with TestClient(app) as client:
+        assert client.get("/auth/stats").status_code == 401
+        token = auth_service.create_access_token("ana@example.com")
+        response = client.get("/auth/stats", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200 and "cache" in response.json()
@@ -0,0 +1,44 @@
+import sys
+import os
+import numpy as np
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.forecasting import build_demand_matrix, forecast_demand, future_periods
+
+
+def test_build_demand_matrix_fills_missing_periods():
+    groups = {
+        "P-1": {"periods": [{"period": datetime(2025, 1, 1), "quantity": 2}, {"period": datetime(2025, 3, 1), "quantity": 4}]},
+    }
+    periods, matrix = build_demand_matrix(groups, ["P-1", "P-2"], "month")
+
+    assert periods == [datetime(2025, 1, 1), datetime(2025, 2, 1), datetime(2025, 3, 1)]
+    assert matrix.tolist() == [[2, 0, 4], [0, 0, 0]]
+
+
+def test_future_periods_roll_over_the_year():
+    assert future_periods(datetime(2024, 11, 1), "month", 3) == [datetime(2024, 12, 1), datetime(2025, 1, 1), datetime(2025, 2, 1)]
+
+
+def test_forecast_follows_trend_and_season_per_product():
+    t = np.arange(36)
+    demand = np.stack([
+        10.0 + 2 * t,
+        20 + 5 * np.sin(2 * np.pi * t / 12),
+    ])
+    result = forecast_demand(demand, "month", horizon=2)
+
+    assert result["forecast"].shape == (2, 2)
+    assert np.allclose(result["forecast"][0], [82, 84], atol=1)
+    assert np.allclose(result["forecast"][1], 20 + 5 * np.sin(2 * np.pi * np.array([36, 37]) / 12), atol=0.5)
+    assert (result["confidence"] > 0.9).all()
+
+
+def test_forecast_with_too_little_history_is_naive():
+    result = forecast_demand(np.array([[3.0, 5.0]]), "week", horizon=2)
+
+    assert result["forecast"].tolist() == [[5.0, 5.0]]
+    assert result["confidence"].tolist() == [0.0]
+    assert result["model"] == ["naive"]
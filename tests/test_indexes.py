@@ -0,0 +1,56 @@
+import sys
+import os
+import asyncio
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.indexes import INDEXES, KNOWN_QUERIES, explain_queries
+
+
+INDEXED_PLAN = {
+    "queryPlanner": {
+        "winningPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "email_1"}},
+    }
+}
+# Slot-based engine layout, as returned by MongoDB 7+
+SCAN_PLAN = {"queryPlanner": {"winningPlan": {"queryPlan": {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}}}}
+
+
+class FakeCursor:
+    def __init__(self, plan):
+        self.plan = plan
+
+    def sort(self, sort):
+        return self
+
+    async def explain(self):
+        return self.plan
+
+
+class FakeDatabase:
+    def __init__(self, scanned):
+        self.scanned = scanned
+
+    def get_collection(self, name):
+        plan = SCAN_PLAN if name in self.scanned else INDEXED_PLAN
+        return type("Collection", (), {"find": lambda _, query: FakeCursor(plan)})()
+
+
+def test_explain_flags_collection_scans():
+    reports = asyncio.run(explain_queries(FakeDatabase(scanned={"sales"})))
+    assert len(reports) == len(KNOWN_QUERIES)
+    flagged = {report["collection"] for report in reports if report["collscan"]}
+    assert flagged == {"sales"}
+    users = next(report for report in reports if report["collection"] == "users")
+    assert users["stages"] == ["FETCH", "IXSCAN"] and users["indexes"] == ["email_1"]
+
+
+def test_every_known_query_has_an_index_on_its_first_field():
+    for description, name, query, _ in KNOWN_QUERIES:
+        # A partial index also serves queries on its filter fields
+        leading = {"_id"} | {next(iter(index.document["key"])) for index in INDEXES[name]}
+        leading |= {field for index in INDEXES[name] for field in index.document.get("partialFilterExpression", {})}
+        # Every branch of an $or needs its own index, or the whole query scans the collection
+        branches = query["$or"] if "$or" in query else [query]
+        for branch in branches:
+            assert next(iter(branch)) in leading, description
@@ -0,0 +1,36 @@
+import sys
+import os
+import json
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.json_stream import JSONArrayStreamParser
+
+ITEMS = [
+    {"risk": "Supplier \"A\" delays [late]", "decision": "Use {backup} supplier"},
+    {"risk": "Port strike", "decision": "Reroute\\air freight", "tags": ["urgent", {"level": 2}]},
+]
+TEXT = "Here is the analysis:\n```json\n" + json.dumps(ITEMS, indent=2) + "\n```\nDone."
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, len(TEXT)])
+def test_items_emitted_once_complete_for_any_chunking(size):
+    parser = JSONArrayStreamParser()
+    emitted = []
+    for start in range(0, len(TEXT), size):
+        emitted.extend(parser.feed(TEXT[start:start + size]))
+
+    assert emitted == ITEMS
+    assert parser.finished and parser.count == 2
+
+
+def test_first_item_available_before_array_ends():
+    parser = JSONArrayStreamParser()
+    assert parser.feed('[{"risk": "a", "decision": "b"}, {"risk": "c"') == [{"risk": "a", "decision": "b"}]
+    assert not parser.finished
+
+
+def test_invalid_element_raises():
+    with pytest.raises(json.JSONDecodeError):
+        JSONArrayStreamParser().feed('[{"risk": oops}]')
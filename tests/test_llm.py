@@ -1,52 +1,67 @@
-import requests
-import json
+import sys
 import os
+import asyncio
+import httpx
+import pytest
 
-# Load API key from environment variables
-API_KEY = "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" # Ensure this is set
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
 
-# Ensure API key is correctly loaded
-if not API_KEY:
-    raise ValueError("❌ OPENROUTER_API_KEY is not set. Please check your environment variables!")
+from app.services import llm_service
+from app.services.llm_scheduler import LLMScheduler
+from tools.llm_stub import create_stub_app
 
-URL = "https://openrouter.ai/api/v1/chat/completions"
-
-HEADERS = {
-    "Authorization": f"Bearer {API_KEY}",  
-    "Content-Type": "application/json",
-}
 context = {
-  "previsions": ["Increase in demand by 15%", "Expected supplier delays"],
-  "processes": ["Just-in-time inventory", "Automated warehouse sorting"],
-  "constraints": ["Limited storage space", "Budget restrictions"]
+    "previsions": ["Increase in demand by 15%", "Expected supplier delays"],
+    "processes": ["Just-in-time inventory", "Automated warehouse sorting"],
+    "constraints": ["Limited storage space", "Budget restrictions"],
 }
 
 
-prompt = f"""
-    Given the following logistics context:
-    - Previsions: {context['previsions']}
-    - Processes: {context['processes']}
-    - Constraints: {context['constraints']}
-    
-    Identify potential risks and suggest decisions to optimize logistics.
-    Format your response as a JSON list of objects, each containing:
-    - "risk": A description of the risk.
-    - "decision": A recommended decision to mitigate the risk.
-    """
-
-DATA = {
-    "model": "google/gemini-2.0-flash-lite-preview-02-05:free",  
-    "messages": [ {"role": "system", "content": "You are an AI assisting with logistics optimization."},
-                    {"role": "user", "content": prompt}]
-}
+@pytest.fixture
+def stub(monkeypatch):
+    """Route llm_service to an in-process stub instead of OpenRouter."""
+    def install(**options):
+        app = create_stub_app(**{"latency": 0, "jitter": 0, "chunk_delay": 0, "seed": 1, **options})
+        llm_service.set_http_client(httpx.AsyncClient(transport=httpx.ASGITransport(app=app)))
+        return app
+
+    monkeypatch.setattr(llm_service, "scheduler", LLMScheduler(rate=0, max_retries=2, backoff_base=0.001))
+    yield install
+    llm_service.set_http_client(None)
+
+
+def test_risks_and_decisions_parsed_from_fenced_completion(stub):
+    stub()
+    result = asyncio.run(llm_service.get_risks_and_decisions(context, use_cache=False))
+
+    risks = result["risks_decisions"]
+    assert len(risks) == 3
+    assert all(set(item) == {"risk", "decision"} for item in risks)
+    assert "expected supplier delays" in risks[1]["risk"]
+
+
+def test_streamed_items_match_blocking_result(stub):
+    stub()
+
+    async def scenario():
+        blocking = await llm_service.get_risks_and_decisions(context, use_cache=False)
+        streamed = [item async for item in llm_service.stream_risks_and_decisions(context, use_cache=False)]
+        return blocking, streamed
+
+    blocking, streamed = asyncio.run(scenario())
+    assert streamed == blocking["risks_decisions"]
+
 
+def test_best_decision(stub):
+    stub()
+    result = asyncio.run(llm_service.get_best_decision("Port congestion", [{"context": context}]))
+    assert result == {"best_decision": {"best_decision": "Apply the previously approved mitigation to Port congestion"}}
 
 
-# Send request
-response = requests.post(URL, headers=HEADERS, data=json.dumps(DATA))
+def test_persistent_errors_reported_after_retries(stub):
+    stub(error_rate=1.0, error_status=503)
+    result = asyncio.run(llm_service.get_risks_and_decisions(context, use_cache=False))
 
-# Debugging output
-print("🔹 Request Headers:", HEADERS)
-print("🔹 API Key Sent:", "Yes" if API_KEY else "No")
-print("🔹 Response Status:", response.status_code)
-print("🔹 Response Body:", response.json()["choices"][0]["message"]["content"])
+    assert result["error"].startswith("LLM API error")
+    assert llm_service.scheduler.stats()["retries"] == 2
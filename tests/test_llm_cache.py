@@ -0,0 +1,23 @@
+import sys
+import os
+import asyncio
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.llm_cache import LLMResponseCache
+
+
+def test_callers_mutating_a_cached_response_do_not_change_the_entry():
+    cache = LLMResponseCache(maxsize=4, ttl=60)
+
+    async def run():
+        stored = {"risks_decisions": [{"risk": "r", "decision": "d"}]}
+        await cache.set("key", stored)
+        stored["risks_decisions"].append({"risk": "added after set"})
+
+        first = await cache.get("key")
+        first["risks_decisions"][0]["approved"] = True
+        first["id"] = "context-1"
+        return await cache.get("key")
+
+    assert asyncio.run(run()) == {"risks_decisions": [{"risk": "r", "decision": "d"}]}
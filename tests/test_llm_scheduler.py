@@ -0,0 +1,86 @@
+import sys
+import os
+import time
+import asyncio
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.llm_scheduler import (
+    LLMScheduler,
+    PRIORITY_BULK,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_STANDARD,
+    parse_retry_after,
+)
+
+
+def test_waiting_calls_admitted_by_priority():
+    async def scenario():
+        scheduler = LLMScheduler(rate=0, max_concurrency=1)
+        order = []
+
+        async def call(name, priority):
+            async with scheduler.slot("model", priority):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        first = asyncio.create_task(call("first", PRIORITY_STANDARD))
+        await asyncio.sleep(0)
+        waiting = [
+            asyncio.create_task(call("bulk", PRIORITY_BULK)),
+            asyncio.create_task(call("standard", PRIORITY_STANDARD)),
+            asyncio.create_task(call("interactive", PRIORITY_INTERACTIVE)),
+        ]
+        await asyncio.sleep(0)
+        depth = scheduler.stats()["queue_depth"]
+        await asyncio.gather(first, *waiting)
+        return order, depth
+
+    order, depth = asyncio.run(scenario())
+    assert order == ["first", "interactive", "standard", "bulk"]
+    assert depth == {"bulk": 1, "standard": 1, "interactive": 1}
+
+
+def test_rate_limited_call_retried_after_retry_after():
+    async def scenario():
+        scheduler = LLMScheduler(rate=0, max_retries=2, backoff_base=0.001)
+        responses = [httpx.Response(429, headers={"Retry-After": "0.05"}), httpx.Response(503), httpx.Response(200)]
+
+        async def send():
+            return responses.pop(0)
+
+        started = time.monotonic()
+        response = await scheduler.request(send, "model")
+        return response.status_code, time.monotonic() - started, scheduler.stats()
+
+    status, elapsed, stats = asyncio.run(scenario())
+    assert status == 200
+    assert elapsed >= 0.05
+    assert stats["retries"] == 2 and stats["rate_limited"] == 1 and stats["failures"] == 0
+
+
+def test_transport_error_raised_once_retries_exhausted():
+    async def scenario():
+        scheduler = LLMScheduler(rate=0, max_retries=1, backoff_base=0.001)
+        attempts = 0
+
+        async def send():
+            nonlocal attempts
+            attempts += 1
+            raise httpx.ConnectError("refused")
+
+        with pytest.raises(httpx.ConnectError):
+            await scheduler.request(send, "model")
+        return attempts, scheduler.stats()
+
+    attempts, stats = asyncio.run(scenario())
+    assert attempts == 2
+    assert stats["failures"] == 1 and stats["in_flight"] == {}
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after(None) is None
@@ -0,0 +1,48 @@
+import sys
+import os
+import pytest
+from bson import ObjectId
+from datetime import datetime
+from fastapi import HTTPException
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.pagination import encode_cursor, decode_cursor, keyset_filter
+
+
+def test_cursor_round_trip():
+    document = {"_id": ObjectId("507f1f77bcf86cd799439011"), "created_at": datetime(2025, 2, 7, 12, 0)}
+    cursor = encode_cursor("created_at", document)
+
+    position = decode_cursor(cursor)
+    assert position["_id"] == document["_id"]
+    assert position["created_at"] == document["created_at"]
+
+
+def test_keyset_filter_on_id():
+    object_id = ObjectId("507f1f77bcf86cd799439011")
+    cursor = encode_cursor("_id", {"_id": object_id})
+
+    assert keyset_filter({}, "_id", None) == {}
+    assert keyset_filter({}, "_id", cursor) == {"_id": {"$gt": object_id}}
+    assert keyset_filter({"status": "Pending"}, "_id", cursor) == {
+        "$and": [{"status": "Pending"}, {"_id": {"$gt": object_id}}]
+    }
+
+
+def test_keyset_filter_on_sort_field_breaks_ties_on_id():
+    document = {"_id": "abc", "email": "a@example.com"}
+    cursor = encode_cursor("email", document)
+
+    assert keyset_filter({}, "email", cursor) == {
+        "$or": [
+            {"email": {"$gt": "a@example.com"}},
+            {"email": "a@example.com", "_id": {"$gt": "abc"}},
+        ]
+    }
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        decode_cursor("not-a-cursor")
+    assert error.value.status_code == 400
@@ -0,0 +1,14 @@
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.rollup_service import day_range
+
+
+def test_day_range_keeps_the_whole_day_of_both_bounds():
+    match = day_range(datetime(2025, 1, 5, 13, 30), datetime(2025, 1, 9, 8, 15))
+
+    assert match == {"$gte": datetime(2025, 1, 5), "$lte": datetime(2025, 1, 9)}
+    assert day_range() == {}
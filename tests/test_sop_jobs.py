@@ -0,0 +1,100 @@
+import sys
+import os
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.models.sop import SOPRequest
+from app.services import sop_jobs
+from app.services.sop_planner import build_sop_plans
+
+
+def _group(*quantities):
+    periods = [{"period": datetime(2025, month, 1), "quantity": quantity} for month, quantity in enumerate(quantities, start=1)]
+    return {"periods": periods, "total": sum(quantities)}
+
+
+@pytest.fixture
+def collections(monkeypatch):
+    database = AsyncMongoMockClient()["test"]
+    monkeypatch.setattr(sop_jobs, "sop_jobs_collection", database["sop_jobs"])
+    monkeypatch.setattr(sop_jobs, "sop_collection", database["sop"])
+    monkeypatch.setattr(sop_jobs.manager, "publish", lambda topic, message: None)
+    return database
+
+
+def test_shards_with_the_job_window_plan_like_a_single_run():
+    request = SOPRequest(period="month", horizon=2, model="moving_average")
+    history = {"demand": {"P-1": _group(4, 6, 8), "P-2": _group(0, 0, 3)}, "capacity": {}}
+    # P-2 alone only spans March in its own history
+    shard = {"demand": {"P-2": {"periods": history["demand"]["P-2"]["periods"][2:], "total": 3}}, "capacity": {}}
+
+    whole = {plan.product_id: plan for plan in build_sop_plans(history, request)}
+    sharded = build_sop_plans(shard, request, window=(datetime(2025, 1, 1), datetime(2025, 3, 1)))[0]
+
+    assert sharded.forecasted_demand == whole["P-2"].forecasted_demand
+    assert [entry["period"] for entry in sharded.forecasted_demand] == [datetime(2025, 4, 1), datetime(2025, 5, 1)]
+
+
+def test_failed_shard_cancels_the_others_and_deletes_partial_plans(collections, monkeypatch):
+    cancelled = []
+
+    async def shards(request):
+        return [["P-1"], ["P-2"], ["P-3"]]
+
+    async def window(request):
+        return datetime(2025, 1, 1), datetime(2025, 3, 1)
+
+    async def run_shard(job_id, request, product_ids, window, semaphore, stores):
+        if product_ids == ["P-1"]:
+            await collections["sop"].insert_one({"product_id": "P-1", "job_id": job_id})
+            return 1
+        if product_ids == ["P-2"]:
+            await asyncio.sleep(0.01)
+            raise RuntimeError("shard exploded")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(product_ids)
+            raise
+
+    monkeypatch.setattr(sop_jobs, "_shard_product_ids", shards)
+    monkeypatch.setattr(sop_jobs, "_history_window", window)
+    monkeypatch.setattr(sop_jobs, "_run_shard", run_shard)
+
+    async def run():
+        await collections["sop_jobs"].insert_one({"_id": "job-1", "status": "queued"})
+        await sop_jobs._run_job("job-1", SOPRequest())
+        return await collections["sop_jobs"].find_one({"_id": "job-1"}), await collections["sop"].count_documents({})
+
+    job, plans = asyncio.run(run())
+
+    assert job["status"] == "failed" and job["error"] == "shard exploded"
+    assert cancelled == [["P-3"]]
+    assert plans == 0
+
+
+def test_fail_stale_sop_jobs_only_touches_jobs_without_a_fresh_heartbeat(collections):
+    now = datetime.now(timezone.utc)
+
+    async def run():
+        await collections["sop_jobs"].insert_many([
+            {"_id": "stale", "status": "running", "heartbeat_at": now - timedelta(hours=1)},
+            {"_id": "legacy", "status": "queued"},
+            {"_id": "live", "status": "running", "heartbeat_at": now},
+            {"_id": "done", "status": "completed", "heartbeat_at": now - timedelta(hours=1)},
+        ])
+        await collections["sop"].insert_many([{"job_id": "stale"}, {"job_id": "live"}])
+        failed = await sop_jobs.fail_stale_sop_jobs()
+        statuses = {job["_id"]: job["status"] async for job in collections["sop_jobs"].find()}
+        return failed, statuses, await collections["sop"].distinct("job_id")
+
+    failed, statuses, plan_jobs = asyncio.run(run())
+
+    assert failed == 2
+    assert statuses == {"stale": "failed", "legacy": "failed", "live": "running", "done": "completed"}
+    assert plan_jobs == ["live"]
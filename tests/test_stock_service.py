@@ -0,0 +1,154 @@
+import sys
+import os
+import asyncio
+
+import pytest
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.stock_service import apply_stock_movement, apply_stock_movements, movement_guard, movement_update
+from app.services.websocket_manager import manager
+
+
+class FakeInventory:
+    """mongomock collection with the unordered `bulk_write` of UpdateOne operations that mongomock lacks."""
+
+    def __init__(self):
+        self.collection = AsyncMongoMockClient()["test"]["inventory"]
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    async def bulk_write(self, operations, ordered=True):
+        modified = 0
+        for operation in operations:
+            result = await self.collection.update_one(operation._filter, operation._doc)
+            modified += result.modified_count
+        return type("BulkWriteResult", (), {"modified_count": modified})()
+
+
+@pytest.fixture
+def inventory(monkeypatch):
+    published = []
+    monkeypatch.setattr(manager, "publish", lambda topic, message: published.append((topic, message)))
+    collection = FakeInventory()
+    collection.published = published
+    return collection
+
+
+def _record(inventory, stock_level, max_stock_level=50, reorder_point=10):
+    async def insert():
+        result = await inventory.insert_one({
+            "product_id": f"P-{stock_level}", "warehouse_id": "W-1", "stock_level": stock_level,
+            "max_stock_level": max_stock_level, "reorder_point": reorder_point, "min_stock_level": 2,
+            "below_reorder_point": stock_level <= reorder_point,
+        })
+        return str(result.inserted_id)
+
+    return asyncio.run(insert())
+
+
+def test_guard_keeps_stock_between_zero_and_max():
+    assert movement_guard(-5) == {"stock_level": {"$gte": 5}}
+    assert movement_guard(3) == {"$expr": {"$lte": [{"$add": ["$stock_level", 3]}, "$max_stock_level"]}}
+    assert movement_guard(0) == {}
+
+
+def test_update_increments_records_movement_id_and_reflags():
+    changes, *flag_stages = movement_update(-2, "crossing-1", "pick-1")
+    assert changes["$set"]["stock_level"] == {"$add": ["$stock_level", -2]}
+    assert "updated_at" in changes["$set"]
+    # IDs are literals, so a client ID starting with "$" is not read as a field path
+    assert changes["$set"]["recent_movements"]["$slice"][0]["$concatArrays"][1] == {"$literal": ["pick-1"]}
+    assert flag_stages[-1] == {"$set": {"below_reorder_point": {"$lte": ["$stock_level", "$reorder_point"]}}}
+    assert flag_stages[0]["$set"]["reorder_crossing"]["$cond"][1]["id"] == {"$literal": "crossing-1"}
+    assert "recent_movements" not in movement_update(4, "crossing-2")[0]["$set"]
+    assert "movement_log" not in movement_update(4, "crossing-2")[0]["$set"]
+
+
+def test_invalid_ids_are_rejected_without_a_database_call():
+    assert asyncio.run(apply_stock_movement("not-an-id", 1, collection=None)) == {"error": "invalid_id"}
+    result = asyncio.run(apply_stock_movements(
+        [{"inventory_id": "bad", "delta": 1}, {"inventory_id": "bad", "delta": 2}], batch_id="b1", collection=None
+    ))
+    assert result == {
+        "batch_id": "b1", "movements": 2, "items": 1, "applied": 0,
+        "rejected": [{"inventory_id": "bad", "delta": 3, "reason": "invalid_id"}],
+    }
+
+
+def test_bulk_movements_classify_applied_out_of_range_and_not_found(inventory):
+    plenty, scarce, missing = _record(inventory, 12), _record(inventory, 3), str(ObjectId())
+
+    result = asyncio.run(apply_stock_movements([
+        {"inventory_id": plenty, "delta": -4},
+        {"inventory_id": plenty, "delta": -1},
+        {"inventory_id": scarce, "delta": -10},
+        {"inventory_id": missing, "delta": 1},
+    ], batch_id="b1", collection=inventory))
+
+    assert result["applied"] == 1 and result["items"] == 3
+    assert sorted((item["inventory_id"], item["delta"], item["reason"]) for item in result["rejected"]) == sorted([
+        (scarce, -10, "out_of_range"), (missing, 1, "not_found"),
+    ])
+    levels = asyncio.run(inventory.find({}, {"stock_level": 1}).to_list(None))
+    assert sorted(level["stock_level"] for level in levels) == [3, 7]
+    # The applied record crossed its reorder point
+    assert [(topic, message["crossings"][0]["inventory_id"]) for topic, message in inventory.published] == [
+        ("low_stock", plenty), ("low_stock:W-1", plenty),
+    ]
+
+
+def test_retried_movement_returns_the_current_level_without_applying_twice(inventory):
+    record = _record(inventory, 20)
+
+    async def scenario():
+        first = await apply_stock_movement(record, -5, movement_id="pick-1", collection=inventory)
+        retry = await apply_stock_movement(record, -5, movement_id="pick-1", collection=inventory)
+        rejected = await apply_stock_movement(record, -100, movement_id="pick-2", collection=inventory)
+        return first, retry, rejected
+
+    first, retry, rejected = asyncio.run(scenario())
+    assert first["stock_level"] == retry["stock_level"] == 15
+    assert retry["id"] == record and "error" not in retry
+    assert rejected == {"error": "out_of_range", "current": first}
+
+
+def test_retried_batch_does_not_publish_crossings_again(inventory):
+    crossing, recovering = _record(inventory, 12), _record(inventory, 3)
+    movements = [{"inventory_id": crossing, "delta": -5}, {"inventory_id": recovering, "delta": 20}]
+
+    async def scenario():
+        first = await apply_stock_movements(movements, batch_id="b1", collection=inventory)
+        published = len(inventory.published)
+        retry = await apply_stock_movements(movements, batch_id="b1", collection=inventory)
+        return first, published, retry
+
+    first, published, retry = asyncio.run(scenario())
+    assert first["applied"] == retry["applied"] == 2 and retry["rejected"] == []
+    crossings = {entry["inventory_id"]: entry["below"] for _, message in inventory.published for entry in message["crossings"]}
+    assert crossings == {crossing: True, recovering: False}
+    assert len(inventory.published) == published
+
+
+def test_movements_are_logged_with_their_reason(inventory):
+    single, bulk = _record(inventory, 20), _record(inventory, 30)
+
+    async def scenario():
+        await apply_stock_movement(single, -5, movement_id="pick-1", reason="$pick", collection=inventory)
+        await apply_stock_movement(single, -5, movement_id="pick-1", reason="$pick", collection=inventory)
+        await apply_stock_movements([
+            {"inventory_id": bulk, "delta": -2, "reason": "pick", "movement_id": "m-1"},
+            {"inventory_id": bulk, "delta": 6, "reason": "receipt"},
+        ], batch_id="b1", collection=inventory)
+        return [await inventory.find_one({"_id": ObjectId(record)}) for record in (single, bulk)]
+
+    single_record, bulk_record = asyncio.run(scenario())
+    # A retry is not logged twice; reasons are stored as given, even starting with "$"
+    assert [(e["delta"], e["reason"], e["movement_id"]) for e in single_record["movement_log"]] == [(-5, "$pick", "pick-1")]
+    assert [(e["delta"], e["reason"], e["movement_id"], e["batch_id"]) for e in bulk_record["movement_log"]] == [
+        (-2, "pick", "m-1", "b1"), (6, "receipt", None, "b1"),
+    ]
+    assert bulk_record["stock_level"] == 34 and "at" in bulk_record["movement_log"][0]
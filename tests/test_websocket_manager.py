@@ -0,0 +1,244 @@
+import sys
+import os
+import asyncio
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.websocket_manager import WebSocketManager
+
+
+class FakeWebSocket:
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.received = []
+        self.closed_with = None
+
+    async def accept(self, subprotocol=None):
+        self.subprotocol = subprotocol
+
+    async def send_text(self, text):
+        if self.fail:
+            raise RuntimeError("connection reset")
+        await asyncio.sleep(self.delay)
+        self.received.append(json.loads(text))
+
+    async def send_bytes(self, data):
+        self.received.append(data)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+def test_slow_client_drops_oldest_without_delaying_others():
+    async def scenario():
+        manager = WebSocketManager(queue_size=5, drop_policy="drop_oldest", send_timeout=5)
+        fast, slow = FakeWebSocket(), FakeWebSocket(delay=1)
+        await manager.connect(fast)
+        await manager.connect(slow)
+
+        started = asyncio.get_running_loop().time()
+        for number in range(20):
+            manager.broadcast({"n": number})
+            await asyncio.sleep(0.001)
+        broadcast_time = asyncio.get_running_loop().time() - started
+        await asyncio.sleep(0.05)
+        stats = manager.stats()
+        await manager.close_all()
+        return fast, slow, stats, broadcast_time
+
+    fast, slow, stats, broadcast_time = asyncio.run(scenario())
+    assert broadcast_time < 0.5
+    assert [message["n"] for message in fast.received] == list(range(20))
+    assert stats["connections"] == 2 and stats["dropped"] > 0
+    # The slow client keeps the newest messages
+    assert stats["max_queue"] == 5
+
+
+def test_disconnect_policy_and_failed_sends_evict():
+    async def scenario():
+        manager = WebSocketManager(queue_size=2, drop_policy="disconnect", send_timeout=5)
+        slow, broken, healthy = FakeWebSocket(delay=1), FakeWebSocket(fail=True), FakeWebSocket()
+        for websocket in (slow, broken, healthy):
+            await manager.connect(websocket)
+        for number in range(5):
+            manager.broadcast({"n": number})
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0.05)
+        remaining = list(manager.active_connections)
+        await manager.close_all()
+        return slow, broken, healthy, remaining, manager.stats()
+
+    slow, broken, healthy, remaining, stats = asyncio.run(scenario())
+    assert remaining == [healthy]
+    assert slow.closed_with == 1013
+    assert len(healthy.received) == 5
+    assert stats["evicted"] == 3
+
+
+def test_publish_only_reaches_topic_subscribers():
+    async def scenario():
+        manager = WebSocketManager(queue_size=10)
+        alice, bob, warehouse = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        for websocket in (alice, bob, warehouse):
+            await manager.connect(websocket)
+        manager.subscribe(alice, ["user:alice"])
+        manager.subscribe(bob, ["user:bob", "inventory"])
+        manager.subscribe(warehouse, ["inventory"])
+
+        delivered = [
+            manager.publish("user:alice", {"risk": "a"}),
+            manager.publish("inventory", {"sku": "X"}),
+            manager.publish("shipments:42", {"status": "late"}),
+        ]
+        await asyncio.sleep(0.01)
+        manager.unsubscribe(bob, ["inventory"])
+        await manager.disconnect(warehouse)
+        topics = dict(manager.topics)
+        await manager.close_all()
+        return alice, bob, warehouse, delivered, topics
+
+    alice, bob, warehouse, delivered, topics = asyncio.run(scenario())
+    assert delivered == [1, 2, 0]
+    assert alice.received == [{"topic": "user:alice", "risk": "a"}]
+    assert bob.received == [{"topic": "inventory", "sku": "X"}]
+    assert warehouse.received == [{"topic": "inventory", "sku": "X"}]
+    assert set(topics) == {"user:alice", "user:bob"}
+
+
+def test_invalid_topics_rejected():
+    async def scenario():
+        manager = WebSocketManager()
+        websocket = FakeWebSocket()
+        await manager.connect(websocket)
+        try:
+            manager.subscribe(websocket, ["user:alice", "everything"])
+        except ValueError as e:
+            return str(e), manager.topics
+        finally:
+            await manager.close_all()
+
+    error, topics = asyncio.run(scenario())
+    assert "everything" in error
+    assert topics == {}
+
+
+def test_unhashable_topics_rejected_without_closing_the_connection():
+    async def scenario():
+        manager = WebSocketManager()
+        websocket = FakeWebSocket()
+        await manager.connect(websocket)
+        try:
+            with pytest.raises(ValueError, match="Invalid topics"):
+                manager.subscribe(websocket, [{}, ["inventory"]])
+            manager.unsubscribe(websocket, [{}])
+            return manager.subscribe(websocket, ["inventory"])
+        finally:
+            await manager.close_all()
+
+    assert asyncio.run(scenario()) == ["inventory"]
+
+
+def test_backplane_relays_events_between_workers():
+    from app.services.backplane import InMemoryBackplane
+
+    async def scenario():
+        bus = []
+        workers = [WebSocketManager(), WebSocketManager()]
+        clients = [FakeWebSocket(), FakeWebSocket()]
+        for manager, websocket in zip(workers, clients):
+            manager.backplane = InMemoryBackplane(bus=bus, flush_interval=0.005)
+            await manager.backplane.start(manager.deliver_batch)
+            await manager.connect(websocket)
+            manager.subscribe(websocket, ["user:alice"])
+
+        for number in range(3):
+            workers[0].publish("user:alice", {"n": number})
+        await asyncio.sleep(0.05)
+        stats = [manager.backplane.stats() for manager in workers]
+        for manager in workers:
+            await manager.backplane.stop()
+            await manager.close_all()
+        return clients, stats
+
+    (local, remote), (sender, receiver) = asyncio.run(scenario())
+    expected = [{"topic": "user:alice", "n": number} for number in range(3)]
+    assert local.received == expected
+    assert remote.received == expected
+    assert sender["batches_sent"] == 1 and sender["events_received"] == 0
+    assert receiver["batches_received"] == 1 and receiver["events_received"] == 3
+
+
+def test_incomplete_backplane_fails_when_constructed():
+    from app.services.backplane import Backplane
+
+    class SendOnlyBackplane(Backplane):
+        async def _send(self, payload):
+            pass
+
+    with pytest.raises(TypeError, match="_open"):
+        SendOnlyBackplane()
+
+
+def test_batch_protocol_sends_bursts_in_one_frame():
+    async def scenario():
+        manager = WebSocketManager(batch_window=0.01)
+        batched, plain = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(batched, manager.negotiate(["unknown", "json-batch"]))
+        await manager.connect(plain, manager.negotiate([]))
+        for number in range(5):
+            manager.broadcast({"n": number})
+        await asyncio.sleep(0.05)
+        stats = manager.stats()
+        await manager.close_all()
+        return batched, plain, stats
+
+    batched, plain, stats = asyncio.run(scenario())
+    assert batched.subprotocol == "json-batch" and plain.subprotocol is None
+    assert batched.received == [[{"n": number} for number in range(5)]]
+    assert plain.received == [{"n": number} for number in range(5)]
+    assert stats["frames"] == 6
+    assert stats["protocols"]["json-batch"] == 1
+
+
+def test_msgpack_protocol_encodes_binary_batches():
+    msgpack = pytest.importorskip("msgpack")
+
+    async def scenario():
+        manager = WebSocketManager(batch_window=0.01)
+        websocket = FakeWebSocket()
+        await manager.connect(websocket, manager.negotiate(["msgpack"]))
+        manager.subscribe(websocket, ["inventory"])
+        manager.publish("inventory", {"sku": "X"})
+        manager.publish("inventory", {"sku": "Y"})
+        await asyncio.sleep(0.05)
+        await manager.close_all()
+        return websocket
+
+    websocket = asyncio.run(scenario())
+    assert [msgpack.unpackb(frame) for frame in websocket.received] == [
+        [{"topic": "inventory", "sku": "X"}, {"topic": "inventory", "sku": "Y"}]
+    ]
+
+
+def test_heartbeat_pings_and_reaps_idle_clients():
+    async def scenario():
+        manager = WebSocketManager(heartbeat_interval=0.02, idle_timeout=0.05)
+        idle, alive = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(idle)
+        await manager.connect(alive)
+        for _ in range(8):
+            await asyncio.sleep(0.015)
+            manager.touch(alive)
+        remaining = list(manager.active_connections)
+        stats = manager.stats()
+        await manager.close_all()
+        return idle, alive, remaining, stats
+
+    idle, alive, remaining, stats = asyncio.run(scenario())
+    assert remaining == [alive]
+    assert idle.closed_with == 1001 and stats["reaped"] == 1
+    assert any(message.get("type") == "ping" for message in alive.received)
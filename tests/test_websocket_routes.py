@@ -0,0 +1,42 @@
+import sys
+import os
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.routes import websockets
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def authenticate(token):
+        return {"_id": "alice-id", "email": "alice@example.com"}
+
+    monkeypatch.setattr(websockets, "authenticate_token", authenticate)
+    app = FastAPI()
+    app.include_router(websockets.websocket_router, prefix="/ws")
+    with TestClient(app) as client:
+        yield client
+
+
+def test_binary_json_frame_is_handled_on_a_json_connection(client):
+    with client.websocket_connect("/ws/ws/decisions?token=t") as websocket:
+        websocket.send_bytes(json.dumps({"action": "subscribe", "topics": ["inventory"]}).encode("utf-8"))
+        assert websocket.receive_json() == {"type": "subscriptions", "topics": ["inventory"]}
+
+        # An undecodable frame gets an error reply and the connection stays open
+        websocket.send_bytes(b"\xff\x00")
+        assert websocket.receive_json()["type"] == "error"
+        websocket.send_text(json.dumps({"action": "unsubscribe", "topics": ["inventory"]}))
+        assert websocket.receive_json() == {"type": "subscriptions", "topics": []}
+
+
+def test_msgpack_client_can_send_binary_control_frames(client):
+    msgpack = pytest.importorskip("msgpack")
+    with client.websocket_connect("/ws/ws/decisions?token=t", subprotocols=["msgpack"]) as websocket:
+        websocket.send_bytes(msgpack.packb({"action": "subscribe", "topics": ["sop_jobs"]}))
+        assert msgpack.unpackb(websocket.receive_bytes()) == [{"type": "subscriptions", "topics": ["sop_jobs"]}]
@@ -0,0 +1,93 @@
+"""
+LLM Client Latency Benchmark
+
+Compares a fresh `httpx.AsyncClient` per call (the old behaviour of `llm_service`) with the
+shared pooled client from `llm_service.create_http_client`, against a local chat-completions
+stub, and reports p50/p99 latency per call.
+
+Usage:
+    python tools/bench_llm_client.py [--requests 300] [--url http://127.0.0.1:8765/api/v1/chat/completions]
+
+Without --url a stub server is started on 127.0.0.1:8765. Over plain HTTP on loopback this
+only measures client setup and TCP connect; against the real API each fresh client also pays
+DNS and a TLS handshake, so the gap is larger.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+
+import httpx
+import uvicorn
+
+from app.services.llm_service import HEADERS, create_http_client
+
+PAYLOAD = {"model": "bench", "messages": [{"role": "user", "content": "ping"}]}
+COMPLETION = b'{"choices":[{"message":{"role":"assistant","content":"[]"}}]}'
+
+
+async def stub_app(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    while (await receive()).get("more_body"):
+        pass
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": COMPLETION})
+
+
+def start_stub(port: int):
+    server = uvicorn.Server(uvicorn.Config(stub_app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+
+def percentile(samples, q):
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1]
+
+
+async def fresh_client_per_call(url: str, requests: int):
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        async with httpx.AsyncClient() as client:
+            (await client.post(url, headers=HEADERS, json=PAYLOAD)).raise_for_status()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def shared_client(url: str, requests: int):
+    samples = []
+    async with create_http_client() as client:
+        for _ in range(requests):
+            start = time.perf_counter()
+            (await client.post(url, json=PAYLOAD)).raise_for_status()
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--url")
+    args = parser.parse_args()
+
+    url = args.url
+    if not url:
+        start_stub(8765)
+        url = "http://127.0.0.1:8765/api/v1/chat/completions"
+
+    for name, run in (("fresh client per call", fresh_client_per_call), ("shared pooled client", shared_client)):
+        samples = await run(url, args.requests)
+        print(f"{name:<24} p50={percentile(samples, 50):7.2f} ms  p99={percentile(samples, 99):7.2f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,170 @@
+"""
+Login Throughput Benchmark
+
+Shows what concurrent logins do to event-loop latency: while a storm of bcrypt checks runs,
+a probe measures how late the loop wakes up (in-process), or how long `GET /` takes (against
+a running API). With bcrypt on the event loop the probe latency grows with every login in
+flight; with the bounded thread pool it stays flat.
+
+In-process, comparing bcrypt on the loop ("inline") with the thread pool ("pool"):
+    python tools/bench_login_throughput.py --logins 64 --concurrency 16 --rounds 12
+
+Against a running API (registers a throwaway user, then logs in concurrently):
+    python tools/bench_login_throughput.py --base-url http://127.0.0.1:8000 --logins 200 --concurrency 32
+
+Options:
+    --modes         Comma-separated subset of "inline,pool" (in-process only)
+    --rounds        bcrypt cost factor of the benchmark hash (in-process only)
+    --json          Write the results to a file, to compare runs for regressions
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List
+
+import bcrypt
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.auth_service import PasswordHasher, verify_password  # noqa: E402
+
+MODES = ("inline", "pool")
+PROBE_INTERVAL = 0.005
+
+
+def percentile(samples: List[float], q: int) -> float:
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1]
+
+
+async def storm(logins: int, concurrency: int, login: Callable[[], Awaitable[bool]], probe: Callable[[], Awaitable[float]]) -> Dict[str, object]:
+    latencies: List[float] = []
+    probes: List[float] = []
+    failures = 0
+    numbers = iter(range(logins))
+    done = asyncio.Event()
+
+    async def worker():
+        nonlocal failures
+        for _ in numbers:
+            start = time.perf_counter()
+            if not await login():
+                failures += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    async def prober():
+        while not done.is_set():
+            probes.append(await probe())
+
+    probe_task = asyncio.create_task(prober())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe_task
+
+    return {
+        "logins": logins,
+        "concurrency": concurrency,
+        "failures": failures,
+        "logins_per_s": round(logins / elapsed, 2),
+        "login_p50_ms": round(percentile(latencies, 50), 1),
+        "login_p95_ms": round(percentile(latencies, 95), 1),
+        "probe_p50_ms": round(percentile(probes, 50), 2),
+        "probe_p99_ms": round(percentile(probes, 99), 2),
+        "probe_max_ms": round(max(probes, default=0.0), 2),
+    }
+
+
+async def loop_lag() -> float:
+    """Milliseconds the loop woke up later than a PROBE_INTERVAL sleep asked for."""
+    start = time.perf_counter()
+    await asyncio.sleep(PROBE_INTERVAL)
+    return max(0.0, (time.perf_counter() - start - PROBE_INTERVAL) * 1000)
+
+
+async def run_in_process(args) -> List[Dict[str, object]]:
+    password = "benchmark-password"
+    hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=args.rounds)).decode("utf-8")
+    hasher = PasswordHasher(workers=args.workers, max_queue=max(args.logins, 1))
+
+    async def inline_login() -> bool:
+        return verify_password(password, hashed)
+
+    async def pool_login() -> bool:
+        return await hasher.run(verify_password, password, hashed)
+
+    logins = {"inline": inline_login, "pool": pool_login}
+    results = []
+    for mode in args.modes.split(","):
+        if mode not in MODES:
+            raise SystemExit(f"Unknown mode '{mode}', expected one of {', '.join(MODES)}")
+        result = {"mode": mode, "rounds": args.rounds, **await storm(args.logins, args.concurrency, logins[mode], loop_lag)}
+        results.append(result)
+    hasher.shutdown()
+    return results
+
+
+async def run_against_api(args) -> List[Dict[str, object]]:
+    import httpx
+
+    email, password = f"bench-{uuid.uuid4().hex[:8]}@example.com", "benchmark-password"
+    limits = httpx.Limits(max_connections=args.concurrency + 1)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120, limits=limits) as client:
+        response = await client.post("/auth/register", json={
+            "email": email, "password": password, "company_name": "Benchmark",
+        })
+        response.raise_for_status()
+        token = response.json()["access_token"]
+
+        async def login() -> bool:
+            response = await client.post("/auth/login", json={"email": email, "password": password})
+            return response.status_code == 200
+
+        async def probe() -> float:
+            start = time.perf_counter()
+            await client.get("/")
+            elapsed = (time.perf_counter() - start) * 1000
+            await asyncio.sleep(PROBE_INTERVAL)
+            return elapsed
+
+        result = {"mode": "api", **await storm(args.logins, args.concurrency, login, probe)}
+        stats = await client.get("/auth/stats", headers={"Authorization": f"Bearer {token}"})
+        result["server"] = stats.json()
+    return [result]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url")
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    results = await (run_against_api(args) if args.base_url else run_in_process(args))
+    for result in results:
+        print(
+            f"{result['mode']:<7} {result['logins_per_s']:8.2f} logins/s  "
+            f"login p50={result['login_p50_ms']:8.1f} ms p95={result['login_p95_ms']:8.1f} ms  "
+            f"probe p50={result['probe_p50_ms']:7.2f} ms p99={result['probe_p99_ms']:7.2f} ms max={result['probe_max_ms']:7.2f} ms"
+        )
+
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump({"results": results}, output, indent=2)
+        print(f"✅ Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
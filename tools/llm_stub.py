@@ -0,0 +1,164 @@
+"""
+Offline LLM Stub Server
+
+A local stand-in for OpenRouter's chat-completions API, so the decision-context routes can
+be tested and load-tested without network access or API quota.
+
+It answers `POST /api/v1/chat/completions` with a plausible completion for the app's two
+prompts: a fenced JSON list of risks/decisions, or a `best_decision` object. Both the
+blocking form and `"stream": true` (server-sent events, one content delta per chunk) are
+supported, as well as injected latency and errors. `GET /stats` returns request counters.
+
+Usage:
+    python tools/llm_stub.py [--port 8765] [--latency 0.8] [--jitter 0.2] [--error-rate 0.05]
+                             [--error-status 429] [--chunk-delay 0.02]
+
+    Point the app at it with:
+        LLM_API_URL=http://127.0.0.1:8765/api/v1/chat/completions uvicorn app.main:app
+
+In tests, mount it in-process instead:
+    >>> stub = create_stub_app(latency=0)
+    >>> client = httpx.AsyncClient(transport=httpx.ASGITransport(app=stub))
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from typing import List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+STREAM_CHUNK_CHARS = 12
+
+
+def _risks_completion(prompt: str) -> str:
+    previsions = re.search(r"- Previsions: (\[.*?\])", prompt)
+    topics: List[str] = re.findall(r"'([^']+)'", previsions.group(1)) if previsions else []
+    topics = topics or ["current operations"]
+    items = [
+        {"risk": f"Stockouts caused by {topic.lower()}", "decision": f"Raise safety stock for items affected by {topic.lower()}"}
+        for topic in topics
+    ]
+    items.append({"risk": "Shipment delays from the main carrier", "decision": "Qualify a backup carrier on the main lanes"})
+    return "```json\n" + json.dumps(items, indent=2) + "\n```"
+
+
+def _best_decision_completion(prompt: str) -> str:
+    problem = re.search(r"- Problem: (.*)", prompt)
+    subject = problem.group(1).strip() if problem else "the problem"
+    return "```json\n" + json.dumps({"best_decision": f"Apply the previously approved mitigation to {subject}"}) + "\n```"
+
+
+def completion_content(messages: List[dict]) -> str:
+    """Return the stub's answer to a chat-completions message list."""
+    prompt = messages[-1].get("content", "") if messages else ""
+    if "best_decision" in prompt:
+        return _best_decision_completion(prompt)
+    return _risks_completion(prompt)
+
+
+def create_stub_app(
+    latency: float = 0.8,
+    jitter: float = 0.2,
+    error_rate: float = 0.0,
+    error_status: int = 429,
+    chunk_delay: float = 0.02,
+    seed: Optional[int] = None,
+) -> FastAPI:
+    """
+    Build the stub chat-completions app.
+
+    Args:
+        latency (float): Mean seconds before the response (or first stream chunk) is sent
+        jitter (float): Latency is drawn uniformly from latency +/- jitter
+        error_rate (float): Fraction of requests answered with `error_status`
+        error_status (int): Status of injected errors; 429 responses carry `Retry-After: 1`
+        chunk_delay (float): Seconds between streamed chunks
+        seed (Optional[int]): Random seed, for reproducible error injection
+
+    Returns:
+        FastAPI: The stub application
+    """
+    app = FastAPI(title="LLM Stub")
+    rng = random.Random(seed)
+    stats = {"requests": 0, "streamed": 0, "errors": 0}
+
+    def chunk(completion_id: str, model: str, delta: dict, finish_reason: Optional[str] = None) -> str:
+        body = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(body)}\n\n"
+
+    async def stream_events(completion_id: str, model: str, content: str):
+        yield ": OPENROUTER PROCESSING\n\n"
+        yield chunk(completion_id, model, {"role": "assistant", "content": ""})
+        for start in range(0, len(content), STREAM_CHUNK_CHARS):
+            await asyncio.sleep(chunk_delay)
+            yield chunk(completion_id, model, {"content": content[start:start + STREAM_CHUNK_CHARS]})
+        yield chunk(completion_id, model, {}, "stop")
+        yield "data: [DONE]\n\n"
+
+    @app.post("/api/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        await asyncio.sleep(max(0.0, latency + rng.uniform(-jitter, jitter)))
+
+        if rng.random() < error_rate:
+            stats["errors"] += 1
+            headers = {"Retry-After": "1"} if error_status == 429 else {}
+            return JSONResponse({"error": {"code": error_status, "message": "Injected stub error"}}, error_status, headers)
+
+        model = body.get("model", "stub")
+        content = completion_content(body.get("messages", []))
+        completion_id = "gen-" + hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
+
+        if body.get("stream"):
+            stats["streamed"] += 1
+            return StreamingResponse(stream_events(completion_id, model, content), media_type="text/event-stream")
+
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(content) // 4, "total_tokens": len(content) // 4},
+        }
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.8)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--chunk-delay", type=float, default=0.02)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    app = create_stub_app(args.latency, args.jitter, args.error_rate, args.error_status, args.chunk_delay, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
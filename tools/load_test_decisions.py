@@ -0,0 +1,161 @@
+"""
+Decision Endpoints Load Test
+
+Drives `POST /decision-context/submit/` and `POST /decision-context/best-decision/` of a
+running API at one or more concurrency levels and reports throughput, latency percentiles
+and status codes per endpoint and level.
+
+Run the API against the offline stub so no real LLM is called:
+    python tools/llm_stub.py --port 8765 --latency 0.8 &
+    LLM_API_URL=http://127.0.0.1:8765/api/v1/chat/completions uvicorn app.main:app --port 8000 &
+    python tools/load_test_decisions.py --concurrency 1,8,32 --requests 200
+
+Options:
+    --base-url      API root including the router prefix (default: http://127.0.0.1:8000/api)
+    --token         Access token from POST /auth/login, sent as a bearer token; the load test
+                    acts as that user (the decision routes only accept the caller's own user_id)
+    --endpoints     Comma-separated subset of "submit,best-decision"
+    --distinct      Distinct contexts sent to submit; fewer than --requests exercises the cache
+    --seed          Decision contexts created for the load-test user before best-decision runs
+    --json          Write the results to a file, to compare runs for regressions
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import statistics
+import time
+import uuid
+from collections import Counter
+from typing import Callable, Dict, List
+
+import httpx
+
+ENDPOINTS = ("submit", "best-decision")
+
+
+def percentile(samples: List[float], q: int) -> float:
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1]
+
+
+def make_context(number: int, run_id: str) -> dict:
+    return {
+        "previsions": [f"Increase in demand by {number % 40 + 5}%", f"Supplier delay on lane {number} ({run_id})"],
+        "processes": ["Just-in-time inventory", "Automated warehouse sorting"],
+        "constraints": ["Limited storage space", "Budget restrictions"],
+    }
+
+
+def token_subject(token: str) -> str:
+    """Return the user (the `sub` claim) a JWT was issued for, without verifying it."""
+    payload = token.split(".")[1]
+    return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))["sub"]
+
+
+async def seed_contexts(client: httpx.AsyncClient, user_id: str, count: int, run_id: str):
+    for number in range(count):
+        response = await client.post("/decision-context/create/", json={
+            "user_id": user_id,
+            "context": make_context(number, run_id),
+            "risks_decisions": [
+                {"risk": f"Supplier delay on lane {number}", "decision": "Use alternative supplier", "approved": number % 2 == 0},
+                {"risk": "Stockouts due to high demand", "decision": "Increase buffer stock by 20%"},
+            ],
+        })
+        response.raise_for_status()
+
+
+async def run_level(client: httpx.AsyncClient, concurrency: int, requests: int, send: Callable[[int], object]) -> Dict[str, object]:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    numbers = iter(range(requests))
+
+    async def worker():
+        for number in numbers:
+            start = time.perf_counter()
+            try:
+                response = await send(number)
+                statuses[response.status_code] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_ms": round(max(latencies), 1),
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000/api")
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--distinct", type=int)
+    parser.add_argument("--seed", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--token")
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    endpoints = [name for name in args.endpoints.split(",") if name]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        raise SystemExit(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+    run_id = uuid.uuid4().hex[:8]
+    user_id = token_subject(args.token) if args.token else f"loadtest-{run_id}"
+    distinct = args.distinct or args.requests
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    results = []
+
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits, headers=headers) as client:
+        if "best-decision" in endpoints:
+            await seed_contexts(client, user_id, args.seed, run_id)
+
+        for level in levels:
+            # A fresh context set per level, so an earlier level does not warm the cache for the next
+            level_id = f"{run_id}-c{level}"
+            senders = {
+                "submit": lambda number: client.post(
+                    "/decision-context/submit/", params={"user_id": user_id},
+                    json=make_context(number % distinct, level_id),
+                ),
+                "best-decision": lambda number: client.post(
+                    "/decision-context/best-decision/", params={"user_id": user_id},
+                    json={"problem": f"Supplier delay on lane {number % max(args.seed, 1)}"},
+                ),
+            }
+            for endpoint in endpoints:
+                result = {"endpoint": endpoint, **await run_level(client, level, args.requests, senders[endpoint])}
+                results.append(result)
+                print(
+                    f"{endpoint:<14} c={level:<4} {result['throughput_rps']:8.2f} req/s  "
+                    f"p50={result['p50_ms']:8.1f} ms  p95={result['p95_ms']:8.1f} ms  "
+                    f"p99={result['p99_ms']:8.1f} ms  statuses={result['statuses']}"
+                )
+
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump({"run_id": run_id, "base_url": args.base_url, "results": results}, output, indent=2)
+        print(f"✅ Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())